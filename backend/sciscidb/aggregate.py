@@ -0,0 +1,169 @@
+"""
+Partitioned parallel aggregation
+
+A `$group` pipeline runs on a single server thread. parallel_aggregate
+splits the pipeline's `$match` into disjoint ranges of one indexed
+numeric field (e.g. year or corpusid), runs one aggregation per range
+from a thread pool, and merges the partial groups in Python, so a count
+job can keep every mongod core busy.
+
+The threads share the MongoClient of the collection; pymongo checks a
+pooled connection out per operation, so no extra clients are opened.
+"""
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo.errors import PyMongoError
+
+# Partitions queued per worker, so a few dense ranges do not leave threads idle
+PARTITIONS_PER_WORKER = 4
+
+# Accumulators whose partial results can be combined, and how
+_MERGES = {
+    "$sum": lambda a, b: a + b,
+    "$count": lambda a, b: a + b,
+    "$min": min,
+    "$max": max,
+}
+
+def server_cores(db) -> int:
+    """
+    Number of CPU cores of the MongoDB server, for sizing the thread pool
+
+    Falls back to the local core count when hostInfo is not permitted.
+    """
+    try:
+        return int(db.command("hostInfo")["system"]["numCores"])
+    except (PyMongoError, KeyError, TypeError, ValueError):
+        return os.cpu_count() or 1
+
+def is_indexed(collection, field: str) -> bool:
+    """Whether some index of the collection starts with this field"""
+    return any(
+        index["key"][0][0] == field
+        for index in collection.index_information().values()
+    )
+
+def numeric_bounds(collection, field: str) -> Optional[Tuple[float, float]]:
+    """Smallest and largest numeric value of a field, read from its index"""
+    query = {field: {"$type": "number"}}
+    low = collection.find_one(query, {field: 1}, sort=[(field, 1)])
+    if low is None:
+        return None
+    high = collection.find_one(query, {field: 1}, sort=[(field, -1)])
+    return low[field], high[field]
+
+def range_partitions(low: float, high: float, partitions: int) -> List[Tuple[int, int]]:
+    """
+    Split [low, high] into at most `partitions` half-open integer ranges
+
+    Ranges are at least one wide, so integer fields such as year get one
+    partition per value when there are more partitions than values.
+    """
+    start, stop = math.floor(low), math.floor(high) + 1
+    partitions = max(1, min(partitions, stop - start))
+    edges = sorted({start + (stop - start) * i // partitions for i in range(partitions + 1)})
+    return list(zip(edges, edges[1:]))
+
+def _freeze(value: Any) -> Any:
+    """Hashable form of a group _id"""
+    if isinstance(value, dict):
+        return tuple((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def _group_merges(pipeline: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge function of each accumulator of the pipeline's final $group"""
+    if not pipeline or "$group" not in pipeline[-1]:
+        raise ValueError("A partitioned pipeline must end with a $group stage")
+    merges = {}
+    for name, accumulator in pipeline[-1]["$group"].items():
+        if name == "_id":
+            continue
+        operator = next(iter(accumulator)) if isinstance(accumulator, dict) else None
+        if operator not in _MERGES:
+            raise ValueError(f"Cannot merge partial '{name}' groups (supported: {', '.join(_MERGES)})")
+        merges[name] = _MERGES[operator]
+    return merges
+
+def _with_range(pipeline: List[Dict[str, Any]], condition: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """The pipeline with a partition condition added to its leading $match"""
+    if pipeline[0].keys() == {"$match"}:
+        return [{"$match": {"$and": [pipeline[0]["$match"], condition]}}] + pipeline[1:]
+    return [{"$match": condition}] + pipeline
+
+def parallel_aggregate(
+    collection,
+    pipeline: List[Dict[str, Any]],
+    partition_field: str,
+    workers: Optional[int] = None,
+    partitions: Optional[int] = None,
+    bounds: Optional[Tuple[float, float]] = None,
+    **kwargs
+) -> List[Dict[str, Any]]:
+    """
+    Run a `$match ... $group` pipeline over disjoint ranges of a field concurrently
+
+    Each partition adds `{partition_field: {"$gte": a, "$lt": b}}` to the
+    leading `$match`. Values below and above `bounds`, and documents whose
+    field is missing or not a number, form three more partitions, so the
+    merged result equals a serial run. Groups that span partitions are
+    combined with their accumulators, which must be `$sum`, `$count`,
+    `$min` or `$max`.
+
+    When the field has no index (every partition would scan the whole
+    collection) or only one worker is asked for, the pipeline runs once,
+    serially.
+
+    Args:
+        collection: MongoDB collection to aggregate
+        pipeline: Stages ending with `$group`
+        partition_field: Numeric field to partition on, e.g. 'year' or 'corpusid'
+        workers: Concurrent aggregations (None = cores of the MongoDB server)
+        partitions: Number of ranges (None = PARTITIONS_PER_WORKER per worker)
+        bounds: Range of the field to split, e.g. the years a $match keeps
+            (None = smallest and largest values in the index)
+        **kwargs: Passed to every aggregate() call, e.g. allowDiskUse
+
+    Returns:
+        The merged `$group` output, in no particular order
+
+    Raises:
+        ValueError: If the pipeline does not end in a mergeable $group
+    """
+    merges = _group_merges(pipeline)
+    workers = workers or server_cores(collection.database)
+
+    if workers <= 1 or not is_indexed(collection, partition_field):
+        return list(collection.aggregate(pipeline, **kwargs))
+    bounds = bounds or numeric_bounds(collection, partition_field)
+    if bounds is None:
+        return list(collection.aggregate(pipeline, **kwargs))
+
+    ranges = range_partitions(*bounds, partitions or workers * PARTITIONS_PER_WORKER)
+    conditions = [{partition_field: {"$gte": start, "$lt": stop}} for start, stop in ranges]
+    conditions += [
+        {partition_field: {"$lt": ranges[0][0]}},
+        {partition_field: {"$gte": ranges[-1][1]}},
+        {partition_field: {"$not": {"$type": "number"}}},
+    ]
+
+    def run(condition: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return list(collection.aggregate(_with_range(pipeline, condition), **kwargs))
+
+    groups: Dict[Any, Dict[str, Any]] = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="aggregate") as executor:
+        for partial in executor.map(run, conditions):
+            for doc in partial:
+                key = _freeze(doc["_id"])
+                group = groups.get(key)
+                if group is None:
+                    groups[key] = doc
+                    continue
+                for name, merge in merges.items():
+                    group[name] = merge(group[name], doc[name])
+
+    return list(groups.values())
@@ -0,0 +1,166 @@
+"""
+Persisted per-dataset inventory of shards, sizes, counts and ingest status
+"""
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .manifest import METADATA_DIRNAME, get_metadata_dir
+
+CATALOG_FILENAME = "catalog.json"
+
+def read_catalog(dataset_path: Path) -> Optional[Dict[str, Any]]:
+    """Read a dataset's catalog without creating anything, or None if there is none"""
+    catalog_path = dataset_path / METADATA_DIRNAME / CATALOG_FILENAME
+    if not catalog_path.exists():
+        return None
+    try:
+        with open(catalog_path, 'r') as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return None
+
+def scan_shards(dataset_path: Path) -> List[Path]:
+    """Glob a dataset directory for shard files (the slow path the catalog avoids)"""
+    json_files = list(dataset_path.glob("*.json"))
+    gz_files = list(dataset_path.glob("*.json.gz"))
+    # OpenAlex snapshot partitions
+    partitions = list(dataset_path.glob("updated_date=*/*.gz"))
+    return json_files + gz_files + partitions
+
+class DatasetCatalog:
+    """
+    Inventory of one dataset, written as shards are downloaded and ingested
+
+    Each shard entry (keyed by its path relative to the dataset directory)
+    records bytes, lines, documents, ingest status and the collection it
+    was loaded into. Like the download manifest, the catalog is rewritten
+    atomically on every update and is safe to share between threads.
+    """
+
+    def __init__(self, dataset_path: Path):
+        self.dataset_path = dataset_path
+        # The metadata directory is only created on the first save
+        self.path = dataset_path / METADATA_DIRNAME / CATALOG_FILENAME
+        self._lock = threading.Lock()
+        self.data: Dict[str, Any] = read_catalog(dataset_path) or {"release_id": None, "shards": {}}
+
+    @property
+    def release_id(self) -> Optional[str]:
+        return self.data.get("release_id")
+
+    def set_release(self, release_id: str):
+        """Point the catalog at a release, forgetting shards recorded for another one"""
+        with self._lock:
+            if self.data.get("release_id") != release_id:
+                self.data = {"release_id": release_id, "shards": {}}
+                self._save()
+
+    def record_shard(self, shard_path: Path, **fields):
+        """Merge fields into a shard's entry, filling in its byte size if unknown"""
+        self.record_shards({shard_path: fields})
+
+    def record_shards(self, updates: Dict[Path, Dict[str, Any]]):
+        """Merge fields into many shard entries with a single write"""
+        with self._lock:
+            for shard_path, fields in updates.items():
+                name = shard_path.relative_to(self.dataset_path).as_posix()
+                shard = self.data["shards"].setdefault(name, {})
+                if "bytes" not in fields and "bytes" not in shard and shard_path.exists():
+                    shard["bytes"] = shard_path.stat().st_size
+                shard.update(fields)
+            self.data["updated_at"] = datetime.now(timezone.utc).isoformat()
+            self._save()
+
+    def forget_shards(self, shard_paths: List[Path]):
+        """Drop entries for shards that no longer exist"""
+        with self._lock:
+            for shard_path in shard_paths:
+                self.data["shards"].pop(shard_path.relative_to(self.dataset_path).as_posix(), None)
+            self._save()
+
+    def shard_paths(self) -> List[Path]:
+        """Paths of all catalogued shards, without touching the filesystem"""
+        return [self.dataset_path / name for name in self.data["shards"]]
+
+    def sync(self, save: bool = True) -> bool:
+        """
+        Refresh the catalog if the shard files on disk are not the catalogued ones
+
+        One directory listing catches shards added outside the downloader
+        and catalogued shards that were deleted since.
+
+        Returns:
+            Whether the catalog had to be refreshed
+        """
+        on_disk = {p.relative_to(self.dataset_path).as_posix() for p in scan_shards(self.dataset_path)}
+        if on_disk == set(self.data["shards"]):
+            return False
+        self.refresh(save)
+        return True
+
+    def refresh(self, save: bool = True) -> "DatasetCatalog":
+        """Rebuild shard entries from a directory scan, keeping known counts (in memory only unless `save`)"""
+        found = {p.relative_to(self.dataset_path).as_posix(): p for p in scan_shards(self.dataset_path)}
+        with self._lock:
+            shards = self.data["shards"]
+            for name in list(shards):
+                if name not in found:
+                    del shards[name]
+            for name, shard_path in found.items():
+                size = shard_path.stat().st_size
+                entry = shards.setdefault(name, {})
+                # A changed size means the counts describe an older file
+                if entry.get("bytes") not in (None, size):
+                    entry.clear()
+                entry["bytes"] = size
+            if save:
+                self.data["updated_at"] = datetime.now(timezone.utc).isoformat()
+                self._save()
+        return self
+
+    def summary(self) -> Dict[str, Any]:
+        """Totals over all shards, as reported by get_dataset_info"""
+        shards = self.data["shards"]
+        status_counts: Dict[str, int] = {}
+        for shard in shards.values():
+            status = shard.get("ingest_status", "not_ingested")
+            status_counts[status] = status_counts.get(status, 0) + 1
+
+        def total(key: str) -> Optional[int]:
+            # Only report a total when every shard has been counted
+            values = [shard.get(key) for shard in shards.values()]
+            return sum(values) if values and None not in values else None
+
+        return {
+            "release_id": self.data.get("release_id"),
+            "total_files": len(shards),
+            "total_bytes": sum(shard.get("bytes") or 0 for shard in shards.values()),
+            "total_lines": total("lines"),
+            "total_documents": total("documents"),
+            "ingest_status": status_counts,
+            "updated_at": self.data.get("updated_at"),
+        }
+
+    def _save(self):
+        """Write the catalog atomically (caller holds the lock)"""
+        get_metadata_dir(self.dataset_path)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+# One instance per dataset directory, so threads never overwrite each other's updates
+_catalogs: Dict[Path, DatasetCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+def get_catalog(dataset_path: Path) -> DatasetCatalog:
+    """Get the shared catalog for a dataset directory"""
+    key = dataset_path.resolve()
+    with _catalogs_lock:
+        if key not in _catalogs:
+            _catalogs[key] = DatasetCatalog(dataset_path)
+        return _catalogs[key]
@@ -68,6 +68,10 @@ class Config:
         # Export directory for static files
         self.export_dir = self.data_root / 'exports'
         self.export_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Optional JSON file of per-collection field projections applied at ingest
+        projection_file = os.getenv('PROJECTION_FILE')
+        self.projection_file = Path(projection_file) if projection_file else None
     
     def _setup_database(self):
         """Setup database connection settings"""
@@ -76,10 +80,29 @@ class Config:
             'mongodb://localhost:27017'  # Default for local dev
         )
         self.db_name = os.getenv('DB_NAME', 'papersDB')
+        # Wire compression offered to the server, e.g. "zstd,snappy" (None = off)
+        self.mongo_compressors = os.getenv('MONGO_COMPRESSORS') or None
+        # JSON backend used to decode shards: auto, orjson, msgspec or json
+        self.json_decoder = os.getenv('JSON_DECODER', 'auto').lower()
+        # Directory for upload ledgers (None = each dataset's .sciscidb directory)
+        ledger_dir = os.getenv('SCISCI_LEDGER_DIR')
+        self.ledger_dir = Path(ledger_dir) if ledger_dir else None
     
     def _setup_api_keys(self):
         """Setup API keys for external services"""
         self.semantic_scholar_key = os.getenv('S2_API_KEY')
+        # Overridable so downloads can be pointed at a local stand-in server
+        self.s2_api_url = os.getenv(
+            'S2_API_URL',
+            'https://api.semanticscholar.org/datasets/v1'
+        ).rstrip('/')
+        # Shared across every request made with the same key (S2 grants 1 req/s by default)
+        self.s2_requests_per_second = float(os.getenv('S2_REQUESTS_PER_SECOND', '1'))
+        # OpenAlex snapshot root: the public bucket, a mirror URL or a local directory
+        self.openalex_snapshot_url = os.getenv(
+            'OPENALEX_SNAPSHOT_URL',
+            'https://openalex.s3.amazonaws.com'
+        ).rstrip('/')
         
         # Warn if missing (but don't crash)
         if not self.semantic_scholar_key:
@@ -118,6 +141,11 @@ class Config:
         print(f"Export dir: {self.export_dir}")
         print(f"Database: {self.db_name} @ {self.mongo_uri}")
         print(f"S2 API Key: {'✓ Set' if self.semantic_scholar_key else '✗ Missing'}")
+        print(f"S2 API URL: {self.s2_api_url}")
+        print(f"OpenAlex snapshot: {self.openalex_snapshot_url}")
+        print(f"JSON decoder: {self.json_decoder}")
+        print(f"Ledger dir: {self.ledger_dir or 'per dataset (.sciscidb)'}")
+        print(f"Projection file: {self.projection_file or 'none (all fields loaded)'}")
 
 
     def test_database_connection(self):
@@ -3,10 +3,22 @@ Minimal utilities for the MongoDB
 """
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure
-from typing import List, Dict, Any, Optional
+from array import array
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 import sqlite3
+from datetime import datetime, timezone
 
+from .aggregate import parallel_aggregate
 from .config import config
+from .rollups import MAX_YEAR, MIN_YEAR, read_rollup
+
+# Client settings per workload. Bulk loads trade durability of the last
+# few writes (no journal wait) for throughput and compress the wire traffic;
+# compressors whose libraries are missing are skipped by pymongo.
+WRITE_PROFILES: Dict[str, Dict[str, Any]] = {
+    "default": {"w": None, "journal": None, "compressors": None},
+    "bulk": {"w": 1, "journal": False, "compressors": "zstd,snappy,zlib"},
+}
 
 class DatabaseManager:
     """Simple MongoDB connection manager"""
@@ -15,11 +27,37 @@ class DatabaseManager:
         self.client: Optional[MongoClient] = None
         self.db = None
         self._connected = False
+        self.write_profile = "default"
+    
+    def set_write_profile(self, name: str) -> Dict[str, Any]:
+        """
+        Choose the write concern and wire compression used by the next connect()
+        
+        Returns:
+            The settings now in effect
+        
+        Raises:
+            ValueError: If the profile is unknown
+        """
+        if name not in WRITE_PROFILES:
+            raise ValueError(f"Unknown write profile '{name}' (choose from {', '.join(WRITE_PROFILES)})")
+        if name != self.write_profile:
+            self.write_profile = name
+            self.disconnect()
+        return self.client_options()
+    
+    def client_options(self) -> Dict[str, Any]:
+        """MongoClient keyword arguments for the current write profile"""
+        profile = dict(WRITE_PROFILES[self.write_profile])
+        profile["compressors"] = config.mongo_compressors or profile["compressors"]
+        return {key: value for key, value in profile.items() if value is not None}
     
     def connect(self) -> bool:
-        """Establish database connection"""
+        """Establish database connection, reusing the open one if there is one"""
+        if self.is_connected():
+            return True
         try:
-            self.client = MongoClient(config.mongo_uri)
+            self.client = MongoClient(config.mongo_uri, **self.client_options())
             # Test connection
             self.client.admin.command('ping')
             self.db = self.client[config.db_name]
@@ -75,12 +113,39 @@ def count_s2fieldsofstudy() -> int:
             }
         })
 
+############
+# RELEASES #
+############
+
+# Tracks which Semantic Scholar release each collection currently reflects
+RELEASES_COLLECTION = "releases"
+
+def get_loaded_release(collection_name: str) -> Optional[str]:
+    """Get the release id last loaded into a collection, if recorded"""
+    releases = db_manager.get_collection(RELEASES_COLLECTION)
+    doc = releases.find_one({"_id": collection_name})
+    return doc["release_id"] if doc else None
+
+def set_loaded_release(collection_name: str, release_id: str) -> None:
+    """Record the release id a collection now reflects"""
+    releases = db_manager.get_collection(RELEASES_COLLECTION)
+    releases.update_one(
+        {"_id": collection_name},
+        {"$set": {"release_id": release_id, "updated_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+
 #####################
 # UPDATE COLLECTION #
 #####################
 
 def add_primary_s2field():
-    """Add a primary_s2field string field to documents for faster querying"""
+    """
+    Add a primary_s2field string field to documents for faster querying
+    
+    Uploads now compute primary_s2field at ingest (see transforms.DERIVED_FIELDS);
+    this backfill is only needed for collections loaded before that.
+    """
     if not db_manager.connect():
         print("Failed to connect to database")
         return
@@ -140,8 +205,8 @@ def add_primary_s2field():
 # SYNCING #
 ###########
 
-def sync_to_sqlite_incremental(data: List[Dict[str, Any]], sqlite_path: str) -> None:
-    """Write venue/year counts to SQLite incrementally (INSERT OR REPLACE)"""
+def sync_to_sqlite_incremental(data: Iterable[Dict[str, Any]], sqlite_path: str) -> None:
+    """Write venue/year counts (e.g. a VenueYearCounts) to SQLite incrementally (INSERT OR REPLACE)"""
     conn = sqlite3.connect(sqlite_path)
     cursor = conn.cursor()
     
@@ -156,10 +221,10 @@ def sync_to_sqlite_incremental(data: List[Dict[str, Any]], sqlite_path: str) ->
     ''')
     
     # Insert or replace records (incremental)
-    cursor.executemany(
-        'INSERT OR REPLACE INTO papers (venue, year, count) VALUES (?, ?, ?)',
-        [(row['venue'], row['year'], row['count']) for row in data]
+    rows = data.rows() if isinstance(data, VenueYearCounts) else (
+        (row['venue'], row['year'], row['count']) for row in data
     )
+    cursor.executemany('INSERT OR REPLACE INTO papers (venue, year, count) VALUES (?, ?, ?)', rows)
     
     conn.commit()
     conn.close()
@@ -196,77 +261,103 @@ def sync_fields_to_sqlite(data: List[Dict[str, Any]], sqlite_path: str, table_na
 #     s2orc_collection = db_manager.get_collection("s2orc_v2")
 #     s2orc_corpusid = list(s2orc_collection.aggregate([{"$project": {"corpusid": 1}}]))
 
-def get_venue_year_counts(collection_name: str, venues: List[str] = None) -> List[Dict[str, Any]]:
-    """Get exact paper counts by venue and year, filling missing years with 0"""
-    collection = db_manager.get_collection(collection_name)
-    
-    # Get unique venues if not provided
-    if not venues:
-        venues = collection.distinct("venue", {
-            "venue": {"$exists": True, "$ne": None}
-        })
-    
-    # Get min and max years for the given venues
-    year_range_pipeline = [
-        {"$match": {
-            "venue": {"$exists": True, "$ne": None, "$in": venues},
+class VenueYearCounts:
+    """
+    Paper counts for every venue and every year of a range, in one flat array
+    
+    Counts live in a venues x years matrix backed by `array`, so all
+    ~200k venues take a few bytes per cell instead of one dict per
+    venue-year. Iterating still yields `{"venue", "year", "count"}` dicts
+    (zero for missing years) in venue then year order, generated on demand.
+    """
+    
+    def __init__(self, venues: List[str], min_year: int, max_year: int):
+        self.venues = sorted(venues)
+        self.years = range(min_year, max_year + 1)
+        self._rows = {venue: index for index, venue in enumerate(self.venues)}
+        self.counts = array('L', [0]) * (len(self.venues) * len(self.years))
+    
+    def add(self, venue: str, year: int, count: int):
+        """Add to the count of one venue-year"""
+        self.counts[self._rows[venue] * len(self.years) + int(year) - self.years.start] += count
+    
+    def get(self, venue: str, year: int) -> int:
+        """Count for one venue-year (0 outside the matrix)"""
+        if venue not in self._rows or int(year) not in self.years:
+            return 0
+        return self.counts[self._rows[venue] * len(self.years) + int(year) - self.years.start]
+    
+    def row(self, venue: str) -> array:
+        """Counts of one venue, one per year"""
+        start = self._rows[venue] * len(self.years)
+        return self.counts[start:start + len(self.years)]
+    
+    def rows(self) -> Iterator[Tuple[str, int, int]]:
+        """(venue, year, count) tuples for every cell"""
+        counts = iter(self.counts)
+        for venue in self.venues:
+            for year in self.years:
+                yield venue, year, next(counts)
+    
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for venue, year, count in self.rows():
+            yield {"venue": venue, "year": year, "count": count}
+    
+    def __len__(self) -> int:
+        return len(self.counts)
+
+def get_venue_year_counts(collection_name: str, venues: List[str] = None, from_rollups: bool = False,
+                          workers: Optional[int] = None) -> VenueYearCounts:
+    """
+    Get exact paper counts by venue and year, filling missing years with 0
+    
+    One aggregation groups the papers by venue and year, run one year at
+    a time over `workers` threads (see aggregate.parallel_aggregate); the
+    venue list and year range are taken from its output, and gaps are
+    zero-filled by the array-backed result rather than by extra documents.
+    Venues without any dated paper are only listed (with zeros) when
+    named in `venues`.
+    
+    With `from_rollups`, counts are read from the collection's
+    rollup_venue_year instead of aggregating the papers.
+    """
+    if from_rollups:
+        actual_counts = read_rollup(db_manager.db, collection_name, "venue_year", venues)
+    else:
+        match_conditions = {
+            "venue": {"$exists": True, "$ne": None},
             "year": {"$exists": True, "$ne": None, "$gte": 1900, "$lte": 2030}
-        }},
-        {"$group": {
-            "_id": None,
-            "min_year": {"$min": "$year"},
-            "max_year": {"$max": "$year"}
-        }}
-    ]
-    
-    year_range_result = list(collection.aggregate(year_range_pipeline))
-    
-    if not year_range_result:
-        return []  # No data found
-    
-    min_year = year_range_result[0]["min_year"]
-    max_year = year_range_result[0]["max_year"]
-    
-    # Get actual counts using your existing pipeline
-    match_conditions = {
-        "venue": {"$exists": True, "$ne": None, "$in": venues},
-        "year": {"$exists": True, "$ne": None, "$gte": min_year, "$lte": max_year}
-    }
-    
-    pipeline = [
-        {"$match": match_conditions},
-        {"$group": {
-            "_id": {"venue": "$venue", "year": "$year"},
-            "count": {"$sum": 1}
-        }},
-        {"$project": {
-            "_id": 0,
-            "venue": "$_id.venue",
-            "year": "$_id.year", 
-            "count": 1
-        }}
-    ]
-    
-    actual_counts = list(collection.aggregate(pipeline))
-    
-    # Create complete grid
-    from collections import defaultdict
-    counts_by_venue_year = defaultdict(int)
-    
-    # Fill in actual counts
+        }
+        if venues:
+            match_conditions["venue"]["$in"] = venues
+        
+        pipeline = [
+            {"$match": match_conditions},
+            {"$group": {
+                "_id": {"venue": "$venue", "year": "$year"},
+                "count": {"$sum": 1}
+            }}
+        ]
+        collection = db_manager.get_collection(collection_name)
+        actual_counts = [
+            {"venue": item["_id"]["venue"], "year": item["_id"]["year"], "count": item["count"]}
+            for item in parallel_aggregate(
+                collection, pipeline, "year", workers,
+                partitions=MAX_YEAR - MIN_YEAR + 1, bounds=(MIN_YEAR, MAX_YEAR), allowDiskUse=True
+            )
+        ]
+    
+    if not actual_counts:
+        return VenueYearCounts(venues or [], 0, -1)
+    
+    years = [int(item['year']) for item in actual_counts]
+    result = VenueYearCounts(
+        set(venues or []) | {item['venue'] for item in actual_counts},
+        min(years),
+        max(years)
+    )
     for item in actual_counts:
-        counts_by_venue_year[(item['venue'], item['year'])] = item['count']
-    
-    # Generate complete dataset with dynamic year range
-    result = []
-    for venue in sorted(venues):
-        for year in range(min_year, max_year + 1):
-            result.append({
-                "venue": venue,
-                "year": year,
-                "count": counts_by_venue_year[(venue, year)]
-            })
-    
+        result.add(item['venue'], item['year'], item['count'])
     return result
 
 def get_s2fieldsofstudy_year_counts_fast(fields: List[str] = None) -> List[Dict[str, Any]]:
@@ -298,10 +389,21 @@ def get_s2fieldsofstudy_year_counts_fast(fields: List[str] = None) -> List[Dict[
     
     return list(collection.aggregate(pipeline))
 
-def get_s2fieldsofstudy_year_counts(fields: List[str] = None, sample_size: int = None) -> List[Dict[str, Any]]:
-    """Get exact paper counts by S2 field of study and year (s2-fos-model only)"""
+def get_s2fieldsofstudy_year_counts(fields: List[str] = None, sample_size: int = None, from_rollups: bool = False,
+                                    workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Get exact paper counts by S2 field of study and year (s2-fos-model only)
+    
+    The full count runs one year at a time over `workers` threads (see
+    aggregate.parallel_aggregate); a sampled count runs serially. With
+    `from_rollups`, counts are read from rollup_field_year instead of
+    aggregating the papers (sample_size is then ignored).
+    """
     collection = db_manager.get_collection("papers")
     
+    if from_rollups:
+        return read_rollup(db_manager.db, "papers", "field_year", fields)
+    
     pipeline = []
     
     # Add sampling at the very beginning if requested
@@ -338,35 +440,37 @@ def get_s2fieldsofstudy_year_counts(fields: List[str] = None, sample_size: int =
     if fields:
         pipeline.append({"$match": {"field": {"$in": fields}}})
     
-    pipeline.extend([
-        {"$group": {
-            "_id": {"field": "$field", "year": "$year"},
-            "count": {"$sum": 1}
-        }},
-        {"$project": {
-            "_id": 0,
-            "field": "$_id.field",
-            "year": "$_id.year", 
-            "count": 1
-        }},
-        {"$sort": {"field": 1, "year": 1}}
-    ])
+    pipeline.append({"$group": {
+        "_id": {"field": "$field", "year": "$year"},
+        "count": {"$sum": 1}
+    }})
     
-    return list(collection.aggregate(pipeline))
+    if sample_size:
+        groups = collection.aggregate(pipeline)
+    else:
+        groups = parallel_aggregate(
+            collection, pipeline, "year", workers,
+            partitions=MAX_YEAR - MIN_YEAR + 1, bounds=(MIN_YEAR, MAX_YEAR)
+        )
+    
+    rows = [{"field": item["_id"]["field"], "year": item["_id"]["year"], "count": item["count"]} for item in groups]
+    # Same order as a server-side sort on field then year (null fields first)
+    rows.sort(key=lambda row: (row["field"] is not None, row["field"] or "", row["year"]))
+    return rows
 
 #############
 ### INDEX ###
 #############
 
-def create_performance_indexes():
-    """Create indexes to accelerate common queries"""
+def create_performance_indexes(collection_name: str = "papers"):
+    """Create indexes to accelerate common queries on a papers collection (reusing an open connection)"""
     if not db_manager.connect():
         print("Failed to connect to database")
         return
     
     print("Creating performance indexes...")
     
-    papers_collection = db_manager.get_collection("papers")
+    papers_collection = db_manager.get_collection(collection_name)
     
     try:
         # Index for venue + year queries
@@ -0,0 +1,89 @@
+"""
+Pluggable JSON decoding for ingest
+
+Shards are read as raw bytes lines and decoded with the fastest backend
+available: orjson, then msgspec, then the stdlib `json` module. Every
+backend raises a ValueError subclass on malformed input, so callers can
+catch ValueError regardless of which one is active.
+
+Install a fast backend with `pip install sciscidb[fast-json]`.
+"""
+import json
+from typing import Any, Callable, Dict, Optional
+
+from .config import config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+# Preference order when the backend is 'auto'
+AUTO_ORDER = ["orjson", "msgspec", "json"]
+BACKENDS = ["auto"] + AUTO_ORDER
+
+class DecoderError(Exception):
+    """Exception raised when a JSON backend is unknown or not installed"""
+    pass
+
+def _available() -> Dict[str, Callable[[bytes], Any]]:
+    """Map each installed backend to its bytes -> object decode function"""
+    loaders: Dict[str, Callable[[bytes], Any]] = {}
+    if orjson is not None:
+        loaders["orjson"] = orjson.loads
+    if msgspec is not None:
+        loaders["msgspec"] = msgspec.json.Decoder().decode
+    loaders["json"] = json.loads
+    return loaders
+
+def available_backends() -> list:
+    """Names of the installed backends, fastest first"""
+    return list(_available())
+
+# Active backend, chosen on first use
+_backend: Optional[str] = None
+_loads: Optional[Callable[[bytes], Any]] = None
+
+def set_backend(name: Optional[str] = None) -> str:
+    """
+    Choose the JSON backend used by `loads`
+
+    Args:
+        name: 'auto', 'orjson', 'msgspec' or 'json' (None = config.json_decoder)
+
+    Returns:
+        Name of the backend now active
+
+    Raises:
+        DecoderError: If the backend is unknown or not installed
+    """
+    global _backend, _loads
+    name = (name or config.json_decoder).lower()
+    if name not in BACKENDS:
+        raise DecoderError(f"Unknown JSON decoder '{name}' (choose from {', '.join(BACKENDS)})")
+
+    loaders = _available()
+    if name == "auto":
+        name = next(backend for backend in AUTO_ORDER if backend in loaders)
+    elif name not in loaders:
+        raise DecoderError(f"JSON decoder '{name}' is not installed: pip install {name}")
+
+    _backend, _loads = name, loaders[name]
+    return name
+
+def get_backend() -> str:
+    """Name of the active backend"""
+    if _backend is None:
+        set_backend()
+    return _backend
+
+def loads(data: bytes) -> Any:
+    """Decode one JSON document from bytes with the active backend"""
+    if _loads is None:
+        set_backend()
+    return _loads(data)
@@ -0,0 +1,116 @@
+"""
+Incremental release updates from Semantic Scholar diffs
+"""
+import shutil
+from typing import Any, Dict, Optional
+
+from .database import db_manager, get_loaded_release, set_loaded_release
+from .download import (
+    DownloadError,
+    download_release_diff,
+    get_diff_path,
+    get_latest_release,
+    get_release_diffs
+)
+from .rollups import has_rollups
+from .upload import UploadError, apply_release_diff
+
+def update_to_latest_release(
+    dataset_name: str,
+    collection_name: Optional[str] = None,
+    workers: int = 1,
+    max_bandwidth: Optional[float] = None,
+    keep_files: bool = False,
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """
+    Bring a collection up to the latest release by applying S2 diffs
+    
+    The release loaded in the collection is read from the `releases`
+    collection. Each diff is downloaded, applied, and only then recorded
+    as loaded, so a failure leaves the collection at the last fully
+    applied release and the next run picks up from there.
+    
+    Args:
+        dataset_name: Name of dataset (papers, authors, etc.)
+        collection_name: MongoDB collection (defaults to dataset_name)
+        workers: Number of diff files to download concurrently
+        max_bandwidth: Bandwidth cap, as in download_semantic_scholar
+        keep_files: Keep downloaded diff files after applying them
+        dry_run: Only list the diffs that would be applied
+        
+    Returns:
+        Dictionary with release ids and cumulative diff statistics
+        
+    Raises:
+        UploadError: If no release is recorded or a diff fails to apply
+        DownloadError: If the diff listing or a diff file cannot be fetched
+    """
+    collection_name = collection_name or dataset_name
+    
+    if not db_manager.connect():
+        raise UploadError("Failed to connect to database")
+    
+    current_release = get_loaded_release(collection_name)
+    if not current_release:
+        raise UploadError(
+            f"No release recorded for '{collection_name}'. "
+            f"Load a full release first or record the loaded one with --set-release"
+        )
+    
+    latest_release = get_latest_release()
+    print(f"Collection '{collection_name}' is at release {current_release}, latest is {latest_release}")
+    
+    stats = {
+        'start_release': current_release,
+        'end_release': current_release,
+        'diffs_applied': 0,
+        'upserted': 0,
+        'modified': 0,
+        'deleted': 0,
+        'errors': 0
+    }
+    
+    if current_release == latest_release:
+        print("✓ Already up to date")
+        return stats
+    
+    diffs = get_release_diffs(dataset_name, current_release, latest_release)
+    if not diffs:
+        raise DownloadError(f"No diffs found from {current_release} to {latest_release}")
+    
+    print(f"Found {len(diffs)} diffs to apply")
+    
+    for diff in diffs:
+        print(f"\n{diff['from_release']} → {diff['to_release']}: "
+              f"{len(diff.get('update_files', []))} update files, "
+              f"{len(diff.get('delete_files', []))} delete files")
+        if dry_run:
+            continue
+        
+        files = download_release_diff(dataset_name, diff, workers, max_bandwidth)
+        diff_stats = apply_release_diff(
+            collection_name, files['update_files'], files['delete_files'],
+            rollups=has_rollups(collection_name, dataset_name)
+        )
+        
+        for key in ('upserted', 'modified', 'deleted', 'errors'):
+            stats[key] += diff_stats[key]
+        
+        if diff_stats['errors']:
+            raise UploadError(
+                f"{diff_stats['errors']} errors applying diff to {diff['to_release']}; "
+                f"'{collection_name}' left at release {stats['end_release']}"
+            )
+        
+        set_loaded_release(collection_name, diff['to_release'])
+        stats['end_release'] = diff['to_release']
+        stats['diffs_applied'] += 1
+        
+        if not keep_files:
+            shutil.rmtree(get_diff_path(dataset_name, diff), ignore_errors=True)
+    
+    if not dry_run:
+        print(f"\n✓ '{collection_name}' updated to release {stats['end_release']}")
+    
+    return stats
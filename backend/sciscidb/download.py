@@ -1,42 +1,307 @@
-"""
-Download datasets from various sources (Semantic Scholar, OpenAlex, etc.)
-"""
-import subprocess
-import os
-from pathlib import Path
-from typing import Optional, List
-import shutil
-
-from .config import config
-
-class DownloadError(Exception):
-    """Exception raised when download fails"""
-    pass
-
 """
 Download datasets from various sources (Semantic Scholar, OpenAlex, etc.)
 """
 import requests
 import json
 import gzip
+import hashlib
+import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Optional, List, Dict
-from urllib.parse import urlparse
+from typing import Any, Callable, Optional, List, Dict, Tuple
 import time
 
 from .config import config
+from .catalog import get_catalog, read_catalog
+from .http_client import TokenBucket, get_http_client
+from .manifest import DownloadManifest, get_metadata_dir, url_hash
 
 class DownloadError(Exception):
     """Exception raised when download fails"""
     pass
 
-def download_semantic_scholar(dataset_name: str, clean_slate: bool = False) -> Path:
+def _bandwidth_limiter(max_bandwidth: Optional[float]) -> Optional[TokenBucket]:
+    """Byte-level token bucket shared by all download workers (max_bandwidth in MB/s)"""
+    if not max_bandwidth:
+        return None
+    bytes_per_sec = max_bandwidth * 1024 * 1024
+    # Allow at most one second of burst
+    return TokenBucket(bytes_per_sec, capacity=bytes_per_sec)
+
+def _expected_size(response: requests.Response, offset: int) -> Optional[int]:
+    """Work out the full size of a shard from a (possibly ranged) response"""
+    content_range = response.headers.get('content-range', '')
+    if '/' in content_range:
+        total = content_range.rsplit('/', 1)[1]
+        if total.isdigit():
+            return int(total)
+    content_length = response.headers.get('content-length')
+    if content_length and content_length.isdigit():
+        return offset + int(content_length)
+    return None
+
+def _is_gzip(file_path: Path) -> bool:
+    """Check for the gzip magic number at the start of a file"""
+    with open(file_path, 'rb') as f:
+        return f.read(2) == b'\x1f\x8b'
+
+def _decompress_stream(source: Path, target: Path, chunk_size: int = 16 * 1024 * 1024):
+    """Inflate a gzip file to disk with a bounded buffer, replacing target atomically"""
+    tmp_target = target.with_name(target.name + '.tmp')
+    with gzip.open(source, 'rb') as gz_file, open(tmp_target, 'wb') as out_file:
+        shutil.copyfileobj(gz_file, out_file, chunk_size)
+    tmp_target.replace(target)
+
+def _download_shard(
+    url: str,
+    index: int,
+    total: int,
+    dataset_name: str,
+    dataset_path: Path,
+    limiter: Optional[TokenBucket] = None,
+    manifest: Optional[DownloadManifest] = None,
+    decompress: bool = False
+) -> Dict[str, Any]:
+    """
+    Download a single shard of a Semantic Scholar dataset
+    
+    Bytes are streamed into a `.part` file. If the manifest shows an earlier
+    attempt at the same URL, the transfer resumes from the end of that file
+    with an HTTP Range request; shards the manifest marks complete are skipped.
+    
+    Gzipped shards are kept as `.json.gz` unless `decompress` is set, in
+    which case they are inflated with bounded buffers rather than in memory.
+    
+    Progress lines are collected rather than printed so that concurrent
+    workers report each shard as one contiguous block.
+    
+    Returns:
+        Dictionary with the shard index, success flag, final path and log lines
+    """
+    log = [f"Downloading file {index}/{total}: {url}"]
+    
+    filename = f"{dataset_name}_{index}"
+    shard_hash = url_hash(url)
+    
+    if manifest and manifest.is_complete(index, shard_hash, dataset_path):
+        existing_file = dataset_path / manifest.get_shard(index)['filename']
+        log.append(f"  → Already downloaded as {existing_file.name}, skipping")
+        return {'index': index, 'success': True, 'skipped': True, 'path': existing_file, 'log': log}
+    
+    part_file = dataset_path / f"{filename}.part"
+    previous = manifest.get_shard(index) if manifest else None
+    offset = 0
+    hasher = hashlib.sha256()
+    
+    if part_file.exists():
+        if previous and previous.get('url_hash') == shard_hash:
+            offset = part_file.stat().st_size
+            # Re-hash what is already on disk so the checksum covers the whole shard
+            with open(part_file, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    hasher.update(block)
+        else:
+            part_file.unlink()
+    
+    # Download file
+    try:
+        expected_size = previous.get('expected_size') if offset else None
+        
+        # A crash between the last byte and the rename leaves nothing to fetch
+        if not (offset and expected_size == offset):
+            request_headers = {'Range': f'bytes={offset}-'} if offset else {}
+            file_response = get_http_client().get(url, headers=request_headers, timeout=300, stream=True)
+            file_response.raise_for_status()
+            
+            if offset and file_response.status_code == 206:
+                log.append(f"  → Resuming from {offset / 1024 / 1024:.1f} MB")
+            elif offset:
+                log.append("  → Server ignored Range request, restarting shard")
+                offset = 0
+                hasher = hashlib.sha256()
+            
+            expected_size = _expected_size(file_response, offset)
+            
+            if manifest:
+                manifest.update_shard(
+                    index,
+                    release_id=manifest.release_id,
+                    url_hash=shard_hash,
+                    expected_size=expected_size,
+                    bytes_written=offset,
+                    status='partial'
+                )
+            
+            # Write raw bytes so a gzip Content-Encoding is not silently undone
+            bytes_written = offset
+            with open(part_file, 'ab' if offset else 'wb') as f:
+                for chunk in file_response.raw.stream(1024 * 1024, decode_content=False):
+                    if chunk:
+                        if limiter:
+                            limiter.consume(len(chunk))
+                        f.write(chunk)
+                        hasher.update(chunk)
+                        bytes_written += len(chunk)
+            
+            if expected_size is not None and bytes_written != expected_size:
+                raise DownloadError(
+                    f"incomplete transfer ({bytes_written} of {expected_size} bytes), will resume on rerun"
+                )
+        
+        # Sniff the gzip magic bytes once instead of trusting headers or extensions
+        is_compressed = _is_gzip(part_file)
+        downloaded_file = dataset_path / f"{filename}.json.gz" if is_compressed else dataset_path / f"{filename}.json"
+        final_file = downloaded_file
+        
+        part_file.replace(downloaded_file)
+        file_size = downloaded_file.stat().st_size
+        checksum = hasher.hexdigest()
+        log.append(f"  ✓ Downloaded {downloaded_file.name} ({file_size / 1024 / 1024:.1f} MB)")
+        
+        # Shards stay compressed by default; the uploader reads .json.gz directly
+        if is_compressed and decompress:
+            final_file = dataset_path / f"{filename}.json"
+            log.append(f"  Decompressing {downloaded_file.name}...")
+            _decompress_stream(downloaded_file, final_file)
+            downloaded_file.unlink()
+            
+            final_size = final_file.stat().st_size
+            log.append(f"  ✓ Decompressed to {final_file.name} ({final_size / 1024 / 1024:.1f} MB)")
+        
+        if manifest:
+            manifest.update_shard(
+                index,
+                filename=final_file.name,
+                bytes_written=file_size,
+                checksum=checksum,
+                status='complete'
+            )
+        
+    except requests.RequestException as e:
+        log.append(f"  ✗ Failed to download file {index}: {e}")
+        _record_partial(manifest, index, part_file)
+        return {'index': index, 'success': False, 'log': log}
+    except Exception as e:
+        log.append(f"  ✗ Error processing file {index}: {e}")
+        _record_partial(manifest, index, part_file)
+        return {'index': index, 'success': False, 'log': log}
+    
+    return {'index': index, 'success': True, 'path': final_file, 'log': log}
+
+def _record_partial(manifest: Optional[DownloadManifest], index: int, part_file: Path):
+    """Record how far an interrupted shard got so the next run can resume it"""
+    if manifest and part_file.exists():
+        manifest.update_shard(index, bytes_written=part_file.stat().st_size, status='partial')
+
+def _s2_api_get(path: str) -> Any:
+    """GET a Semantic Scholar datasets API endpoint and decode its JSON body"""
+    client = get_http_client(config.semantic_scholar_key, config.s2_requests_per_second)
+    response = client.get(f"{config.s2_api_url}/{path.lstrip('/')}", timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+def get_latest_release() -> str:
+    """
+    Get the id of the most recent Semantic Scholar release
+    
+    Raises:
+        DownloadError: If the API lists no releases
+    """
+    releases = _s2_api_get("release/")
+    if not releases:
+        raise DownloadError("No releases found")
+    
+    # Latest release is last in the array
+    return releases[-1]
+
+def _download_files(
+    file_urls: List[str],
+    prefix: str,
+    target_dir: Path,
+    manifest: DownloadManifest,
+    workers: int = 1,
+    max_bandwidth: Optional[float] = None,
+    decompress: bool = False,
+    on_shard: Optional[Callable[[Path], None]] = None,
+    max_attempts: int = 5
+) -> Dict[str, Any]:
+    """
+    Download a list of shard URLs into `target_dir` as `{prefix}_N.json(.gz)`
+    
+    A shard that fails (after the HTTP client's own retries) is attempted
+    again up to `max_attempts` times with backoff, resuming where it stopped.
+    
+    `on_shard` is called from the download thread with the path of every
+    shard that is on disk (freshly downloaded or skipped as complete). A
+    blocking callback, such as a bounded queue `put`, throttles the workers.
+    
+    Returns:
+        Dictionary with the sorted indices of failed files and the skipped count
+    """
+    limiter = _bandwidth_limiter(max_bandwidth)
+    client = get_http_client()
+    
+    def fetch(index: int, url: str) -> Dict[str, Any]:
+        log = []
+        for attempt in range(max_attempts):
+            result = _download_shard(
+                url, index, len(file_urls), prefix, target_dir, limiter, manifest, decompress
+            )
+            log.extend(result['log'] if attempt == 0 else result['log'][1:])
+            if result['success'] or attempt == max_attempts - 1:
+                break
+            # Each retry resumes from the .part file recorded in the manifest
+            delay = client.backoff(attempt)
+            log.append(f"  → Retrying file {index} in {delay:.1f}s (attempt {attempt + 2}/{max_attempts})")
+            time.sleep(delay)
+        result['log'] = log
+        if result['success'] and on_shard:
+            on_shard(result['path'])
+        return result
+    
+    if workers > 1:
+        print(f"Downloading with {workers} workers"
+              + (f" (capped at {max_bandwidth} MB/s)" if max_bandwidth else ""))
+    
+    # Download each file
+    failed = []
+    skipped = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(fetch, i, url) for i, url in enumerate(file_urls, 1)]
+        for future in as_completed(futures):
+            result = future.result()
+            print("\n".join(result['log']))
+            if not result['success']:
+                failed.append(result['index'])
+            elif result.get('skipped'):
+                skipped += 1
+    
+    if skipped:
+        print(f"→ {skipped} files were already complete in the manifest")
+    if failed:
+        print(f"✗ {len(failed)} of {len(file_urls)} files failed: {sorted(failed)}")
+        print("  Rerun the download to resume them")
+    
+    return {'failed': sorted(failed), 'skipped': skipped}
+
+def download_semantic_scholar(
+    dataset_name: str,
+    clean_slate: bool = False,
+    workers: int = 1,
+    max_bandwidth: Optional[float] = None,
+    decompress: bool = False,
+    on_shard: Optional[Callable[[Path], None]] = None
+) -> Path:
     """
     Download dataset from Semantic Scholar API
     
     Args:
         dataset_name: Name of dataset (papers, authors, publication-venues, etc.)
-        clean_slate: Whether to remove existing data first
+        clean_slate: Whether to remove existing data (and its manifest) first
+        workers: Number of shards to download concurrently
+        max_bandwidth: Global bandwidth cap across all workers, in MB/s (None = unlimited)
+        decompress: Inflate gzipped shards to .json (default keeps .json.gz on disk)
+        on_shard: Callback invoked with each shard's path as soon as it is on disk
         
     Returns:
         Path to downloaded dataset directory
@@ -50,49 +315,38 @@ def download_semantic_scholar(dataset_name: str, clean_slate: bool = False) -> P
     if not config.semantic_scholar_key:
         raise DownloadError("S2_API_KEY environment variable not set")
     
+    if workers < 1:
+        raise DownloadError(f"workers must be at least 1, got {workers}")
+    
     # Setup paths
     dataset_path = config.get_dataset_path(dataset_name)
     
     # Handle clean slate
     if clean_slate and dataset_path.exists():
         print(f"Removing existing directory: {dataset_path}")
-        import shutil
         shutil.rmtree(dataset_path)
     
     # Create directory
     dataset_path.mkdir(parents=True, exist_ok=True)
     print(f"Creating directory: {dataset_path}")
     
-    # Setup API headers
-    headers = {"x-api-key": config.semantic_scholar_key}
-    
     try:
         # 1. Get latest release information
         print("Fetching release information...")
-        releases_url = "https://api.semanticscholar.org/datasets/v1/release/"
-        
-        response = requests.get(releases_url, headers=headers, timeout=30)
-        response.raise_for_status()
-        
-        releases = response.json()
-        if not releases:
-            raise DownloadError("No releases found")
-        
-        # Get latest release (last in the array)
-        latest_release = releases[-1]
+        latest_release = get_latest_release()
         print(f"Latest release ID: {latest_release}")
         
-        # 2. Get dataset file URLs
-        dataset_url = f"https://api.semanticscholar.org/datasets/v1/release/{latest_release}/dataset/{dataset_name}"
+        # Resume state from earlier runs against the same release
+        manifest = DownloadManifest(dataset_path)
+        if manifest.start_release(latest_release, dataset_name):
+            print(f"Resuming release {latest_release} from manifest {manifest.path}")
         
+        # 2. Get dataset file URLs
         print(f"Downloading {dataset_name} dataset from release {latest_release}...")
-        response = requests.get(dataset_url, headers=headers, timeout=30)
-        response.raise_for_status()
-        
-        dataset_info = response.json()
+        dataset_info = _s2_api_get(f"release/{latest_release}/dataset/{dataset_name}")
         
-        # Save dataset metadata temporarily
-        metadata_file = dataset_path / f"{dataset_name}.json"
+        # Save dataset metadata temporarily (outside the *.json glob used for uploads)
+        metadata_file = get_metadata_dir(dataset_path) / f"{dataset_name}.json"
         with open(metadata_file, 'w') as f:
             json.dump(dataset_info, f, indent=2)
         
@@ -107,115 +361,20 @@ def download_semantic_scholar(dataset_name: str, clean_slate: bool = False) -> P
             raise DownloadError("No files found in dataset")
         
         print(f"Found {len(file_urls)} files to download")
+        manifest.set_file_count(len(file_urls))
         
-        # Download each file
-        for i, url in enumerate(file_urls, 1):
-            print(f"Downloading file {i}/{len(file_urls)}: {url}")
-            
-            # Determine filename based on URL extension
-            parsed_url = urlparse(url)
-            filename = f"{dataset_name}_{i}"
-            
-            if parsed_url.path.endswith('.json.gz'):
-                downloaded_file = dataset_path / f"{filename}.json.gz"
-                final_file = dataset_path / f"{filename}.json"
-            else:
-                downloaded_file = dataset_path / f"{filename}.json"
-                final_file = downloaded_file
-            
-            # Download file
-            try:
-                file_response = requests.get(url, timeout=300, stream=True)
-                file_response.raise_for_status()
-                
-                # Determine if file is compressed by checking content headers
-                content_type = file_response.headers.get('content-type', '')
-                content_encoding = file_response.headers.get('content-encoding', '')
-                
-                # Check if it's compressed
-                is_compressed = (
-                    'gzip' in content_type.lower() or
-                    'gzip' in content_encoding.lower() or
-                    parsed_url.path.endswith('.json.gz') or
-                    parsed_url.path.endswith('.gz')
-                )
-                
-                # Set filenames based on compression detection
-                if is_compressed:
-                    downloaded_file = dataset_path / f"{filename}.json.gz"
-                    final_file = dataset_path / f"{filename}.json"
-                else:
-                    downloaded_file = dataset_path / f"{filename}.json"
-                    final_file = downloaded_file
-                
-                # Write to file
-                with open(downloaded_file, 'wb') as f:
-                    for chunk in file_response.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-                
-                file_size = downloaded_file.stat().st_size
-                print(f"  ✓ Downloaded {downloaded_file.name} ({file_size / 1024 / 1024:.1f} MB)")
-                
-                # If we detected compression, try to decompress
-                if is_compressed and downloaded_file.name.endswith('.json.gz'):
-                    print(f"  Decompressing {downloaded_file.name}...")
-                    try:
-                        # Test if it's actually compressed by trying to read it
-                        with gzip.open(downloaded_file, 'rt', encoding='utf-8') as gz_file:
-                            # Read just a small chunk to test
-                            test_chunk = gz_file.read(100)
-                        
-                        # If we got here, it's valid gzip, decompress the whole thing
-                        with gzip.open(downloaded_file, 'rt', encoding='utf-8') as gz_file:
-                            with open(final_file, 'w', encoding='utf-8') as out_file:
-                                out_file.write(gz_file.read())
-                        
-                        # Remove compressed file after successful decompression
-                        downloaded_file.unlink()
-                        
-                        final_size = final_file.stat().st_size
-                        print(f"  ✓ Decompressed to {final_file.name} ({final_size / 1024 / 1024:.1f} MB)")
-                        
-                    except (gzip.BadGzipFile, UnicodeDecodeError, OSError) as e:
-                        # Not actually compressed, rename file
-                        print(f"  → File not actually compressed, renaming to .json")
-                        if downloaded_file.exists():
-                            downloaded_file.rename(dataset_path / f"{filename}.json")
-                
-                # Double-check: if file looks like it should be compressed but isn't named .gz
-                elif not is_compressed and downloaded_file.name.endswith('.json'):
-                    # Test if the file is actually gzipped despite headers
-                    try:
-                        with gzip.open(downloaded_file, 'rt', encoding='utf-8') as gz_file:
-                            test_chunk = gz_file.read(100)
-                        
-                        # It is compressed! Rename and decompress
-                        print(f"  → File is actually compressed, fixing...")
-                        compressed_file = dataset_path / f"{filename}.json.gz"
-                        downloaded_file.rename(compressed_file)
-                        
-                        with gzip.open(compressed_file, 'rt', encoding='utf-8') as gz_file:
-                            with open(final_file, 'w', encoding='utf-8') as out_file:
-                                out_file.write(gz_file.read())
-                        
-                        compressed_file.unlink()
-                        final_size = final_file.stat().st_size
-                        print(f"  ✓ Decompressed to {final_file.name} ({final_size / 1024 / 1024:.1f} MB)")
-                        
-                    except (gzip.BadGzipFile, UnicodeDecodeError, OSError):
-                        # Actually not compressed, leave as is
-                        pass
-                
-            except requests.RequestException as e:
-                print(f"  ✗ Failed to download file {i}: {e}")
-                continue
-            except Exception as e:
-                print(f"  ✗ Error processing file {i}: {e}")
-                continue
-            
-            # Small delay between downloads to be respectful
-            time.sleep(0.5)
+        # Inventory shards as they land so --info and uploads never need to scan the directory
+        catalog = get_catalog(dataset_path)
+        catalog.set_release(latest_release)
+        
+        def shard_done(shard_path: Path):
+            catalog.record_shard(shard_path, bytes=shard_path.stat().st_size)
+            if on_shard:
+                on_shard(shard_path)
+        
+        _download_files(
+            file_urls, dataset_name, dataset_path, manifest, workers, max_bandwidth, decompress, shard_done
+        )
         
         # Clean up metadata file
         metadata_file.unlink()
@@ -226,7 +385,8 @@ def download_semantic_scholar(dataset_name: str, clean_slate: bool = False) -> P
         if not downloaded_files:
             raise DownloadError("No files were successfully downloaded")
         
-        print(f"✓ Download complete! Files saved in {dataset_path}/ as {dataset_name}_1.json, {dataset_name}_2.json, etc.")
+        extension = "json" if decompress else "json.gz"
+        print(f"✓ Download complete! Files saved in {dataset_path}/ as {dataset_name}_1.{extension}, {dataset_name}_2.{extension}, etc.")
         return dataset_path
         
     except requests.RequestException as e:
@@ -234,21 +394,286 @@ def download_semantic_scholar(dataset_name: str, clean_slate: bool = False) -> P
     except Exception as e:
         raise DownloadError(f"Download failed: {e}")
 
-def download_openalex(dataset_name: str, clean_slate: bool = False) -> Path:
+def get_release_diffs(dataset_name: str, start_release: str, end_release: str = "latest") -> List[Dict[str, Any]]:
+    """
+    List the diffs that take a dataset from one release to another
+    
+    Args:
+        dataset_name: Name of dataset (papers, authors, etc.)
+        start_release: Release currently loaded
+        end_release: Release to update to ("latest" for the newest one)
+        
+    Returns:
+        Ordered list of diffs, each with from_release, to_release,
+        update_files and delete_files
+    """
+    diff_info = _s2_api_get(f"diffs/{start_release}/to/{end_release}/{dataset_name}")
+    return diff_info.get('diffs', [])
+
+def shard_sort_key(file_path: Path) -> Tuple[bool, int, str]:
+    """
+    Sort key putting `{prefix}_N.json(.gz)` files in the order of their URLs
+    
+    N is the file's 1-based position in the URL list it was downloaded
+    from, so `updates_2` sorts before `updates_10`. Names without a
+    number sort last, by name.
+    """
+    stem = file_path.name.split('.', 1)[0]
+    number = stem.rsplit('_', 1)[-1]
+    if number.isdigit():
+        return (False, int(number), file_path.name)
+    return (True, 0, file_path.name)
+
+def get_diff_path(dataset_name: str, diff: Dict[str, Any]) -> Path:
+    """Get the directory holding the downloaded files of a release diff"""
+    diff_id = f"{diff['from_release']}_to_{diff['to_release']}"
+    return config.get_dataset_path(dataset_name) / "diffs" / diff_id
+
+def download_release_diff(
+    dataset_name: str,
+    diff: Dict[str, Any],
+    workers: int = 1,
+    max_bandwidth: Optional[float] = None
+) -> Dict[str, List[Path]]:
     """
-    Download dataset from OpenAlex (placeholder for future implementation)
+    Download the update and delete files of a single release diff
+    
+    Files land in `<dataset>/diffs/<from>_to_<to>/{updates,deletes}/`, each
+    directory with its own manifest so an interrupted diff resumes like a
+    full release download.
     
     Args:
-        dataset_name: Name of dataset  
+        dataset_name: Name of dataset
+        diff: One entry of `get_release_diffs()`
+        workers: Number of files to download concurrently
+        max_bandwidth: Bandwidth cap, as in download_semantic_scholar
+        
+    Returns:
+        Dictionary with 'update_files' and 'delete_files' paths, in the
+        order the diff lists their URLs
+        
+    Raises:
+        DownloadError: If any file could not be downloaded
+    """
+    diff_path = get_diff_path(dataset_name, diff)
+    diff_id = diff_path.name
+    print(f"Downloading diff {diff_id} for {dataset_name}...")
+    
+    downloaded = {}
+    for kind, key in (("updates", "update_files"), ("deletes", "delete_files")):
+        target_dir = diff_path / kind
+        target_dir.mkdir(parents=True, exist_ok=True)
+        file_urls = diff.get(key, [])
+        
+        print(f"Found {len(file_urls)} {kind} files")
+        if file_urls:
+            manifest = DownloadManifest(target_dir)
+            manifest.start_release(diff_id, dataset_name)
+            result = _download_files(file_urls, kind, target_dir, manifest, workers, max_bandwidth)
+            if result['failed']:
+                raise DownloadError(f"{len(result['failed'])} {kind} files of diff {diff_id} failed to download")
+        
+        downloaded[key] = sorted(
+            list(target_dir.glob("*.json")) + list(target_dir.glob("*.json.gz")),
+            key=shard_sort_key
+        )
+    
+    return downloaded
+
+def _openalex_location(s3_url: str) -> str:
+    """Map an s3://openalex/... manifest URL onto the configured snapshot root"""
+    key = s3_url.split("://", 1)[-1].split("/", 1)[1] if "://" in s3_url else s3_url.lstrip("/")
+    root = config.openalex_snapshot_url
+    if root.startswith(("http://", "https://")):
+        return f"{root}/{key}"
+    return str(Path(root.replace("file://", "", 1)) / key)
+
+def _fetch_openalex_file(
+    location: str,
+    target: Path,
+    expected_size: Optional[int] = None,
+    limiter: Optional[TokenBucket] = None
+):
+    """
+    Copy one snapshot file from an HTTP or local-directory mirror to disk
+    
+    Raises:
+        DownloadError: If the copied size does not match the manifest
+    """
+    target.parent.mkdir(parents=True, exist_ok=True)
+    part_file = target.with_name(target.name + ".part")
+    bytes_written = 0
+    
+    if location.startswith(("http://", "https://")):
+        response = get_http_client().get(location, timeout=300, stream=True)
+        response.raise_for_status()
+        chunks = response.raw.stream(1024 * 1024, decode_content=False)
+        with open(part_file, 'wb') as f:
+            for chunk in chunks:
+                if limiter:
+                    limiter.consume(len(chunk))
+                f.write(chunk)
+                bytes_written += len(chunk)
+    else:
+        with open(location, 'rb') as src, open(part_file, 'wb') as f:
+            for chunk in iter(lambda: src.read(1024 * 1024), b''):
+                if limiter:
+                    limiter.consume(len(chunk))
+                f.write(chunk)
+                bytes_written += len(chunk)
+    
+    if expected_size is not None and bytes_written != expected_size:
+        part_file.unlink()
+        raise DownloadError(f"size mismatch ({bytes_written} bytes, manifest says {expected_size})")
+    
+    part_file.replace(target)
+
+def _read_openalex_manifest(entity: str) -> Dict[str, Any]:
+    """Fetch the snapshot manifest for an OpenAlex entity"""
+    location = _openalex_location(f"data/{entity}/manifest")
+    if location.startswith(("http://", "https://")):
+        response = get_http_client().get(location, timeout=60)
+        response.raise_for_status()
+        return response.json()
+    with open(location, 'r') as f:
+        return json.load(f)
+
+def download_openalex(
+    dataset_name: str,
+    clean_slate: bool = False,
+    workers: int = 1,
+    max_bandwidth: Optional[float] = None,
+    since: Optional[str] = None
+) -> Path:
+    """
+    Download (or incrementally sync) an entity from the OpenAlex snapshot
+    
+    The snapshot is mirrored as `<entity>/updated_date=YYYY-MM-DD/part_NNN.gz`
+    plus its `manifest`. Partitions already on disk with the size listed in
+    the manifest are skipped, so a rerun only fetches new or rewritten
+    partitions; partitions that disappeared from the manifest are removed.
+    Every fetched file is checked against the manifest's content_length.
+    
+    The snapshot root comes from `OPENALEX_SNAPSHOT_URL` and may be an HTTP
+    URL or a local directory with the same layout.
+    
+    Args:
+        dataset_name: OpenAlex entity (works, authors, sources, institutions, etc.)
         clean_slate: Whether to remove existing data first
+        workers: Number of partitions to fetch concurrently
+        max_bandwidth: Bandwidth cap, as in download_semantic_scholar
+        since: Only sync partitions with updated_date on or after this YYYY-MM-DD
         
     Returns:
         Path to downloaded dataset directory
+        
+    Raises:
+        DownloadError: If the manifest cannot be read or any partition fails
     """
-    # TODO: Implement OpenAlex download
-    raise NotImplementedError("OpenAlex download not yet implemented")
+    print(f"Downloading OpenAlex entity: {dataset_name}")
+    
+    if workers < 1:
+        raise DownloadError(f"workers must be at least 1, got {workers}")
+    
+    dataset_path = config.get_dataset_path(f"openalex/{dataset_name}")
+    
+    if clean_slate and dataset_path.exists():
+        print(f"Removing existing directory: {dataset_path}")
+        shutil.rmtree(dataset_path)
+    
+    dataset_path.mkdir(parents=True, exist_ok=True)
+    
+    try:
+        manifest = _read_openalex_manifest(dataset_name)
+    except (requests.RequestException, OSError, json.JSONDecodeError) as e:
+        raise DownloadError(f"Could not read OpenAlex manifest for {dataset_name}: {e}")
+    
+    entries = manifest.get('entries', [])
+    if not entries:
+        raise DownloadError(f"OpenAlex manifest for {dataset_name} lists no files")
+    
+    # Work out local paths relative to the entity directory
+    prefix = f"data/{dataset_name}/"
+    wanted = {}
+    for entry in entries:
+        key = entry['url'].split(prefix, 1)[-1]
+        wanted[dataset_path / key] = entry
+    
+    catalog = get_catalog(dataset_path)
+    
+    # Drop partitions the snapshot no longer lists (merged or rewritten upstream)
+    if not since:
+        stale_partitions = [p for p in dataset_path.glob("updated_date=*/*.gz") if p not in wanted]
+        for stale in stale_partitions:
+            print(f"  → Removing stale partition {stale.parent.name}/{stale.name}")
+            stale.unlink()
+        catalog.forget_shards(stale_partitions)
+    
+    pending = []
+    for target, entry in wanted.items():
+        if since and target.parent.name.split("=", 1)[-1] < since:
+            continue
+        expected_size = entry.get('meta', {}).get('content_length')
+        if target.exists() and (expected_size is None or target.stat().st_size == expected_size):
+            continue
+        pending.append((target, entry, expected_size))
+    
+    total_bytes = sum(size or 0 for _, _, size in pending)
+    print(f"Manifest lists {len(entries)} files; {len(pending)} to fetch "
+          f"({total_bytes / 1024 / 1024 / 1024:.1f} GB)")
+    
+    limiter = _bandwidth_limiter(max_bandwidth)
+    
+    def fetch(target: Path, entry: Dict[str, Any], expected_size: Optional[int]) -> Optional[str]:
+        try:
+            _fetch_openalex_file(_openalex_location(entry['url']), target, expected_size, limiter)
+            return None
+        except (requests.RequestException, OSError, DownloadError) as e:
+            return str(e)
+    
+    failed = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(fetch, *item): item[0] for item in pending}
+        for future in as_completed(futures):
+            target = futures[future]
+            name = f"{target.parent.name}/{target.name}"
+            error = future.result()
+            if error:
+                print(f"  ✗ Failed {name}: {error}")
+                failed.append(name)
+            else:
+                print(f"  ✓ Downloaded {name} ({target.stat().st_size / 1024 / 1024:.1f} MB)")
+    
+    # Keep the manifest next to the partitions, as in the snapshot layout
+    with open(dataset_path / "manifest", 'w') as f:
+        json.dump(manifest, f, indent=2)
+    
+    # The manifest already knows every partition's size and record count
+    catalog.record_shards({
+        target: {
+            'bytes': entry.get('meta', {}).get('content_length'),
+            'lines': entry.get('meta', {}).get('record_count'),
+            'documents': entry.get('meta', {}).get('record_count'),
+        }
+        for target, entry in wanted.items()
+        if target.exists()
+    })
+    
+    if failed:
+        raise DownloadError(f"{len(failed)} of {len(pending)} partitions failed; rerun to fetch them")
+    
+    print(f"✓ OpenAlex {dataset_name} in sync at {dataset_path}/")
+    return dataset_path
 
-def download_dataset(source: str, dataset_name: str, clean_slate: bool = False) -> Path:
+def download_dataset(
+    source: str,
+    dataset_name: str,
+    clean_slate: bool = False,
+    workers: int = 1,
+    max_bandwidth: Optional[float] = None,
+    decompress: bool = False,
+    since: Optional[str] = None
+) -> Path:
     """
     Download dataset from specified source
     
@@ -256,6 +681,10 @@ def download_dataset(source: str, dataset_name: str, clean_slate: bool = False)
         source: Data source (semantic_scholar, openalex)  
         dataset_name: Name of dataset to download
         clean_slate: Whether to remove existing data first
+        workers: Number of files to download concurrently
+        max_bandwidth: Bandwidth cap, as in download_semantic_scholar
+        decompress: Inflate gzipped files instead of keeping them compressed
+        since: OpenAlex only - sync partitions updated on or after YYYY-MM-DD
         
     Returns:
         Path to downloaded dataset directory
@@ -267,19 +696,24 @@ def download_dataset(source: str, dataset_name: str, clean_slate: bool = False)
     print(f"Downloading {dataset_name} from {source}")
     
     if source == "semantic_scholar":
-        return download_semantic_scholar(dataset_name, clean_slate)
+        return download_semantic_scholar(dataset_name, clean_slate, workers, max_bandwidth, decompress)
     elif source == "openalex":
-        return download_openalex(dataset_name, clean_slate)
+        return download_openalex(dataset_name, clean_slate, workers, max_bandwidth, since)
     else:
         available_sources = ["semantic_scholar", "openalex"] 
         raise ValueError(f"Unknown source '{source}'. Available: {available_sources}")
 
-def get_dataset_info(dataset_name: str) -> dict:
+def get_dataset_info(dataset_name: str, refresh: bool = False) -> dict:
     """
     Get information about a downloaded dataset
     
+    Reads the dataset catalog written at download and ingest time. A
+    dataset without a catalog (or with refresh=True) is scanned once and
+    the resulting catalog is persisted for the next call.
+    
     Args:
         dataset_name: Name of dataset
+        refresh: Rescan the directory instead of trusting the catalog
         
     Returns:
         Dictionary with dataset information
@@ -289,23 +723,25 @@ def get_dataset_info(dataset_name: str) -> dict:
     if not dataset_path.exists():
         return {"exists": False, "path": str(dataset_path)}
     
-    # Count files
-    json_files = list(dataset_path.glob("*.json"))
-    gz_files = list(dataset_path.glob("*.json.gz"))
+    catalog = get_catalog(dataset_path)
+    if refresh or read_catalog(dataset_path) is None:
+        catalog.refresh()
     
-    # Calculate total size
-    total_size = sum(f.stat().st_size for f in dataset_path.iterdir() if f.is_file())
+    summary = catalog.summary()
+    names = list(catalog.data["shards"])
+    gz_count = sum(1 for name in names if name.endswith('.gz'))
     
     return {
         "exists": True,
         "path": str(dataset_path),
-        "json_files": len(json_files),
-        "compressed_files": len(gz_files), 
-        "total_files": len(json_files) + len(gz_files),
-        "total_size_mb": round(total_size / 1024 / 1024, 2),
-        "sample_files": [f.name for f in (json_files + gz_files)[:5]]
+        "json_files": len(names) - gz_count,
+        "compressed_files": gz_count, 
+        "total_files": summary["total_files"],
+        "total_size_mb": round(summary["total_bytes"] / 1024 / 1024, 2),
+        "sample_files": names[:5],
+        "release_id": summary["release_id"],
+        "total_lines": summary["total_lines"],
+        "total_documents": summary["total_documents"],
+        "ingest_status": summary["ingest_status"],
+        "catalog_updated_at": summary["updated_at"]
     }
-
-
-    """Download publication-venues dataset from Semantic Scholar"""
-    return download_semantic_scholar("publication-venues", clean_slate)
\ No newline at end of file
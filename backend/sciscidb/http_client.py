@@ -0,0 +1,188 @@
+"""
+Shared HTTP client for dataset downloads: pooled sessions, rate limiting and retries
+"""
+import email.utils
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Statuses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# On a 429 the request rate is multiplied by this, down to MIN_RATE_FRACTION of the configured rate
+RATE_BACKOFF = 0.5
+MIN_RATE_FRACTION = 1 / 64
+# After this many successes in a row, the rate steps back up by RATE_RECOVERY_STEP of the configured rate
+RATE_RECOVERY_REQUESTS = 10
+RATE_RECOVERY_STEP = 0.1
+
+class TokenBucket:
+    """
+    Thread-safe token bucket
+
+    Used both as a request-rate limiter (one token per request) and as a
+    bandwidth cap (one token per byte).
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, tokens: float = 1):
+        """Block until `tokens` are available, then take them"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                # Requests larger than the bucket are let through once it is full
+                needed = min(tokens, self.capacity)
+                if self._tokens >= needed:
+                    self._tokens -= tokens
+                    return
+                wait = (needed - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def set_rate(self, rate: float):
+        """Change the refill rate; tokens accrued so far are kept"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self.rate = rate
+
+def _retry_after_seconds(response: requests.Response) -> Optional[float]:
+    """Parse a Retry-After header given either as seconds or as an HTTP date"""
+    value = response.headers.get('retry-after')
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+class HttpClient:
+    """
+    Pooled `requests.Session` with a request-rate limit and retry policy
+
+    Each GET first takes a token from the client's rate limiter (if any),
+    then retries connection errors, timeouts and RETRY_STATUSES with
+    exponential backoff and full jitter, waiting at least as long as the
+    server's Retry-After header asks.
+
+    The rate limit adapts: every 429 halves it, and each run of
+    RATE_RECOVERY_REQUESTS successes raises it by a step, back up to the
+    configured rate. Clients without a rate limit only back off.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        requests_per_second: Optional[float] = None,
+        max_retries: int = 5,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+        pool_size: int = 16
+    ):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limiter = TokenBucket(requests_per_second, capacity=1) if requests_per_second else None
+        self.max_rate = requests_per_second
+        self._successes = 0
+        self._rate_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if api_key:
+            self.session.headers["x-api-key"] = api_key
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff delay for a 0-based attempt number"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _adapt_rate(self, throttled: bool):
+        """Lower the rate limit after a 429, or raise it after a run of successes"""
+        if not self.rate_limiter:
+            return
+        with self._rate_lock:
+            rate = self.rate_limiter.rate
+            if throttled:
+                self._successes = 0
+                rate = max(self.max_rate * MIN_RATE_FRACTION, rate * RATE_BACKOFF)
+            else:
+                self._successes += 1
+                if self._successes < RATE_RECOVERY_REQUESTS or rate >= self.max_rate:
+                    return
+                self._successes = 0
+                rate = min(self.max_rate, rate + self.max_rate * RATE_RECOVERY_STEP)
+            self.rate_limiter.set_rate(rate)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """
+        GET a URL with rate limiting and retries
+
+        Returns:
+            The first successful (non-retryable) response
+
+        Raises:
+            requests.RequestException: Once retries are exhausted
+        """
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter:
+                self.rate_limiter.consume(1)
+
+            try:
+                response = self.session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self.backoff(attempt))
+                continue
+
+            if response.status_code == 429:
+                self._adapt_rate(throttled=True)
+            elif response.status_code not in RETRY_STATUSES:
+                self._adapt_rate(throttled=False)
+                return response
+
+            if attempt == self.max_retries:
+                response.raise_for_status()
+
+            delay = max(self.backoff(attempt), _retry_after_seconds(response) or 0)
+            response.close()
+            time.sleep(delay)
+
+        raise requests.RequestException(f"Retries exhausted for {url}")
+
+# One client per API key, so the rate limit is shared by everything using that key
+_clients: Dict[Optional[str], HttpClient] = {}
+_clients_lock = threading.Lock()
+
+def get_http_client(api_key: Optional[str] = None, requests_per_second: Optional[float] = None) -> HttpClient:
+    """
+    Get the shared client for an API key, creating it on first use
+
+    Args:
+        api_key: Key sent as x-api-key (None for unauthenticated URLs)
+        requests_per_second: Rate limit applied when the client is created
+
+    Returns:
+        HttpClient shared by all callers using the same key
+    """
+    with _clients_lock:
+        if api_key not in _clients:
+            _clients[api_key] = HttpClient(api_key, requests_per_second)
+        return _clients[api_key]
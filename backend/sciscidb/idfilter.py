@@ -0,0 +1,139 @@
+"""
+In-process filters of document ids already seen during an upload
+
+Semantic Scholar shards can overlap, and a rerun meets every document it
+loaded before. Instead of sending those documents to MongoDB and having
+the unique index reject each one with error 11000, an id filter drops
+repeated ids before the write.
+
+Two kinds are available: an exact set, which costs roughly 100 bytes
+per id, and a Bloom filter sized from the expected number of ids and a
+false positive rate, which needs about 1.2 bytes per id at 1%.
+"""
+import hashlib
+import math
+from typing import Any, Iterable, List, Optional
+
+# Kinds accepted by make_id_filter
+ID_FILTERS = ("exact", "bloom")
+
+# Bloom filter defaults when the number of ids cannot be estimated
+DEFAULT_CAPACITY = 100_000_000
+DEFAULT_ERROR_RATE = 0.001
+
+# Most ids an exact filter may be seeded with (about 2 GB of Python ints per copy)
+MAX_EXACT_SEED = 20_000_000
+
+class ExactIdFilter:
+    """Set of every id seen; never reports an unseen id as seen"""
+
+    exact = True
+
+    def __init__(self):
+        self._seen = set()
+
+    def add(self, doc_id: Any):
+        self._seen.add(doc_id)
+
+    def update(self, doc_ids: Iterable[Any]):
+        self._seen.update(doc_ids)
+
+    def check_and_add(self, doc_id: Any) -> bool:
+        """Record an id, returning whether it had been seen before"""
+        if doc_id in self._seen:
+            return True
+        self._seen.add(doc_id)
+        return False
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def __repr__(self) -> str:
+        return f"exact set ({len(self):,} ids)"
+
+class BloomIdFilter:
+    """
+    Bloom filter over ids: unseen ids can (rarely) be reported as seen
+
+    Bit positions come from double hashing one 128-bit blake2b digest of
+    the id, so the filter is deterministic across processes (Python's
+    own hash() of strings is salted per process).
+    """
+
+    exact = False
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, error_rate: float = DEFAULT_ERROR_RATE):
+        validate_id_filter("bloom", capacity, error_rate)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self._count = 0
+
+    def _positions(self, doc_id: Any) -> List[int]:
+        digest = hashlib.blake2b(repr(doc_id).encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, doc_id: Any):
+        self.check_and_add(doc_id)
+
+    def update(self, doc_ids: Iterable[Any]):
+        for doc_id in doc_ids:
+            self.check_and_add(doc_id)
+
+    def check_and_add(self, doc_id: Any) -> bool:
+        """Record an id, returning whether it may have been seen before"""
+        seen = True
+        bits = self._bits
+        for position in self._positions(doc_id):
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not bits[byte] & mask:
+                seen = False
+                bits[byte] |= mask
+        if not seen:
+            self._count += 1
+        return seen
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __repr__(self) -> str:
+        return (f"Bloom filter ({len(self._bits) / 1024 / 1024:.1f} MB, {self.num_hashes} hashes, "
+                f"{self.capacity:,} ids at {self.error_rate:g} false positives)")
+
+def validate_id_filter(kind: str, capacity: Optional[int] = None, error_rate: float = DEFAULT_ERROR_RATE):
+    """
+    Check id filter arguments without allocating anything
+    
+    Args:
+        kind: 'exact' or 'bloom'
+        capacity: Number of ids a Bloom filter is sized for (None = not chosen yet)
+        error_rate: Bloom filter false positive rate at capacity
+    
+    Raises:
+        ValueError: If the kind or the Bloom parameters are invalid
+    """
+    if kind not in ID_FILTERS:
+        raise ValueError(f"Unknown id filter '{kind}' (choose from {', '.join(ID_FILTERS)})")
+    if kind == "bloom" and ((capacity is not None and capacity <= 0) or not 0 < error_rate < 1):
+        raise ValueError("A Bloom filter needs a positive capacity and an error rate between 0 and 1")
+
+def make_id_filter(kind: str, capacity: int = DEFAULT_CAPACITY, error_rate: float = DEFAULT_ERROR_RATE):
+    """
+    Create an empty id filter
+
+    Args:
+        kind: 'exact' or 'bloom'
+        capacity: Number of ids a Bloom filter is sized for
+        error_rate: Bloom filter false positive rate at capacity
+
+    Raises:
+        ValueError: If the kind or the Bloom parameters are invalid
+    """
+    validate_id_filter(kind, capacity, error_rate)
+    if kind == "exact":
+        return ExactIdFilter()
+    return BloomIdFilter(capacity, error_rate)
@@ -0,0 +1,152 @@
+"""
+Local SQLite ledger of upload progress, used to resume interrupted uploads
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .config import config
+from .manifest import get_metadata_dir
+
+LEDGER_FILENAME = "ledger.sqlite"
+
+# Filesystems where SQLite's WAL mode is unsafe (it needs shared memory between writers)
+NETWORK_FILESYSTEMS = ("nfs", "nfs4", "cifs", "smb3", "smbfs", "lustre", "gpfs", "beegfs", "fuse.sshfs")
+
+def ledger_path(dataset_path: Path) -> Path:
+    """
+    Where a dataset's ledger lives: `.sciscidb/ledger.sqlite`, or under config.ledger_dir
+
+    With SCISCI_LEDGER_DIR set, ledgers of all datasets share that
+    directory, each named after its dataset and a hash of the dataset path.
+    """
+    if config.ledger_dir is None:
+        return get_metadata_dir(dataset_path) / LEDGER_FILENAME
+    config.ledger_dir.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256(str(dataset_path.resolve()).encode('utf-8')).hexdigest()[:12]
+    return config.ledger_dir / f"{dataset_path.name}-{digest}.{LEDGER_FILENAME}"
+
+def on_network_filesystem(path: Path) -> bool:
+    """Whether a path is on a network filesystem, judged from /proc/mounts (False if unknown)"""
+    try:
+        with open("/proc/mounts") as f:
+            mounts = [line.split()[1:3] for line in f]
+    except OSError:
+        return False
+    path = os.path.realpath(path)
+    fs_type, longest = None, -1
+    for mount_point, mount_type in mounts:
+        mount_point = mount_point.replace("\\040", " ")
+        inside = path == mount_point or path.startswith(mount_point.rstrip("/") + "/")
+        if inside and len(mount_point) > longest:
+            fs_type, longest = mount_type, len(mount_point)
+    return fs_type in NETWORK_FILESYSTEMS
+
+# Counters stored per shard, matching upload_file's stats
+STAT_FIELDS = ["processed", "inserted", "duplicates", "modified", "unchanged", "errors"]
+
+class UploadLedger:
+    """
+    Per-shard upload progress for one dataset, committed after every batch
+
+    Each row records, for a (collection, shard) pair, how many source
+    records (lines, or array elements) have been written, the running
+    counts and whether the shard is complete. SQLite keeps every commit
+    durable, so after a crash at most the batch in flight is redone.
+
+    The ledger can be passed to worker processes: each process opens its
+    own connection on first use. On local disks it uses WAL, so workers
+    commit without blocking each other's reads; on network filesystems
+    (e.g. the NFS data share on the HPC), where WAL is not supported, it
+    keeps SQLite's rollback journal. Set SCISCI_LEDGER_DIR to keep the
+    ledgers on a local disk instead.
+    """
+
+    def __init__(self, dataset_path: Path):
+        self.path = ledger_path(dataset_path)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Connections and locks cannot cross process boundaries
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.path = state["path"]
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the ledger database (caller holds the lock)"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+            # WAL lets worker processes commit batches without blocking readers,
+            # but needs shared memory that network filesystems do not provide
+            journal_mode = "DELETE" if on_network_filesystem(self.path.parent) else "WAL"
+            self._conn.execute(f"PRAGMA journal_mode={journal_mode}")
+            self._conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS shards (
+                    collection TEXT NOT NULL,
+                    shard TEXT NOT NULL,
+                    position INTEGER NOT NULL DEFAULT 0,
+                    {", ".join(f"{field} INTEGER NOT NULL DEFAULT 0" for field in STAT_FIELDS)},
+                    status TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (collection, shard)
+                )
+            """)
+            self._conn.commit()
+        return self._conn
+
+    def get(self, collection_name: str, shard: str) -> Optional[Dict[str, Any]]:
+        """Get the recorded progress of a shard, if any"""
+        with self._lock:
+            conn = self._connect()
+            conn.row_factory = sqlite3.Row
+            row = conn.execute(
+                "SELECT * FROM shards WHERE collection = ? AND shard = ?",
+                (collection_name, shard)
+            ).fetchone()
+            return dict(row) if row else None
+
+    def record(
+        self,
+        collection_name: str,
+        shard: str,
+        position: int,
+        stats: Dict[str, int],
+        complete: bool = False
+    ):
+        """Commit a shard's position and running counts after a batch"""
+        values = [stats.get(field, 0) for field in STAT_FIELDS]
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                f"INSERT OR REPLACE INTO shards (collection, shard, position, {', '.join(STAT_FIELDS)}, "
+                f"status, updated_at) VALUES (?, ?, ?, {', '.join('?' * len(STAT_FIELDS))}, ?, ?)",
+                [collection_name, shard, position, *values,
+                 'complete' if complete else 'in_progress',
+                 datetime.now(timezone.utc).isoformat()]
+            )
+            conn.commit()
+
+    def reset(self, collection_name: str):
+        """Forget all progress recorded for a collection"""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM shards WHERE collection = ?", (collection_name,))
+            conn.commit()
+
+    def summary(self, collection_name: str) -> Dict[str, int]:
+        """Count shards per status for a collection"""
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute(
+                "SELECT status, COUNT(*) FROM shards WHERE collection = ? GROUP BY status",
+                (collection_name,)
+            ).fetchall()
+            return {status: count for status, count in rows}
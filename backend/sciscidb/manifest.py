@@ -0,0 +1,129 @@
+"""
+Per-dataset download manifest used to resume interrupted downloads
+"""
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+# Bookkeeping lives in a hidden subdirectory so it is never picked up by the
+# *.json / *.json.gz globs used when uploading a dataset
+METADATA_DIRNAME = ".sciscidb"
+MANIFEST_FILENAME = "manifest.json"
+
+def get_metadata_dir(dataset_path: Path) -> Path:
+    """Get (and create) the bookkeeping directory for a dataset"""
+    metadata_dir = dataset_path / METADATA_DIRNAME
+    metadata_dir.mkdir(parents=True, exist_ok=True)
+    return metadata_dir
+
+def url_hash(url: str) -> str:
+    """
+    Hash a shard URL, ignoring its query string
+
+    Signed S3 URLs get a fresh signature on every API call, so only the
+    host and path identify the underlying shard.
+    """
+    parsed = urlparse(url)
+    return hashlib.sha256(f"{parsed.netloc}{parsed.path}".encode('utf-8')).hexdigest()[:16]
+
+def read_release_id(dataset_path: Path) -> Optional[str]:
+    """
+    Get the release of a fully downloaded dataset without creating anything
+
+    Returns None when there is no manifest or some of the release's shards
+    are still missing, so a partial download is never mistaken for a release.
+    """
+    manifest_path = dataset_path / METADATA_DIRNAME / MANIFEST_FILENAME
+    if not manifest_path.exists():
+        return None
+    try:
+        with open(manifest_path, 'r') as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return None
+
+    file_count = data.get("file_count")
+    completed = sum(1 for shard in data.get("shards", {}).values() if shard.get("status") == "complete")
+    if file_count is not None and completed < file_count:
+        return None
+    return data.get("release_id")
+
+class DownloadManifest:
+    """
+    Track per-shard download state for one dataset
+
+    Each shard entry records its URL hash, expected size, bytes written,
+    sha256 checksum and status ('partial' or 'complete'). The manifest is
+    rewritten atomically on every update and is safe to share between
+    download threads.
+    """
+
+    def __init__(self, dataset_path: Path):
+        self.path = get_metadata_dir(dataset_path) / MANIFEST_FILENAME
+        self._lock = threading.Lock()
+        self.data: Dict[str, Any] = {"release_id": None, "dataset": None, "shards": {}}
+
+        if self.path.exists():
+            try:
+                with open(self.path, 'r') as f:
+                    self.data = json.load(f)
+            except (json.JSONDecodeError, OSError) as e:
+                print(f"Warning: ignoring unreadable manifest {self.path}: {e}")
+
+    @property
+    def release_id(self) -> Optional[str]:
+        return self.data.get("release_id")
+
+    def start_release(self, release_id: str, dataset_name: str) -> bool:
+        """
+        Point the manifest at a release, discarding shard state from any other release
+
+        Returns:
+            True if the manifest already tracked this release
+        """
+        with self._lock:
+            same_release = self.data.get("release_id") == release_id
+            if not same_release:
+                self.data = {"release_id": release_id, "dataset": dataset_name, "shards": {}}
+                self._save()
+            return same_release
+
+    def set_file_count(self, file_count: int):
+        """Record how many shards make up the release"""
+        with self._lock:
+            self.data["file_count"] = file_count
+            self._save()
+
+    def get_shard(self, index: int) -> Optional[Dict[str, Any]]:
+        """Get the recorded state of a shard, if any"""
+        with self._lock:
+            shard = self.data["shards"].get(str(index))
+            return dict(shard) if shard else None
+
+    def update_shard(self, index: int, **fields):
+        """Merge fields into a shard entry and persist the manifest"""
+        with self._lock:
+            shard = self.data["shards"].setdefault(str(index), {"index": index})
+            shard.update(fields)
+            self._save()
+
+    def is_complete(self, index: int, shard_url_hash: str, dataset_path: Path) -> bool:
+        """Check whether a shard was fully downloaded from the same URL and is still on disk"""
+        shard = self.get_shard(index)
+        if not shard or shard.get("status") != "complete":
+            return False
+        if shard.get("url_hash") != shard_url_hash:
+            return False
+        filename = shard.get("filename")
+        return bool(filename) and (dataset_path / filename).exists()
+
+    def _save(self):
+        """Write the manifest atomically (caller holds the lock)"""
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_path, self.path)
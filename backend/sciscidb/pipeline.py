@@ -0,0 +1,203 @@
+"""
+Overlapped download-and-ingest pipeline
+"""
+import queue
+import threading
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from . import decoders
+from .catalog import get_catalog
+from .config import config
+from .database import db_manager
+from .rollups import (
+    clear_rollups_pending,
+    has_rollups,
+    mark_rollups_pending,
+    rebuild_rollups,
+    reset_rollups,
+    rollups_missing,
+    rollups_pending
+)
+from .download import DownloadError, download_semantic_scholar
+from .idfilter import validate_id_filter
+from .transforms import TransformError, get_derived_fields, get_projection
+from .upload import (
+    BatchTuner,
+    UploadError,
+    UploadOptions,
+    prepare_id_filter,
+    prepare_projection,
+    create_id_index,
+    detect_id_field,
+    record_release,
+    summarize_upload,
+    upload_file
+)
+
+# Sentinel telling the ingest stage that no more shards are coming
+_DONE = object()
+
+def ingest_dataset(
+    dataset_name: str,
+    collection_name: Optional[str] = None,
+    clean_slate: bool = False,
+    workers: int = 1,
+    max_bandwidth: Optional[float] = None,
+    queue_size: int = 2,
+    options: Optional[UploadOptions] = None
+) -> Dict[str, Any]:
+    """
+    Download a Semantic Scholar dataset and upload it to MongoDB in one pass
+
+    Download runs in a background thread and hands each finished shard to
+    the upload stage through a bounded queue, so fetching shard N+1
+    overlaps with inserting shard N. When the queue is full the download
+    workers wait, which keeps at most `queue_size` shards buffered on disk
+    ahead of the uploader.
+
+    Shards already completed in the download manifest are not fetched
+    again but are still queued for upload. Shards are inserted in this
+    process, so `options` may not ask for another mode, worker processes,
+    a resume or a no-write run; the rest apply as in upload_to_mongodb.
+
+    Args:
+        dataset_name: Name of dataset (papers, authors, publication-venues, etc.)
+        collection_name: MongoDB collection (defaults to dataset_name)
+        clean_slate: Whether to drop the existing collection first
+        workers: Number of shards to download concurrently
+        max_bandwidth: Bandwidth cap, as in download_semantic_scholar
+        queue_size: Maximum number of downloaded shards waiting for upload
+        options: Ingest settings (defaults: UploadOptions())
+
+    Returns:
+        Dictionary with upload statistics, as returned by upload_to_mongodb
+
+    Raises:
+        DownloadError: If the download stage fails
+        UploadError: If the upload stage fails
+    """
+    collection_name = collection_name or dataset_name
+    options = options or UploadOptions()
+    if options.mode != "insert" or options.processes > 1 or options.resume or options.no_write:
+        raise UploadError("The ingest pipeline only inserts in this process; "
+                          "use upload_to_mongodb for other modes, processes, resume or no-write runs")
+    if options.id_filter:
+        try:
+            validate_id_filter(options.id_filter, options.id_filter_capacity, options.id_filter_error_rate)
+        except ValueError as e:
+            raise UploadError(str(e))
+
+    print(f"Ingesting {dataset_name} into collection '{collection_name}'")
+    try:
+        print(f"JSON decoder: {decoders.set_backend(options.json_decoder)}")
+    except decoders.DecoderError as e:
+        raise UploadError(str(e))
+
+    try:
+        projection = get_projection(collection_name, options.fields, options.exclude_fields)
+    except TransformError as e:
+        raise UploadError(str(e))
+
+    try:
+        db_manager.set_write_profile(options.write_profile or "default")
+    except ValueError as e:
+        raise UploadError(str(e))
+    
+    if not db_manager.connect():
+        raise UploadError("Failed to connect to database")
+
+    collection = db_manager.get_collection(collection_name)
+    rollups = options.rollups
+    if rollups is None:
+        rollups = has_rollups(collection_name, dataset_name)
+    options = replace(options, rollups=rollups)
+
+    if clean_slate:
+        print(f"Clean slate requested: dropping collection '{collection_name}'")
+        collection.drop()
+        reset_rollups(collection)
+    elif rollups and (rollups_pending(collection) or rollups_missing(collection)):
+        rebuild_rollups(collection)
+    if rollups:
+        mark_rollups_pending(collection)
+
+    shards: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+    aborted = threading.Event()
+    download_errors: List[Exception] = []
+
+    def enqueue(shard_path: Path):
+        # Poll so download workers do not block forever if ingest has failed
+        while not aborted.is_set():
+            try:
+                shards.put(shard_path, timeout=1)
+                return
+            except queue.Full:
+                continue
+        raise DownloadError("Ingest stage stopped, abandoning download")
+
+    def download():
+        try:
+            download_semantic_scholar(
+                dataset_name,
+                workers=workers,
+                max_bandwidth=max_bandwidth,
+                on_shard=enqueue
+            )
+        except Exception as e:
+            download_errors.append(e)
+        finally:
+            shards.put(_DONE)
+
+    downloader = threading.Thread(target=download, name=f"download-{dataset_name}", daemon=True)
+    downloader.start()
+
+    id_field = seen_ids = None
+    derived = get_derived_fields(collection_name) if options.derive_fields else {}
+    tuner = BatchTuner(options.batch_size, options.batch_bytes, options.target_latency)
+    file_stats = []
+    catalog = get_catalog(config.get_dataset_path(dataset_name))
+
+    try:
+        while True:
+            shard_path = shards.get()
+            if shard_path is _DONE:
+                break
+
+            try:
+                # The first shard to arrive decides the ID field and its index
+                if id_field is None:
+                    id_field = detect_id_field(collection_name, [shard_path])
+                    create_id_index(collection, id_field)
+                    projection = prepare_projection(projection, id_field, derived)
+                    if options.id_filter:
+                        seen_ids = prepare_id_filter(options, collection, id_field, catalog)
+
+                file_stats.append(upload_file(
+                    collection, shard_path, id_field, options, catalog,
+                    projection=projection, derived=derived, tuner=tuner, seen_ids=seen_ids
+                ))
+            except UploadError:
+                raise
+            except Exception as e:
+                # e.g. a DecoderError or a lost connection, reported like upload.py does
+                raise UploadError(f"Ingest of {shard_path.name} failed: {e}") from e
+    except BaseException:
+        aborted.set()
+        raise
+    finally:
+        downloader.join(timeout=0 if aborted.is_set() else None)
+
+    if download_errors:
+        raise DownloadError(f"Download stage failed after {len(file_stats)} shards: {download_errors[0]}")
+
+    if id_field is None:
+        raise UploadError(f"No shards were downloaded for {dataset_name}")
+
+    stats = summarize_upload(len(file_stats), file_stats, id_field)
+    record_release(config.get_dataset_path(dataset_name), collection_name, stats)
+    if rollups and not stats['total_errors']:
+        clear_rollups_pending(collection)
+
+    return stats
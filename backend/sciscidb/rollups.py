@@ -0,0 +1,237 @@
+"""
+Rollup collections of paper counts, kept current by the upload path
+
+Each rollup holds one small document per (label, year), e.g.
+`{"_id": {"venue": "Nature", "year": 2020}, "count": 1234}` in
+`rollup_venue_year`. Uploads add the documents they write with bulk
+`$inc` upserts, and replacements and deletions subtract what they
+overwrite, so the sync scripts can read counts without scanning papers.
+
+A write and the flush of its counts are separate steps, so a load marks
+the rollups pending until it finishes cleanly. A load that finds them
+still pending (the previous one was interrupted between the two)
+rebuilds them from the collection before writing.
+
+Counts follow the same rules as database.get_venue_year_counts and
+database.get_s2fieldsofstudy_year_counts (years 1900-2030, non-null
+venues, every s2-fos-model entry with uncategorised ones under a null
+field) and reflect documents as stored, after projection.
+"""
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import DeleteMany, UpdateOne
+
+# Years counted, as in the full-scan aggregations
+MIN_YEAR = 1900
+MAX_YEAR = 2030
+
+# Fields a stored paper needs for its rollup keys
+ROLLUP_FIELDS = ["venue", "year", "s2fieldsofstudy"]
+
+def _valid_year(year: Any) -> bool:
+    return isinstance(year, (int, float)) and not isinstance(year, bool) and MIN_YEAR <= year <= MAX_YEAR
+
+def venue_year_keys(doc: Dict[str, Any]) -> List[Tuple[Any, Any]]:
+    """The (venue, year) a paper counts toward, if any"""
+    venue, year = doc.get("venue"), doc.get("year")
+    if venue is None or not _valid_year(year):
+        return []
+    return [(venue, year)]
+
+def field_year_keys(doc: Dict[str, Any]) -> List[Tuple[Any, Any]]:
+    """One (category, year) per s2-fos-model entry of a paper"""
+    year = doc.get("year")
+    if not _valid_year(year):
+        return []
+    return [
+        (field.get("category"), year)
+        for field in doc.get("s2fieldsofstudy") or []
+        if isinstance(field, dict) and field.get("source") == "s2-fos-model"
+    ]
+
+# Rollup name -> (label field, function giving a document's keys)
+ROLLUPS: Dict[str, Tuple[str, Callable[[Dict[str, Any]], List[Tuple[Any, Any]]]]] = {
+    "venue_year": ("venue", venue_year_keys),
+    "field_year": ("field", field_year_keys),
+}
+
+# Pipelines computing each rollup from scratch, ending in the rollup document shape
+_REBUILD_PIPELINES: Dict[str, List[Dict[str, Any]]] = {
+    "venue_year": [
+        {"$match": {
+            "venue": {"$exists": True, "$ne": None},
+            "year": {"$exists": True, "$ne": None, "$gte": MIN_YEAR, "$lte": MAX_YEAR}
+        }},
+        {"$group": {"_id": {"venue": "$venue", "year": "$year"}, "count": {"$sum": 1}}},
+    ],
+    "field_year": [
+        {"$match": {
+            "s2fieldsofstudy": {"$elemMatch": {"source": "s2-fos-model"}},
+            "year": {"$exists": True, "$ne": None, "$gte": MIN_YEAR, "$lte": MAX_YEAR}
+        }},
+        {"$unwind": "$s2fieldsofstudy"},
+        {"$match": {"s2fieldsofstudy.source": "s2-fos-model"}},
+        {"$group": {"_id": {"field": {"$ifNull": ["$s2fieldsofstudy.category", None]}, "year": "$year"}, "count": {"$sum": 1}}},
+    ],
+}
+
+def has_rollups(collection_name: str, dataset_name: Optional[str] = None) -> bool:
+    """Whether uploads maintain rollups by default: into the papers collection, or from the papers dataset"""
+    return "papers" in (collection_name, dataset_name)
+
+def rollup_name(collection_name: str, rollup: str) -> str:
+    """Collection holding a rollup: `rollup_venue_year` for papers, prefixed for other collections"""
+    if collection_name == "papers":
+        return f"rollup_{rollup}"
+    return f"{collection_name}_rollup_{rollup}"
+
+class RollupCounter:
+    """
+    Pending rollup changes for one paper collection, written with flush()
+
+    Changes are summed in memory per (label, year), so a batch costs one
+    unordered bulk_write of `$inc` upserts per rollup, however many
+    papers it holds.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        self._deltas: Dict[str, Counter] = {rollup: Counter() for rollup in ROLLUPS}
+
+    def keys(self, doc: Dict[str, Any]) -> Dict[str, List[Tuple[Any, Any]]]:
+        """A document's keys in every rollup"""
+        return {rollup: keys_of(doc) for rollup, (_, keys_of) in ROLLUPS.items()}
+
+    def _apply(self, keys: Dict[str, List[Tuple[Any, Any]]], sign: int):
+        for rollup, rollup_keys in keys.items():
+            deltas = self._deltas[rollup]
+            for key in rollup_keys:
+                deltas[key] += sign
+
+    def add(self, docs: Iterable[Dict[str, Any]]):
+        """Count newly written documents"""
+        for doc in docs:
+            self._apply(self.keys(doc), 1)
+
+    def snapshot(self, id_field: str, ids: List[Any]) -> Dict[Any, Dict[str, List[Tuple[Any, Any]]]]:
+        """Rollup keys of the stored documents with these ids, read before they are overwritten"""
+        projection = {field: 1 for field in ROLLUP_FIELDS}
+        projection[id_field] = 1
+        return {
+            doc[id_field]: self.keys(doc)
+            for doc in self.collection.find({id_field: {"$in": ids}}, projection)
+        }
+
+    def replace(self, stored: Dict[Any, Dict[str, List[Tuple[Any, Any]]]], docs: Iterable[Dict[str, Any]], id_field: str):
+        """Count documents that replaced (or were upserted over) the `stored` snapshot"""
+        current = dict(stored)
+        for doc in docs:
+            doc_id = doc[id_field]
+            if doc_id in current:
+                self._apply(current[doc_id], -1)
+            current[doc_id] = self.keys(doc)
+            self._apply(current[doc_id], 1)
+
+    def remove(self, stored: Dict[Any, Dict[str, List[Tuple[Any, Any]]]]):
+        """Uncount deleted documents, given their snapshot"""
+        for keys in stored.values():
+            self._apply(keys, -1)
+
+    def flush(self) -> int:
+        """
+        Write pending changes as `$inc` upserts, dropping counts that reach zero
+
+        Returns:
+            Number of rollup documents updated
+        """
+        updated = 0
+        db = self.collection.database
+        for rollup, deltas in self._deltas.items():
+            label, _ = ROLLUPS[rollup]
+            requests = [
+                UpdateOne({"_id": {label: key[0], "year": key[1]}}, {"$inc": {"count": delta}}, upsert=True)
+                for key, delta in deltas.items() if delta
+            ]
+            if not requests:
+                continue
+            # Only counts that went down can have reached zero
+            lowered = [{label: key[0], "year": key[1]} for key, delta in deltas.items() if delta < 0]
+            if lowered:
+                requests.append(DeleteMany({"_id": {"$in": lowered}, "count": {"$lte": 0}}))
+            db[rollup_name(self.collection.name, rollup)].bulk_write(requests, ordered=True)
+            updated += len(deltas)
+            deltas.clear()
+        return updated
+
+def reset_rollups(collection):
+    """Drop a collection's rollups (when the collection itself is dropped)"""
+    for rollup in ROLLUPS:
+        collection.database.drop_collection(rollup_name(collection.name, rollup))
+    clear_rollups_pending(collection)
+
+def _state(collection):
+    return collection.database[rollup_name(collection.name, "state")]
+
+def mark_rollups_pending(collection):
+    """Record that counts are about to be written, before the first write of a load"""
+    _state(collection).replace_one({"_id": "pending"}, {"_id": "pending"}, upsert=True)
+
+def clear_rollups_pending(collection):
+    """Record that every write of a load has had its counts flushed"""
+    _state(collection).delete_one({"_id": "pending"})
+
+def rollups_pending(collection) -> bool:
+    """Whether a load stopped between writing documents and flushing their counts"""
+    return _state(collection).find_one({"_id": "pending"}) is not None
+
+def rollups_missing(collection) -> bool:
+    """Whether a collection has documents but no rollups yet (loaded before rollups existed)"""
+    db = collection.database
+    return (
+        collection.estimated_document_count() > 0
+        and not any(db[rollup_name(collection.name, rollup)].estimated_document_count() for rollup in ROLLUPS)
+    )
+
+def rebuild_rollups(collection) -> Dict[str, int]:
+    """
+    Recompute a collection's rollups with one aggregation each
+
+    Used for collections loaded before rollups existed, after an
+    interrupted load left them pending, and after bulk loads whose
+    dedupe pass removed documents.
+
+    Returns:
+        Number of rollup documents per rollup
+    """
+    counts = {}
+    for rollup, pipeline in _REBUILD_PIPELINES.items():
+        name = rollup_name(collection.name, rollup)
+        print(f"Rebuilding {name} from '{collection.name}'...")
+        collection.aggregate(pipeline + [{"$out": name}], allowDiskUse=True)
+        counts[rollup] = collection.database[name].estimated_document_count()
+        print(f"  ✓ {counts[rollup]} rows")
+    clear_rollups_pending(collection)
+    return counts
+
+def read_rollup(db, collection_name: str, rollup: str, labels: Optional[List[Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Read a rollup as `{label: ..., "year": ..., "count": ...}` rows sorted by label and year
+
+    Args:
+        db: MongoDB database holding the rollup
+        collection_name: Paper collection the rollup was built from
+        rollup: 'venue_year' or 'field_year'
+        labels: Only return these venues (or fields)
+    """
+    label, _ = ROLLUPS[rollup]
+    query: Dict[str, Any] = {"count": {"$gt": 0}}
+    if labels:
+        query[f"_id.{label}"] = {"$in": labels}
+    rows = [
+        {label: doc["_id"][label], "year": doc["_id"]["year"], "count": doc["count"]}
+        for doc in db[rollup_name(collection_name, rollup)].find(query)
+    ]
+    # Null labels first, as in the full-scan counts
+    rows.sort(key=lambda row: (row[label] is not None, row[label] or "", row["year"]))
+    return rows
@@ -0,0 +1,316 @@
+"""
+Seekable zstd shard store with a memory-mapped id index
+
+Rewrites downloaded JSON Lines shards into independent zstd frames and
+builds a sorted index from record id to (frame, offset, length), so a
+single record can be pulled from disk without touching MongoDB or
+scanning hundreds of GB of JSONL.
+
+Requires the optional `zstandard` package (`pip install sciscidb[shards]`).
+"""
+import gzip
+import hashlib
+import heapq
+import json
+import mmap
+import struct
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from . import decoders
+from .config import config
+from .manifest import get_metadata_dir
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+STORE_DIRNAME = "shards"
+
+# How index keys are derived from ids; stores built with another scheme must be rebuilt
+KEY_SCHEME = "blake2b64-str"
+
+# Index record: id key, global frame number, offset and length inside the decompressed frame
+INDEX_RECORD = struct.Struct("<qIII")
+# Frame record: shard number, offset and length of the compressed frame in the shard's .zst file
+FRAME_RECORD = struct.Struct("<IQI")
+
+class ShardStoreError(Exception):
+    """Exception raised when the shard store cannot be built or read"""
+    pass
+
+def _require_zstd():
+    if zstandard is None:
+        raise ShardStoreError("The shard store needs the 'zstandard' package: pip install zstandard")
+
+def get_store_path(dataset_name: str) -> Path:
+    """Get the directory holding a dataset's shard store"""
+    return get_metadata_dir(config.get_dataset_path(dataset_name)) / STORE_DIRNAME
+
+def id_key(record_id: Any) -> int:
+    """
+    Index key of a record id: a signed 64-bit hash of its string form
+
+    Integer, string and UUID ids all get a key, and 215416146 and
+    "215416146" get the same one. Different ids can share a key, so
+    lookups check the id of every record stored under it.
+    """
+    digest = hashlib.blake2b(str(record_id).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little', signed=True)
+
+def store_file_name(shard_file: Path) -> str:
+    """
+    Name of a shard's .zst file in the store
+
+    The full shard name is kept, so `x.json` and `x.json.gz`, or names
+    with extra dots, never share a .zst file.
+    """
+    return shard_file.name + ".zst"
+
+def _iter_lines(file_path: Path) -> Iterator[bytes]:
+    """Yield the non-empty raw lines of a .json or .json.gz JSON Lines shard"""
+    opener = gzip.open if file_path.name.endswith('.gz') else open
+    with opener(file_path, 'rb') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+
+def _iter_run(run_file: BinaryIO) -> Iterator[Tuple[int, int, int, int]]:
+    """Read back a sorted run of index records"""
+    run_file.seek(0)
+    while True:
+        chunk = run_file.read(INDEX_RECORD.size * 65536)
+        if not chunk:
+            return
+        yield from INDEX_RECORD.iter_unpack(chunk)
+
+def build_shard_store(
+    dataset_name: str,
+    frame_records: int = 1000,
+    level: int = 3,
+    id_field: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Rewrite a dataset's shards into seekable zstd frames and index them by id
+
+    Each shard becomes `<shard file name>.zst`, a concatenation of
+    independent zstd frames of `frame_records` lines (still a valid
+    multi-frame zstd file). Records are indexed by id_key of their id.
+    Index entries are sorted per shard into temporary runs and merged, so
+    memory stays bounded by the largest shard.
+
+    Args:
+        dataset_name: Name of dataset (papers, authors, etc.)
+        frame_records: Number of records per zstd frame (smaller = faster lookups)
+        level: zstd compression level
+        id_field: Id field (detected from the first record when None)
+
+    Returns:
+        Dictionary with shard, frame, record and skipped counts
+
+    Raises:
+        ShardStoreError: If zstandard is missing, no shards are found or no id field is found
+    """
+    _require_zstd()
+    from .upload import get_id_field_for_collection
+
+    dataset_path = config.get_dataset_path(dataset_name)
+    shard_files = sorted(
+        list(dataset_path.glob("*.json")) + list(dataset_path.glob("*.json.gz")),
+        key=lambda f: f.name
+    )
+    if not shard_files:
+        raise ShardStoreError(f"No JSON files found in {dataset_path}")
+
+    store_path = get_store_path(dataset_name)
+    store_path.mkdir(parents=True, exist_ok=True)
+    print(f"Building shard store for {dataset_name} in {store_path}")
+
+    compressor = zstandard.ZstdCompressor(level=level)
+    shard_names: List[str] = []
+    runs: List[BinaryIO] = []
+    frame_number = 0
+    stats = {'shards': 0, 'frames': 0, 'records': 0, 'skipped': 0}
+
+    with open(store_path / "frames.bin", 'wb') as frames_out:
+        for shard_number, shard_file in enumerate(shard_files):
+            entries = []
+            store_file = store_path / store_file_name(shard_file)
+            shard_names.append(store_file.name)
+
+            with open(store_file, 'wb') as zst_out:
+                frame_lines: List[bytes] = []
+                frame_ids: List[Any] = []
+
+                def flush_frame():
+                    nonlocal frame_number
+                    if not frame_lines:
+                        return
+                    offset = 0
+                    for record_id, line in zip(frame_ids, frame_lines):
+                        if record_id is not None:
+                            entries.append((record_id, frame_number, offset, len(line)))
+                        offset += len(line) + 1
+                    compressed = compressor.compress(b"\n".join(frame_lines) + b"\n")
+                    frames_out.write(FRAME_RECORD.pack(shard_number, zst_out.tell(), len(compressed)))
+                    zst_out.write(compressed)
+                    frame_number += 1
+                    frame_lines.clear()
+                    frame_ids.clear()
+
+                for line in _iter_lines(shard_file):
+                    if line.startswith(b"["):
+                        print(f"  → Skipping {shard_file.name}: JSON array shards are not supported")
+                        break
+                    try:
+                        doc = decoders.loads(line)
+                    except ValueError:
+                        stats['skipped'] += 1
+                        continue
+                    if id_field is None:
+                        id_field = get_id_field_for_collection(dataset_name, doc)
+                        if id_field is None:
+                            raise ShardStoreError("Could not determine ID field from sample documents")
+                        print(f"Using ID field: '{id_field}'")
+                    record_id = doc.get(id_field) if isinstance(doc, dict) else None
+                    if record_id is None:
+                        stats['skipped'] += 1
+                    else:
+                        record_id = id_key(record_id)
+                    frame_lines.append(line)
+                    frame_ids.append(record_id)
+                    if len(frame_lines) >= frame_records:
+                        flush_frame()
+                flush_frame()
+
+            entries.sort()
+            run = tempfile.TemporaryFile(dir=store_path)
+            for entry in entries:
+                run.write(INDEX_RECORD.pack(*entry))
+            runs.append(run)
+            stats['records'] += len(entries)
+            stats['shards'] += 1
+            print(f"  ✓ {shard_file.name}: {len(entries):,} records")
+
+    stats['frames'] = frame_number
+
+    # .zst files of shards that are gone, or named by an older build
+    for stale in set(store_path.glob("*.zst")) - {store_path / name for name in shard_names}:
+        stale.unlink()
+
+    # k-way merge of the per-shard runs into the final sorted index
+    with open(store_path / "index.bin", 'wb') as index_out:
+        for entry in heapq.merge(*(_iter_run(run) for run in runs)):
+            index_out.write(INDEX_RECORD.pack(*entry))
+    for run in runs:
+        run.close()
+
+    with open(store_path / "shards.json", 'w') as f:
+        json.dump({"id_field": id_field, "key_scheme": KEY_SCHEME, "shard_files": shard_names, **stats}, f, indent=2)
+
+    _stores.pop(dataset_name, None)
+    print(f"✓ Indexed {stats['records']:,} records in {stats['frames']:,} frames "
+          f"({stats['skipped']:,} without a usable id)")
+    return stats
+
+class ShardStore:
+    """Read-only view of a built shard store"""
+
+    def __init__(self, store_path: Path):
+        _require_zstd()
+        if not (store_path / "index.bin").exists():
+            raise ShardStoreError(f"No shard store at {store_path}; run build_shard_store first")
+
+        with open(store_path / "shards.json", 'r') as f:
+            self.meta = json.load(f)
+        if self.meta.get("key_scheme") != KEY_SCHEME:
+            raise ShardStoreError(f"The shard store at {store_path} uses an older index format; rebuild it")
+        self.store_path = store_path
+        self.shard_names = self.meta["shard_files"]
+        self._index = self._map(store_path / "index.bin")
+        self._frames = self._map(store_path / "frames.bin")
+        self._size = len(self._index) // INDEX_RECORD.size if self._index else 0
+        self._local = threading.local()
+
+    @staticmethod
+    def _map(path: Path) -> Optional[mmap.mmap]:
+        if path.stat().st_size == 0:
+            return None
+        with open(path, 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _find(self, key: int) -> Iterator[Tuple[int, int, int, int]]:
+        """Binary search the memory-mapped index for every entry with a key"""
+        lo, hi = 0, self._size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if INDEX_RECORD.unpack_from(self._index, mid * INDEX_RECORD.size)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        while lo < self._size:
+            entry = INDEX_RECORD.unpack_from(self._index, lo * INDEX_RECORD.size)
+            if entry[0] != key:
+                return
+            yield entry
+            lo += 1
+
+    def _read(self, frame: int, offset: int, length: int) -> bytes:
+        """Read one record line out of its frame"""
+        shard_number, frame_offset, frame_length = FRAME_RECORD.unpack_from(
+            self._frames, frame * FRAME_RECORD.size
+        )
+        with open(self.store_path / self.shard_names[shard_number], 'rb') as f:
+            f.seek(frame_offset)
+            compressed = f.read(frame_length)
+        # Decompressor contexts are not thread-safe, so keep one per thread
+        if not hasattr(self._local, "decompressor"):
+            self._local.decompressor = zstandard.ZstdDecompressor()
+        return self._local.decompressor.decompress(compressed)[offset:offset + length]
+
+    def _lookup(self, record_id: Any) -> Tuple[Optional[bytes], Optional[Dict[str, Any]]]:
+        """Raw line and decoded record of an id, checked against the record's own id"""
+        wanted = str(record_id)
+        for _, frame, offset, length in self._find(id_key(record_id)):
+            raw = self._read(frame, offset, length)
+            doc = decoders.loads(raw)
+            if str(doc.get(self.meta["id_field"])) == wanted:
+                return raw, doc
+        return None, None
+
+    def get_raw(self, record_id: Any) -> Optional[bytes]:
+        """Get the raw JSON line of a record, or None if the id is not indexed"""
+        return self._lookup(record_id)[0]
+
+    def get(self, record_id: Any) -> Optional[Dict[str, Any]]:
+        """Get a decoded record, or None if the id is not indexed"""
+        return self._lookup(record_id)[1]
+
+    def __len__(self) -> int:
+        return self._size
+
+# Opened stores, keyed by dataset name
+_stores: Dict[str, ShardStore] = {}
+
+def open_store(dataset_name: str) -> ShardStore:
+    """Open (and cache) the shard store of a dataset"""
+    if dataset_name not in _stores:
+        _stores[dataset_name] = ShardStore(get_store_path(dataset_name))
+    return _stores[dataset_name]
+
+def get(dataset_name: str, record_id: Any) -> Optional[Dict[str, Any]]:
+    """
+    Look up one record by id straight from the shard store
+
+    Args:
+        dataset_name: Name of dataset (papers, authors, etc.)
+        record_id: Value of the dataset's id field (e.g. corpusid), as int or str
+
+    Returns:
+        The decoded record, or None if the id is not in the store
+    """
+    return open_store(dataset_name).get(record_id)
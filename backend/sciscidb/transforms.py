@@ -0,0 +1,182 @@
+"""
+Per-document transforms applied at ingest time, before documents reach MongoDB
+
+Derived fields are computed first (from the full record), then the
+collection's projection prunes fields.
+"""
+import json
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .config import config
+
+class TransformError(Exception):
+    """Exception raised when a transform spec is invalid"""
+    pass
+
+##############
+# PROJECTION #
+##############
+
+def _compile_paths(paths: List[str]) -> Dict[str, Any]:
+    """
+    Turn dotted paths into a tree of nested dicts, with None marking a whole value
+
+    ["venue", "authors.authorId"] -> {"venue": None, "authors": {"authorId": None}}
+    """
+    tree: Dict[str, Any] = {}
+    for path in paths:
+        parts = path.strip().split('.')
+        node = tree
+        for part in parts[:-1]:
+            child = node.get(part, {})
+            if child is None:
+                # An ancestor is already kept or dropped whole
+                break
+            node[part] = child
+            node = child
+        else:
+            node[parts[-1]] = None
+    return tree
+
+def _include(doc: Dict[str, Any], tree: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a copy of doc holding only the paths in tree (arrays are projected element-wise)"""
+    projected = {}
+    for key, subtree in tree.items():
+        if key not in doc:
+            continue
+        value = doc[key]
+        if subtree is None:
+            projected[key] = value
+        elif isinstance(value, dict):
+            projected[key] = _include(value, subtree)
+        elif isinstance(value, list):
+            projected[key] = [_include(item, subtree) for item in value if isinstance(item, dict)]
+    return projected
+
+def _exclude(doc: Dict[str, Any], tree: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop the paths in tree from doc in place (arrays are pruned element-wise)"""
+    for key, subtree in tree.items():
+        if key not in doc:
+            continue
+        value = doc[key]
+        if subtree is None:
+            del doc[key]
+        elif isinstance(value, dict):
+            _exclude(value, subtree)
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, dict):
+                    _exclude(item, subtree)
+    return doc
+
+class Projection:
+    """
+    Field whitelist or blacklist applied to every document of a collection
+
+    Paths are dotted (e.g. `authors.authorId`) and, like MongoDB
+    projections, reach into arrays of subdocuments.
+    """
+
+    def __init__(self, include: Optional[List[str]] = None, exclude: Optional[List[str]] = None):
+        if include and exclude:
+            raise TransformError("A projection can either include or exclude fields, not both")
+        if not include and not exclude:
+            raise TransformError("A projection needs fields to include or exclude")
+        self.include = list(include or [])
+        self.exclude = list(exclude or [])
+        self._tree = _compile_paths(self.include or self.exclude)
+
+    def keeping(self, field: str) -> "Projection":
+        """Get a projection that never drops `field` (used for the id field)"""
+        if self.include:
+            return Projection(include=self.include + [field]) if field not in self.include else self
+        return Projection(exclude=[path for path in self.exclude if path != field])
+
+    def apply(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Project one document"""
+        if self.include:
+            return _include(doc, self._tree)
+        return _exclude(doc, self._tree)
+
+    def __repr__(self) -> str:
+        if self.include:
+            return f"include {', '.join(self.include)}"
+        return f"exclude {', '.join(self.exclude)}"
+
+def load_projection_specs(spec_file: Optional[Path] = None) -> Dict[str, Dict[str, List[str]]]:
+    """
+    Read per-collection projection specs from a JSON file
+
+    The file maps collection names to `{"include": [...]}` or
+    `{"exclude": [...]}`. Defaults to config.projection_file.
+
+    Raises:
+        TransformError: If the file cannot be read
+    """
+    spec_file = spec_file or config.projection_file
+    if not spec_file:
+        return {}
+    try:
+        with open(spec_file, 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise TransformError(f"Could not read projection file {spec_file}: {e}")
+
+def get_projection(
+    collection_name: str,
+    include: Optional[List[str]] = None,
+    exclude: Optional[List[str]] = None,
+    spec_file: Optional[Path] = None
+) -> Optional[Projection]:
+    """
+    Get the projection for a collection
+
+    Explicit include/exclude lists win; otherwise the collection's entry
+    in the projection file is used. Returns None when no fields are pruned.
+    """
+    if include or exclude:
+        return Projection(include, exclude)
+    spec = load_projection_specs(spec_file).get(collection_name)
+    if not spec:
+        return None
+    return Projection(spec.get("include"), spec.get("exclude"))
+
+##################
+# DERIVED FIELDS #
+##################
+
+def primary_s2field(doc: Dict[str, Any]) -> Optional[str]:
+    """First s2-fos-model category of a paper (same rule as database.add_primary_s2field)"""
+    for field in doc.get("s2fieldsofstudy") or []:
+        if isinstance(field, dict) and field.get("source") == "s2-fos-model":
+            return field.get("category")
+    return None
+
+# Fields computed from each document at ingest, per collection
+DERIVED_FIELDS: Dict[str, Dict[str, Callable[[Dict[str, Any]], Any]]] = {
+    "papers": {
+        "primary_s2field": primary_s2field,
+    },
+}
+
+def register_derived_field(collection_name: str, field: str, func: Callable[[Dict[str, Any]], Any]):
+    """
+    Compute `field` with `func` for every document loaded into a collection
+
+    `func` must be a module-level function so it can be sent to upload
+    worker processes. Returning None leaves the field unset.
+    """
+    DERIVED_FIELDS.setdefault(collection_name, {})[field] = func
+
+def get_derived_fields(collection_name: str) -> Dict[str, Callable[[Dict[str, Any]], Any]]:
+    """Get the derived fields registered for a collection"""
+    return dict(DERIVED_FIELDS.get(collection_name, {}))
+
+def apply_derived_fields(doc: Dict[str, Any], derived: Dict[str, Callable[[Dict[str, Any]], Any]]) -> Dict[str, Any]:
+    """Set each derived field on doc in place, skipping those that come out None"""
+    for field, func in derived.items():
+        value = func(doc)
+        if value is not None:
+            doc[field] = value
+    return doc
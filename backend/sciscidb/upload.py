@@ -1,24 +1,117 @@
 """
 Upload datasets to MongoDB
 """
-import json
 import gzip
-import jsonlines
+import mmap
+import multiprocessing
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, replace
+from functools import partial
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-from pymongo.errors import BulkWriteError
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple
+from pymongo import DeleteMany, ReplaceOne
+from pymongo.errors import BulkWriteError, OperationFailure
 from tqdm import tqdm
 import logging
 
+from . import decoders
 from .config import config
-from .database import db_manager
+from .database import DatabaseManager, create_performance_indexes, db_manager, set_loaded_release
+from .catalog import DatasetCatalog, get_catalog
+from .idfilter import DEFAULT_CAPACITY, DEFAULT_ERROR_RATE, MAX_EXACT_SEED, make_id_filter, validate_id_filter
+from .ledger import STAT_FIELDS, UploadLedger
+from .rollups import (
+    RollupCounter,
+    clear_rollups_pending,
+    has_rollups,
+    mark_rollups_pending,
+    rebuild_rollups,
+    reset_rollups,
+    rollups_missing,
+    rollups_pending
+)
+from .transforms import (
+    Projection,
+    TransformError,
+    apply_derived_fields,
+    get_derived_fields,
+    get_projection
+)
+from .manifest import read_release_id
 
 logger = logging.getLogger(__name__)
 
+# Documents per insert_many call; bounds upload memory instead of the shard size
+DEFAULT_BATCH_SIZE = 10000
+
+# Adaptive batch sizing never goes outside these limits
+MIN_BATCH_SIZE = 100
+MAX_BATCH_SIZE = 100000
+MIN_BATCH_BYTES = 1024 * 1024
+MAX_BATCH_BYTES = 256 * 1024 * 1024
+
+# Uncompressed JSON Lines shards larger than this are split into newline-aligned
+# byte ranges of about this size, parsed by separate worker processes
+RANGE_BYTES = 128 * 1024 * 1024
+
+# Ingest stages timed per file: read/decompress, JSON decode, id filter (with its MongoDB
+# lookups), derive/project, MongoDB write, rollup flush
+STAGES = ["read", "decode", "filter", "transform", "write", "rollups"]
+
+# insert: skip documents whose id already exists; upsert: replace them in place;
+# bulk: load an index-free collection and build indexes (deduplicating) at the end
+UPLOAD_MODES = ("insert", "upsert", "bulk")
+
 class UploadError(Exception):
     """Exception raised when upload fails"""
     pass
 
+@dataclass
+class UploadOptions:
+    """
+    How a dataset is read and written, shared by every ingest entry point
+    
+    Attributes:
+        batch_size: Maximum documents per write
+        batch_bytes: Maximum source bytes per write (None = count only)
+        target_latency: Seconds per write to tune batch sizes toward (None = fixed)
+        mode: 'insert' skips existing ids, 'upsert' replaces them in place,
+            'bulk' loads an empty unindexed collection and builds indexes at the end
+        resume: Continue an interrupted upload from the ledger
+        processes: Worker processes, each with its own MongoClient (1 = this process)
+        json_decoder: JSON backend (auto, orjson, msgspec, json; None = config)
+        write_profile: 'default' or 'bulk' (None = 'bulk' in bulk mode)
+        fields: Dotted paths to keep (None = config.projection_file; the id is always kept)
+        exclude_fields: Dotted paths to drop
+        derive_fields: Compute the collection's transforms.DERIVED_FIELDS
+        no_write: Read, decode and transform only, never touching MongoDB
+        id_filter: Drop ids already seen in the run before writing: 'exact', 'bloom' or None
+        id_filter_capacity: Ids a Bloom filter is sized for (None = estimate_id_capacity)
+        id_filter_error_rate: Bloom filter false positive rate
+        id_filter_seed: Load the ids already in the collection into the filter first
+        rollups: Keep the venue/year and field/year rollups current (None = only for papers)
+    """
+    batch_size: int = DEFAULT_BATCH_SIZE
+    batch_bytes: Optional[int] = None
+    target_latency: Optional[float] = None
+    mode: str = "insert"
+    resume: bool = False
+    processes: int = 1
+    json_decoder: Optional[str] = None
+    write_profile: Optional[str] = None
+    fields: Optional[List[str]] = None
+    exclude_fields: Optional[List[str]] = None
+    derive_fields: bool = True
+    no_write: bool = False
+    id_filter: Optional[str] = None
+    id_filter_capacity: Optional[int] = None
+    id_filter_error_rate: float = DEFAULT_ERROR_RATE
+    id_filter_seed: bool = False
+    rollups: Optional[bool] = None
+
 def get_id_field_for_collection(collection_name: str, sample_doc: Dict[str, Any]) -> Optional[str]:
     """
     Determine the correct ID field for different Semantic Scholar collections
@@ -55,246 +148,1211 @@ def get_id_field_for_collection(collection_name: str, sample_doc: Dict[str, Any]
     
     return None
 
-def upload_to_mongodb(
-    dataset_path: Path, 
-    collection_name: str, 
-    clean_slate: bool = False
-) -> Dict[str, int]:
+def detect_id_field(collection_name: str, files: List[Path]) -> str:
     """
-    Upload JSON dataset files to MongoDB
+    Determine the ID field by looking at the first readable document
     
-    Args:
-        dataset_path: Path to directory containing JSON files
-        collection_name: Name of MongoDB collection
-        clean_slate: Whether to drop existing collection first
-        
-    Returns:
-        Dictionary with upload statistics
-        
     Raises:
-        UploadError: If upload fails
+        UploadError: If no sample document yields an ID field
     """
-    if not dataset_path.exists():
-        raise UploadError(f"Dataset path does not exist: {dataset_path}")
-    
-    if not dataset_path.is_dir():
-        raise UploadError(f"Dataset path is not a directory: {dataset_path}")
-    
-    print(f"Uploading dataset from {dataset_path} to collection '{collection_name}'")
-    
-    # Connect to database
-    if not db_manager.connect():
-        raise UploadError("Failed to connect to database")
-    
-    collection = db_manager.get_collection(collection_name)
-    
-    # Handle clean slate
-    if clean_slate:
-        print(f"Clean slate requested: dropping collection '{collection_name}'")
-        collection.drop()
-    
-    # Find all JSON files in the dataset directory
-    json_files = list(dataset_path.glob("*.json"))
-    gz_files = list(dataset_path.glob("*.json.gz"))
-    all_files = json_files + gz_files
-    
-    if not all_files:
-        raise UploadError(f"No JSON files found in {dataset_path}")
-    
-    print(f"Found {len(all_files)} files to process")
-    
-    # Determine ID field by looking at first document
-    id_field = None
     print("Determining ID field...")
     
-    for file_path in all_files:
+    for file_path in files:
         try:
             sample_doc = _get_first_document(file_path)
             if sample_doc:
                 id_field = get_id_field_for_collection(collection_name, sample_doc)
                 if id_field:
                     print(f"Using ID field: '{id_field}'")
-                    break
+                    return id_field
         except Exception as e:
             continue
     
-    if not id_field:
-        raise UploadError("Could not determine ID field from sample documents")
+    raise UploadError("Could not determine ID field from sample documents")
+
+class BatchTuner:
+    """
+    Batch size limits for one upload, optionally tuned toward a target write latency
+    
+    After every write, the per-document round-trip time is measured and
+    the next batch is resized (by count, and proportionally by bytes when
+    a byte cap is set) so a write takes about `target_latency` seconds.
+    Changes are smoothed and at most double the size at a time. Without
+    a target the limits stay fixed.
+    """
+    
+    def __init__(
+        self,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        batch_bytes: Optional[int] = None,
+        target_latency: Optional[float] = None
+    ):
+        self.batch_size = batch_size
+        self.batch_bytes = batch_bytes
+        self.target_latency = target_latency
+        self.batches = 0
+        self.documents = 0
+        self.write_seconds = 0.0
     
-    # Create unique index on the determined ID field
+    def record(self, documents: int, seconds: float):
+        """Account for one write and resize the next batch"""
+        self.batches += 1
+        self.documents += documents
+        self.write_seconds += seconds
+        if not self.target_latency or not documents or seconds <= 0:
+            return
+        
+        ideal = self.target_latency / (seconds / documents)
+        size = int(min(self.batch_size * 2, (self.batch_size + ideal) / 2))
+        size = max(MIN_BATCH_SIZE, min(MAX_BATCH_SIZE, size))
+        if self.batch_bytes:
+            scaled = int(self.batch_bytes * size / self.batch_size)
+            self.batch_bytes = max(MIN_BATCH_BYTES, min(MAX_BATCH_BYTES, scaled))
+        self.batch_size = size
+
+def build_indexes_after_load(collection, id_field: str, papers: bool = False) -> int:
+    """
+    Build the unique id index after a bulk load, deduplicating if needed
+    
+    If the index build fails on duplicate ids, a dedupe pass keeps the
+    last loaded copy of each id and the build is retried. The papers
+    performance indexes are built afterwards when `papers` is set.
+    
+    Returns:
+        Number of duplicate documents removed
+    """
+    print(f"Building unique index on '{id_field}' after bulk load...")
+    removed = 0
+    try:
+        collection.create_index(id_field, unique=True)
+    except OperationFailure as e:
+        if e.code != 11000:
+            raise
+        print("  → Duplicate ids found, running dedupe pass")
+        removed = _dedupe_keep_last(collection, id_field)
+        print(f"  ✓ Removed {removed} duplicate documents")
+        collection.create_index(id_field, unique=True)
+    print("  ✓ Index created successfully")
+    
+    if papers:
+        create_performance_indexes(collection.name)
+    
+    return removed
+
+def _dedupe_keep_last(collection, id_field: str, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Delete all but the last inserted copy (highest ObjectId) of every duplicated id"""
+    duplicates = collection.aggregate([
+        {"$group": {"_id": f"${id_field}", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}}
+    ], allowDiskUse=True)
+    
+    removed = 0
+    stale_ids = []
+    for group in tqdm(duplicates, desc="Deduplicating"):
+        # ObjectIds increase with insertion time, so the maximum is the last copy
+        stale_ids.extend(sorted(group["ids"])[:-1])
+        if len(stale_ids) >= batch_size:
+            removed += collection.delete_many({"_id": {"$in": stale_ids}}).deleted_count
+            stale_ids = []
+    if stale_ids:
+        removed += collection.delete_many({"_id": {"$in": stale_ids}}).deleted_count
+    return removed
+
+def create_id_index(collection, id_field: str):
+    """Create the unique index on the ID field that duplicate detection relies on"""
     print(f"Creating unique index on '{id_field}' field...")
     try:
         collection.create_index(id_field, unique=True)
         print("  ✓ Index created successfully")
     except Exception as e:
         print(f"  → Index note: {e} (may already exist)")
+
+def upload_file(
+    collection,
+    file_path: Path,
+    id_field: str,
+    options: Optional[UploadOptions] = None,
+    catalog: Optional[DatasetCatalog] = None,
+    ledger: Optional[UploadLedger] = None,
+    projection: Optional[Projection] = None,
+    derived: Optional[Dict[str, Callable[[Dict[str, Any]], Any]]] = None,
+    tuner: Optional[BatchTuner] = None,
+    seen_ids=None,
+    byte_range: Optional[Tuple[int, int]] = None
+) -> Dict[str, int]:
+    """
+    Stream one dataset file into the collection in batches
     
-    # Upload statistics
-    total_processed = 0
-    total_inserted = 0
-    total_duplicates = 0
-    total_errors = 0
+    Documents are read lazily and written a batch at a time, so peak
+    memory is bounded by the batch rather than the shard. With a ledger,
+    the shard's position is committed after every batch written in full:
+    a complete shard is skipped, an interrupted one continues after its
+    last committed batch, and a batch with failed writes stops the shard
+    so a resumed upload sends it again. With a byte range, only the JSON
+    Lines between those offsets are read, under their own ledger entry.
     
-    # Process each file
-    for file_path in all_files:
-        print(f"\nProcessing {file_path.name}...")
-        
-        try:
-            documents = _read_json_file(file_path, id_field)
+    `options.mode`, `options.no_write` and `options.rollups` apply as
+    given (upload_to_mongodb resolves a None rollups first).
+    
+    Args:
+        collection: MongoDB collection to write to (None when not writing)
+        file_path: .json or .json.gz file to read
+        id_field: Documents without this field are skipped
+        options: Ingest settings (defaults: UploadOptions())
+        catalog: Dataset catalog to record the outcome in
+        ledger: Upload ledger to resume from and record progress in
+        projection: Fields to keep or drop before documents are written
+        derived: Derived fields (name -> function of the document) to compute
+        tuner: Batch limits shared across files (default: from options)
+        seen_ids: Id filter shared across the run's files (see sciscidb.idfilter)
+        byte_range: (start, end) offsets of the part of a JSON Lines file to read
+    
+    Returns:
+        Dictionary with processed, inserted, duplicates, modified,
+        unchanged and errors counts, batches, lines, the final batch_size
+        and the seconds spent in each of STAGES (e.g. decode_seconds)
+    """
+    options = options or UploadOptions()
+    # Ledger key and display name; a byte range is named after its start offset
+    shard = file_path.name if byte_range is None else f"{file_path.name}@{byte_range[0]}"
+    print(f"\nProcessing {shard}...")
+    file_stats = _empty_file_stats()
+    start = position = 0
+    tuner = tuner or BatchTuner(options.batch_size, options.batch_bytes, options.target_latency)
+    
+    progress = ledger.get(collection.name, shard) if ledger else None
+    if progress:
+        file_stats.update({field: progress[field] for field in STAT_FIELDS})
+        if progress['status'] == 'complete':
+            print(f"  → Already uploaded according to the ledger, skipping")
+            _record_ingest(catalog, file_path, collection.name, file_stats)
+            return file_stats
+        start = position = progress['position']
+        print(f"  → Resuming after record {start} ({file_stats['processed']} documents already written)")
+    
+    timings = {'read': 0.0, 'decode': 0.0}
+    filtered = 0
+    # Position after the last batch written in full
+    committed = start
+    # A no-write run never touches MongoDB: no id filter lookups, rollups or catalog
+    counter = RollupCounter(collection) if options.rollups and not options.no_write else None
+    try:
+        if byte_range is None:
+            records = _iter_json_file(file_path, id_field, start, timings)
+        else:
+            records = _iter_byte_range(file_path, id_field, byte_range, start, timings)
+        documents = tqdm(records, desc=f"Reading {shard}")
+        for batch, position in _iter_batches(documents, tuner):
+            file_stats['processed'] += len(batch)
+            if seen_ids is not None and not options.no_write:
+                started = time.perf_counter()
+                unseen = _drop_seen_ids(collection, batch, id_field, seen_ids)
+                filtered += len(batch) - len(unseen)
+                file_stats['duplicates'] += len(batch) - len(unseen)
+                batch = unseen
+                file_stats['filter_seconds'] += time.perf_counter() - started
+            started = time.perf_counter()
+            if derived:
+                batch = [apply_derived_fields(doc, derived) for doc in batch]
+            if projection:
+                batch = [projection.apply(doc) for doc in batch]
+            file_stats['transform_seconds'] += time.perf_counter() - started
             
-            if not documents:
-                print(f"  No valid documents found in {file_path.name}")
+            if options.no_write:
                 continue
             
-            print(f"  Read {len(documents)} documents with '{id_field}' field")
-            total_processed += len(documents)
-            
-            # Insert documents with duplicate handling
-            insert_stats = _insert_documents(collection, documents)
-            total_inserted += insert_stats['inserted']
-            total_duplicates += insert_stats['duplicates'] 
-            total_errors += insert_stats['errors']
-            
-            print(f"  ✓ Inserted: {insert_stats['inserted']}, "
-                  f"Duplicates: {insert_stats['duplicates']}, "
-                  f"Errors: {insert_stats['errors']}")
+            if batch:
+                started = time.perf_counter()
+                if options.mode == "upsert":
+                    write_stats = _upsert_documents(collection, batch, id_field, counter)
+                else:
+                    # Insert documents with duplicate handling
+                    write_stats = _insert_documents(collection, batch, counter)
+                elapsed = time.perf_counter() - started
+                tuner.record(len(batch), elapsed)
+                
+                for key, value in write_stats.items():
+                    file_stats[key] += value
+                file_stats['write_seconds'] += elapsed
+                file_stats['batches'] += 1
+                
+                if counter:
+                    started = time.perf_counter()
+                    counter.flush()
+                    file_stats['rollups_seconds'] += time.perf_counter() - started
+                
+                # Leave the ledger before this batch, so --resume sends it again
+                if write_stats['errors']:
+                    raise UploadError(f"{write_stats['errors']} documents of the batch after position {committed} failed to write")
             
-        except Exception as e:
-            print(f"  ✗ Error processing {file_path.name}: {e}")
-            total_errors += 1
-            continue
+            if ledger:
+                ledger.record(collection.name, shard, position, file_stats)
+            committed = position
+        
+        if ledger:
+            ledger.record(collection.name, shard, position, file_stats, complete=True)
+        file_stats['lines'] = timings.get('records')
+        
+        if not file_stats['processed']:
+            print(f"  No valid documents found in {shard}")
+        else:
+            print(f"  Read {file_stats['processed']} documents with '{id_field}' field")
+            if filtered:
+                print(f"  → Id filter dropped {filtered} repeated ids before writing")
+            if options.no_write:
+                print(f"  ✓ Parsed and transformed (not written)")
+            elif options.mode == "upsert":
+                print(f"  ✓ Inserted: {file_stats['inserted']}, "
+                      f"Modified: {file_stats['modified']}, "
+                      f"Unchanged: {file_stats['unchanged']}, "
+                      f"Errors: {file_stats['errors']}")
+            else:
+                print(f"  ✓ Inserted: {file_stats['inserted']}, "
+                      f"Duplicates: {file_stats['duplicates']}, "
+                      f"Errors: {file_stats['errors']}")
+        
+    except Exception as e:
+        print(f"  ✗ Error processing {shard}: {e}")
+        if ledger:
+            print(f"  → Rerun with --resume to continue {shard} from its last written batch")
+        file_stats['errors'] += 1
     
-    # Final statistics
+    file_stats['read_seconds'] += timings['read']
+    file_stats['decode_seconds'] += timings['decode']
+    file_stats['batch_size'] = tuner.batch_size
+    if not options.no_write:
+        _record_ingest(catalog, file_path, collection.name, file_stats)
+    return file_stats
+
+def _empty_file_stats() -> Dict[str, Any]:
+    # lines stays None unless the whole shard was read in this run
+    stats = {'processed': 0, 'inserted': 0, 'duplicates': 0, 'modified': 0, 'unchanged': 0, 'errors': 0, 'batches': 0,
+             'lines': None}
+    stats.update({f"{stage}_seconds": 0.0 for stage in STAGES})
+    return stats
+
+def _record_ingest(
+    catalog: Optional[DatasetCatalog],
+    file_path: Path,
+    collection_name: str,
+    file_stats: Dict[str, int]
+):
+    """Record a shard's ingest outcome, and its line count once it has been read in full, in the dataset catalog"""
+    if catalog is None:
+        return
+    fields = {}
+    if file_stats.get('lines') is not None:
+        fields['lines'] = file_stats['lines']
+    catalog.record_shard(
+        file_path,
+        documents=file_stats['processed'],
+        ingest_status='failed' if file_stats['errors'] else 'ingested',
+        collection=collection_name,
+        **fields
+    )
+
+def summarize_upload(
+    files_processed: int,
+    file_stats: List[Dict[str, int]],
+    id_field: str,
+    mode: str = "insert",
+    deduplicated: int = 0,
+    settings: Optional[Dict[str, Any]] = None,
+    elapsed: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Combine per-file statistics into the final upload stats and print them
+    
+    Documents removed by a post-load dedupe pass (`deduplicated`) count
+    as duplicates rather than inserts. When `elapsed` wall time is given,
+    throughput, write latency and the final batch size are added along
+    with the write `settings` used.
+    """
     stats = {
-        'files_processed': len(all_files),
-        'total_processed': total_processed,
-        'total_inserted': total_inserted,
-        'total_duplicates': total_duplicates,
-        'total_errors': total_errors,
+        'files_processed': files_processed,
+        'total_processed': sum(s['processed'] for s in file_stats),
+        'total_inserted': sum(s['inserted'] for s in file_stats) - deduplicated,
+        'total_duplicates': sum(s['duplicates'] for s in file_stats) + deduplicated,
+        'total_errors': sum(s['errors'] for s in file_stats),
         'id_field_used': id_field
     }
+    if mode == "upsert":
+        stats['total_modified'] = sum(s.get('modified', 0) for s in file_stats)
+        stats['total_unchanged'] = sum(s.get('unchanged', 0) for s in file_stats)
     
-    print(f"\n✓ Upload complete!")
+    if stats['total_errors']:
+        print(f"\n✗ Upload finished with errors; shards that failed are left for --resume")
+    else:
+        print(f"\n✓ Upload complete!")
     print(f"Files processed: {stats['files_processed']}")
     print(f"Documents processed: {stats['total_processed']}")
     print(f"Documents inserted: {stats['total_inserted']}")
-    print(f"Duplicates skipped: {stats['total_duplicates']}")
+    if mode == "upsert":
+        print(f"Documents modified: {stats['total_modified']}")
+        print(f"Documents unchanged: {stats['total_unchanged']}")
+    else:
+        print(f"Duplicates skipped: {stats['total_duplicates']}")
     print(f"Errors: {stats['total_errors']}")
     print(f"ID field used: {stats['id_field_used']}")
     
+    if elapsed is not None:
+        batches = sum(s.get('batches', 0) for s in file_stats)
+        write_seconds = sum(s.get('write_seconds', 0.0) for s in file_stats)
+        batch_sizes = [s['batch_size'] for s in file_stats if 'batch_size' in s]
+        stats.update(settings or {})
+        stats['elapsed_seconds'] = round(elapsed, 1)
+        stats['docs_per_second'] = round(stats['total_processed'] / elapsed) if elapsed > 0 else 0
+        stats['avg_write_latency'] = round(write_seconds / batches, 3) if batches else None
+        stats['final_batch_size'] = round(sum(batch_sizes) / len(batch_sizes)) if batch_sizes else None
+        
+        if settings:
+            print(f"Write settings: {', '.join(f'{k}={v}' for k, v in settings.items())}")
+        writes = f"{batches} batches, {stats['avg_write_latency']}s average write" if batches else "no writes"
+        print(f"Throughput: {stats['docs_per_second']:,} docs/s over {stats['elapsed_seconds']}s ({writes})")
+        print(f"Final batch size: {stats['final_batch_size']}")
+        
+        # Per-stage time; read/decode run inside worker processes when parallel
+        stats['stages'] = {}
+        print("Stage timings:")
+        for stage in STAGES:
+            seconds = sum(s.get(f"{stage}_seconds", 0.0) for s in file_stats)
+            rate = round(stats['total_processed'] / seconds) if seconds > 0 else None
+            stats['stages'][stage] = {'seconds': round(seconds, 2), 'docs_per_second': rate}
+            print(f"  {stage:<10} {seconds:10.2f}s  {f'{rate:,} docs/s' if rate else '-'}")
+    
     return stats
 
-def _get_first_document(file_path: Path) -> Optional[Dict[str, Any]]:
-    """Get the first document from a file to inspect its structure"""
+def record_release(dataset_path: Path, collection_name: str, stats: Dict[str, Any]):
+    """Remember which release the collection reflects so diffs can be applied later"""
+    release_id = read_release_id(dataset_path)
+    if release_id and stats['total_errors'] == 0:
+        set_loaded_release(collection_name, release_id)
+        print(f"Recorded release {release_id} for '{collection_name}'")
+
+def upload_to_mongodb(
+    dataset_path: Path, 
+    collection_name: str, 
+    clean_slate: bool = False,
+    options: Optional[UploadOptions] = None
+) -> Dict[str, int]:
+    """
+    Upload JSON dataset files to MongoDB
+    
+    Shards are streamed with upload_file, in this process or spread over
+    `options.processes` worker processes, and their progress is committed
+    to the dataset's upload ledger after every batch. Without
+    `options.resume` the collection's ledger entries are cleared first.
+    The collection's projection and derived fields are applied on the way
+    in, and its rollups are dropped with it on a clean slate and rebuilt
+    first if a previous load left them pending (see sciscidb.rollups).
+    
+    Args:
+        dataset_path: Path to directory containing JSON files
+        collection_name: Name of MongoDB collection
+        clean_slate: Whether to drop existing collection first
+        options: Ingest settings (defaults: UploadOptions())
+        
+    Returns:
+        Dictionary with upload statistics, the write settings used, the
+        throughput and the time spent in each of STAGES
+        
+    Raises:
+        UploadError: If the options are invalid or the upload fails to start
+    """
+    started = time.monotonic()
+    options = options or UploadOptions()
+    mode = options.mode
+    no_write = options.no_write
+    
+    if mode not in UPLOAD_MODES:
+        raise UploadError(f"Unknown upload mode '{mode}' (choose from {', '.join(UPLOAD_MODES)})")
+    
+    if options.resume and clean_slate:
+        raise UploadError("Cannot resume an upload and start from a clean slate at the same time")
+    
+    if options.id_filter:
+        try:
+            validate_id_filter(options.id_filter, options.id_filter_capacity, options.id_filter_error_rate)
+        except ValueError as e:
+            raise UploadError(str(e))
+    
+    if options.id_filter and mode != "insert":
+        # Upsert and bulk loads keep the last copy of an id, the filter the first
+        raise UploadError("The id filter can only be used in insert mode")
+    
+    if options.id_filter_seed and not options.id_filter:
+        raise UploadError("Seeding the id filter needs an id filter ('exact' or 'bloom')")
+    
+    if no_write and options.id_filter:
+        # Its hits would be confirmed against MongoDB, which a no-write run never touches
+        print("No-write benchmark: the id filter is not used")
+        options = replace(options, id_filter=None, id_filter_seed=False)
+    
     try:
-        if file_path.name.endswith('.json.gz'):
-            with gzip.open(file_path, 'rt', encoding='utf-8') as f:
-                line = f.readline().strip()
-                if line:
-                    return json.loads(line)
-        elif file_path.name.endswith('.json'):
-            # Try multiple approaches for .json files
-            
-            # First try: JSON Lines
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    first_line = f.readline().strip()
-                    if first_line:
-                        return json.loads(first_line)
-            except (json.JSONDecodeError, UnicodeDecodeError):
-                pass
-            
-            # Second try: Regular JSON array
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    if isinstance(data, list) and data:
-                        return data[0]
-                    elif isinstance(data, dict):
-                        return data
-            except (json.JSONDecodeError, UnicodeDecodeError):
-                pass
-            
-            # Third try: jsonlines library (sometimes works when manual doesn't)
+        projection = get_projection(collection_name, options.fields, options.exclude_fields)
+    except TransformError as e:
+        raise UploadError(str(e))
+    
+    # Resolve the decoder before anything is connected to or dropped
+    try:
+        json_decoder = decoders.set_backend(options.json_decoder)
+    except decoders.DecoderError as e:
+        raise UploadError(str(e))
+    
+    if not dataset_path.exists():
+        raise UploadError(f"Dataset path does not exist: {dataset_path}")
+    
+    if not dataset_path.is_dir():
+        raise UploadError(f"Dataset path is not a directory: {dataset_path}")
+    
+    if no_write:
+        print(f"No-write benchmark of {dataset_path}: documents are read, decoded and transformed only")
+    else:
+        print(f"Uploading dataset from {dataset_path} to collection '{collection_name}' ({mode} mode)")
+    
+    write_profile = options.write_profile or ("bulk" if mode == "bulk" else "default")
+    try:
+        client_options = db_manager.set_write_profile(write_profile)
+    except ValueError as e:
+        raise UploadError(str(e))
+    settings = {
+        'write_profile': write_profile,
+        **client_options,
+        'batch_size': options.batch_size,
+        'batch_bytes': options.batch_bytes,
+        'target_latency': options.target_latency
+    }
+    
+    collection = ledger = None
+    rollups = options.rollups
+    if rollups is None:
+        rollups = has_rollups(collection_name, dataset_path.name)
+    rollups = rollups and not no_write
+    # Workers and upload_file see the settings as resolved here
+    options = replace(options, json_decoder=json_decoder, write_profile=write_profile, rollups=rollups)
+    if not no_write:
+        # Connect to database
+        if not db_manager.connect():
+            raise UploadError("Failed to connect to database")
+        
+        collection = db_manager.get_collection(collection_name)
+        
+        # Handle clean slate
+        if clean_slate:
+            print(f"Clean slate requested: dropping collection '{collection_name}'")
+            collection.drop()
+            reset_rollups(collection)
+        elif rollups and rollups_pending(collection):
+            print("Rollups were left pending by an interrupted load")
+            rebuild_rollups(collection)
+        elif rollups and rollups_missing(collection):
+            rebuild_rollups(collection)
+        if rollups:
+            mark_rollups_pending(collection)
+        
+        ledger = UploadLedger(dataset_path)
+        if options.resume:
+            print(f"Resuming upload from ledger: {ledger.summary(collection_name) or 'no progress recorded'}")
+        else:
+            ledger.reset(collection_name)
+    
+    # Take the shard list from the catalog, once it matches the files on disk
+    catalog = get_catalog(dataset_path)
+    if catalog.sync(save=not no_write):
+        print("Catalog did not match the dataset directory; refreshed it")
+    all_files = [f for f in catalog.shard_paths() if f.name.endswith(('.json', '.json.gz'))]
+    
+    if not all_files:
+        raise UploadError(f"No JSON files found in {dataset_path}")
+    
+    print(f"Found {len(all_files)} files to process")
+    print(f"JSON decoder: {json_decoder}")
+    
+    id_field = detect_id_field(collection_name, all_files)
+    derived = get_derived_fields(collection_name) if options.derive_fields else {}
+    projection = prepare_projection(projection, id_field, derived)
+    
+    if mode == "bulk" and not no_write:
+        # An existing unique index would be maintained on every insert anyway
+        # A resumed bulk load continues into its own partially loaded collection
+        has_documents = not options.resume and collection.estimated_document_count()
+        if has_documents or _has_unique_index(collection, id_field):
+            raise UploadError(f"Bulk mode needs an empty, unindexed collection; "
+                              f"use clean_slate to drop '{collection_name}'")
+        print("Bulk mode: deferring index builds until all files are loaded")
+    elif not no_write:
+        create_id_index(collection, id_field)
+    
+    seen_ids = None
+    if options.id_filter and options.processes > 1 and not options.id_filter_seed:
+        # Nothing to share: each worker builds its own empty filter instead of unpickling one
+        capacity = options.id_filter_capacity or estimate_id_capacity(catalog)
+        seen_ids = partial(make_id_filter, options.id_filter, capacity, options.id_filter_error_rate)
+        print(f"Id filter: one empty {options.id_filter} filter per worker ({capacity:,} ids)")
+    elif options.id_filter:
+        seen_ids = prepare_id_filter(options, collection, id_field, catalog, copies=options.processes)
+    if options.id_filter:
+        settings['id_filter'] = options.id_filter
+    
+    # Objects of this run handed to upload_file alongside the options
+    run = {
+        'ledger': ledger,
+        'projection': projection,
+        'derived': derived,
+        'tuner': BatchTuner(options.batch_size, options.batch_bytes, options.target_latency),
+        'seen_ids': seen_ids
+    }
+    ingest_catalog = None if no_write else catalog
+    if options.processes > 1:
+        file_stats = _upload_files_parallel(collection_name, all_files, id_field, ingest_catalog, options, run)
+    else:
+        file_stats = _upload_files_serial(collection, all_files, id_field, ingest_catalog, options, run)
+    
+    deduplicated = 0
+    if mode == "bulk" and not no_write:
+        papers = "papers" in (collection_name, dataset_path.name)
+        deduplicated = build_indexes_after_load(collection, id_field, papers=papers)
+        if deduplicated and rollups:
+            # The dedupe pass removed documents that were already counted
+            rebuild_rollups(collection)
+    
+    stats = summarize_upload(
+        len(all_files), file_stats, id_field, mode, deduplicated,
+        settings=settings, elapsed=time.monotonic() - started
+    )
+    if not no_write:
+        record_release(dataset_path, collection_name, stats)
+    if rollups and not stats['total_errors']:
+        clear_rollups_pending(collection)
+    
+    return stats
+
+def prepare_projection(
+    projection: Optional[Projection],
+    id_field: str,
+    derived: Dict[str, Callable[[Dict[str, Any]], Any]]
+) -> Optional[Projection]:
+    """Make a projection keep the id and derived fields, and report what will be written"""
+    if derived:
+        print(f"Derived fields: {', '.join(derived)}")
+    if not projection:
+        return None
+    for field in [id_field, *derived]:
+        projection = projection.keeping(field)
+    print(f"Projection: {projection}")
+    return projection
+
+def _has_unique_index(collection, id_field: str) -> bool:
+    """Check whether a collection already has a unique index on the id field"""
+    return any(
+        index.get('unique') and list(index['key']) == [id_field]
+        for index in collection.list_indexes()
+    )
+
+def estimate_id_capacity(catalog: Optional[DatasetCatalog] = None, existing: int = 0) -> int:
+    """Ids a run may see: the catalog's line count (DEFAULT_CAPACITY if not counted) plus `existing`"""
+    summary = catalog.summary() if catalog else {}
+    return (summary.get('total_lines') or summary.get('total_documents') or DEFAULT_CAPACITY) + existing
+
+def prepare_id_filter(
+    options: UploadOptions,
+    collection,
+    id_field: str,
+    catalog: Optional[DatasetCatalog] = None,
+    copies: int = 1
+):
+    """
+    Create the id filter `options` ask for, seeded with the collection's ids if `options.id_filter_seed`
+    
+    Seeding reads the ids through the unique id index (a covered scan,
+    no documents are fetched), so that index must exist. An exact filter
+    refuses to hold more than MAX_EXACT_SEED seeded ids across its
+    `copies` (one per worker process). Without an explicit capacity, a
+    Bloom filter is sized with estimate_id_capacity, counting the
+    documents already loaded when seeding.
+    
+    Raises:
+        UploadError: If the filter is invalid or an exact seed would be too large
+    """
+    kind = options.id_filter
+    seed = options.id_filter_seed
+    existing = collection.estimated_document_count() if seed and collection is not None else 0
+    if kind == "exact" and existing * copies > MAX_EXACT_SEED:
+        raise UploadError(f"'{collection.name}' holds about {existing:,} ids, too many to seed an exact "
+                          f"id filter in {copies} process(es); use the bloom filter")
+    capacity = options.id_filter_capacity or estimate_id_capacity(catalog, existing)
+    try:
+        id_filter = make_id_filter(kind, capacity, options.id_filter_error_rate)
+    except ValueError as e:
+        raise UploadError(str(e))
+    
+    if existing:
+        print(f"Seeding id filter from the '{id_field}' index of '{collection.name}'...")
+        cursor = (collection.find({}, {id_field: 1, '_id': 0})
+                  .hint([(id_field, 1)])
+                  .batch_size(DEFAULT_BATCH_SIZE))
+        id_filter.update(doc[id_field] for doc in cursor if id_field in doc)
+        print(f"  ✓ {len(id_filter)} ids loaded")
+    print(f"Id filter: {id_filter}")
+    return id_filter
+
+def _drop_seen_ids(collection, batch: List[Dict[str, Any]], id_field: str, id_filter) -> List[Dict[str, Any]]:
+    """
+    Remove documents whose id the filter has seen, recording the rest in it
+    
+    An exact filter is trusted as is. Bloom filter hits may be false
+    positives, so they are looked up in the collection with one `$in`
+    query and only dropped if found there (or repeated within the batch).
+    Without a collection (no-write runs) every hit is dropped.
+    """
+    hits = [id_filter.check_and_add(doc[id_field]) for doc in batch]
+    stored = None
+    if not id_filter.exact and collection is not None and any(hits):
+        candidates = list({doc[id_field] for doc, hit in zip(batch, hits) if hit})
+        stored = {
+            doc[id_field]
+            for doc in collection.find({id_field: {'$in': candidates}}, {id_field: 1, '_id': 0})
+        }
+    
+    unseen = []
+    batch_ids = set()
+    for doc, hit in zip(batch, hits):
+        doc_id = doc[id_field]
+        if doc_id in batch_ids or (hit and (stored is None or doc_id in stored)):
+            continue
+        batch_ids.add(doc_id)
+        unseen.append(doc)
+    return unseen
+
+# Connection and id filter owned by each upload worker process
+_worker_db: Optional[DatabaseManager] = None
+_worker_id_filter = None
+
+def _init_upload_worker(json_decoder: str, write_profile: Optional[str], id_filter=None):
+    """Give a worker process its own MongoClient (clients must not cross processes)"""
+    global _worker_db, _worker_id_filter
+    decoders.set_backend(json_decoder)
+    # An unseeded filter arrives as a factory, so its (possibly large) empty bits are not pickled
+    _worker_id_filter = id_filter() if callable(id_filter) else id_filter
+    if write_profile is None:
+        # No-write benchmark: nothing to connect to
+        return
+    _worker_db = DatabaseManager()
+    _worker_db.set_write_profile(write_profile)
+    if not _worker_db.connect():
+        raise UploadError("Failed to connect to database")
+
+def _upload_file_in_worker(
+    collection_name: str,
+    file_path: Path,
+    id_field: str,
+    options: UploadOptions,
+    run: Dict[str, Any],
+    byte_range: Optional[Tuple[int, int]] = None
+) -> Dict[str, int]:
+    """Upload one file (or byte range of it) from a worker process; the parent records it in the catalog"""
+    collection = _worker_db.get_collection(collection_name) if _worker_db else None
+    return upload_file(
+        collection, file_path, id_field, options, seen_ids=_worker_id_filter, byte_range=byte_range, **run
+    )
+
+def split_byte_ranges(file_path: Path, range_bytes: int = RANGE_BYTES) -> List[Tuple[int, int]]:
+    """
+    Split a JSON Lines file into byte ranges of about `range_bytes`, each ending after a newline
+    
+    Boundaries are found by memory-mapping the file and searching for the
+    next newline after every multiple of `range_bytes`, so no line is cut
+    and the split is the same on every run (which keeps ranges resumable).
+    """
+    size = file_path.stat().st_size
+    if size <= range_bytes:
+        return [(0, size)]
+    
+    ranges = []
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 0
+        while start < size:
+            newline = mm.find(b'\n', start + range_bytes)
+            end = size if newline == -1 else newline + 1
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+def _plan_upload_tasks(files: List[Path]) -> List[Tuple[Path, Optional[Tuple[int, int]]]]:
+    """Pair each file with the byte ranges it is uploaded in (None = the whole file)"""
+    tasks = []
+    for file_path in files:
+        splittable = (
+            file_path.name.endswith('.json')
+            and file_path.stat().st_size > RANGE_BYTES
+            and detect_shard_format(file_path) == 'jsonl'
+        )
+        if splittable:
+            ranges = split_byte_ranges(file_path, RANGE_BYTES)
+            print(f"  Splitting {file_path.name} into {len(ranges)} byte ranges")
+            tasks.extend((file_path, byte_range) for byte_range in ranges)
+        else:
+            tasks.append((file_path, None))
+    return tasks
+
+def _merge_file_stats(range_stats: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Add up the stats of a file's byte ranges (the batch size is the largest reached)"""
+    merged = _empty_file_stats()
+    for stats in range_stats:
+        for key, value in stats.items():
+            if key == 'batch_size':
+                merged[key] = max(merged.get(key, 0), value)
+            elif key != 'lines':
+                merged[key] = merged.get(key, 0) + value
+    # A file's lines are known only if every range counted its own
+    lines = [stats.get('lines') for stats in range_stats]
+    merged['lines'] = sum(lines) if lines and None not in lines else None
+    return merged
+
+def _upload_files_serial(
+    collection,
+    files: List[Path],
+    id_field: str,
+    catalog: Optional[DatasetCatalog],
+    options: UploadOptions,
+    run: Dict[str, Any]
+) -> List[Dict[str, int]]:
+    """
+    Upload files one after another in this process
+    
+    Files are split into the same byte ranges as by _upload_files_parallel,
+    so ledger entries (and a resume) do not depend on the number of processes.
+    `run` holds the upload_file keyword arguments shared by every file.
+    """
+    ranges: Dict[Path, List[Optional[Tuple[int, int]]]] = {}
+    for file_path, byte_range in _plan_upload_tasks(files):
+        ranges.setdefault(file_path, []).append(byte_range)
+    
+    file_stats = []
+    for file_path in files:
+        if ranges[file_path] == [None]:
+            file_stats.append(upload_file(collection, file_path, id_field, options, catalog, **run))
+            continue
+        stats = _merge_file_stats([
+            upload_file(collection, file_path, id_field, options, byte_range=byte_range, **run)
+            for byte_range in ranges[file_path]
+        ])
+        if catalog is not None:
+            _record_ingest(catalog, file_path, collection.name, stats)
+        file_stats.append(stats)
+    return file_stats
+
+def _upload_files_parallel(
+    collection_name: str,
+    files: List[Path],
+    id_field: str,
+    catalog: Optional[DatasetCatalog],
+    options: UploadOptions,
+    run: Dict[str, Any]
+) -> List[Dict[str, int]]:
+    """
+    Upload files across a process pool, collecting per-file stats as they finish
+    
+    Uncompressed JSON Lines files larger than RANGE_BYTES are split into
+    newline-aligned byte ranges that are uploaded as separate tasks, so a
+    single huge shard keeps every worker busy. A file's stats are merged
+    and recorded in the catalog once all of its ranges are done.
+    
+    `run` holds the upload_file keyword arguments sent with each task, so
+    each task gets its own copy of the batch tuner, while the id filter
+    (or a factory building it) is passed once to each worker and shared
+    by its tasks. Workers skip connecting on a no-write run.
+    """
+    run = dict(run)
+    seen_ids = run.pop('seen_ids', None)
+    write_profile = None if options.no_write else options.write_profile
+    tasks = _plan_upload_tasks(files)
+    processes = min(options.processes, len(tasks))
+    print(f"Uploading with {processes} worker processes")
+    file_stats = []
+    pending = {file_path: [] for file_path in files}
+    remaining = {file_path: 0 for file_path in files}
+    for file_path, _ in tasks:
+        remaining[file_path] += 1
+    
+    # Spawn rather than fork: the parent's MongoClient and threads are not fork-safe
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context,
+                             initializer=_init_upload_worker,
+                             initargs=(decoders.get_backend(), write_profile, seen_ids)) as executor:
+        futures = {
+            executor.submit(
+                _upload_file_in_worker, collection_name, file_path, id_field, options, run, byte_range
+            ): file_path
+            for file_path, byte_range in tasks
+        }
+        for future in as_completed(futures):
+            file_path = futures[future]
             try:
-                with jsonlines.open(file_path) as reader:
-                    return reader.read()
-            except Exception:
-                pass
-                
-    except Exception as e:
-        logger.warning(f"Could not read first document from {file_path}: {e}")
+                stats = future.result()
+            except Exception as e:
+                print(f"  ✗ Worker failed on {file_path.name}: {e}")
+                stats = _empty_file_stats()
+                stats['errors'] = 1
+            pending[file_path].append(stats)
+            remaining[file_path] -= 1
+            if remaining[file_path] == 0:
+                stats = _merge_file_stats(pending.pop(file_path))
+                _record_ingest(catalog, file_path, collection_name, stats)
+                file_stats.append(stats)
     
-    return None
+    return file_stats
+
+# Bytes read to decide whether a shard is a JSON array
+SNIFF_BYTES = 64 * 1024
+
+# Chunk size for scanning JSON arrays element by element
+ARRAY_CHUNK_BYTES = 1024 * 1024
+
+# Nesting depth the array scanner's regexes skip in one match; deeper or unfinished
+# brackets are counted one at a time
+SKIP_DEPTH = 8
+
+# A complete JSON string literal
+_JSON_STRING = rb'"[^"\\]*+(?:\\.[^"\\]*+)*+"'
 
-def _read_json_file(file_path: Path, id_field: str) -> List[Dict[str, Any]]:
-    """Read JSON documents from a file (handles both .json and .json.gz)"""
-    documents = []
+def _balanced_run(depth: int, plain: bytes = rb'[^"\[\]{}]*+') -> bytes:
+    """
+    Regex for a run of JSON without unbalanced brackets, nested at most `depth` deep
     
-    if file_path.name.endswith('.json.gz'):
-        # Compressed file - always JSON Lines format
-        with gzip.open(file_path, 'rt', encoding='utf-8') as f:
-            for line in tqdm(f, desc=f"Reading {file_path.name}"):
+    Written as `plain (value plain)*` rather than an alternation per byte
+    run, which the regex engine steps through faster. `plain` is the class
+    of bytes skipped at the outer level, e.g. one that also stops at commas.
+    """
+    run = rb'[^"\[\]{}]*+(?:' + _JSON_STRING + rb'[^"\[\]{}]*+)*+'
+    for level in range(depth):
+        between = plain if level == depth - 1 else rb'[^"\[\]{}]*+'
+        run = between + rb'(?:(?:' + _JSON_STRING + rb'|[\[{]' + run + rb'[\]}])' + between + rb')*+'
+    return run
+
+# Runs of bytes the array scanner can skip: anything but unbalanced brackets (and,
+# between elements, commas), including whole string literals and whole bracketed
+# values up to SKIP_DEPTH deep. Possessive, so a string or value cut off at the end
+# of the buffer stops the match at its opening quote or bracket.
+_SKIP_NESTED = re.compile(_balanced_run(SKIP_DEPTH), re.DOTALL)
+_SKIP_TOP = re.compile(_balanced_run(SKIP_DEPTH, plain=rb'[^"\[\]{},]*+'), re.DOTALL)
+_QUOTE, _ARRAY_START = ord('"'), ord('[')
+_OPENERS, _CLOSERS = (ord('['), ord('{')), (ord(']'), ord('}'))
+_LEADING_BYTES = b'\xef\xbb\xbf \t\r\n'
+
+# Shard format by (path, size, mtime), so each file version is sniffed once per process
+_shard_formats: Dict[Tuple[str, int, int], Optional[str]] = {}
+
+def _open_shard(file_path: Path):
+    """Open a .json or .json.gz shard for binary reading"""
+    return gzip.open(file_path, 'rb') if file_path.name.endswith('.gz') else open(file_path, 'rb')
+
+def detect_shard_format(file_path: Path) -> Optional[str]:
+    """
+    Work out how a shard is laid out from its first bytes
+    
+    A shard starting with `[` is a JSON array. One starting with `{` is
+    JSON Lines if one of its first lines decodes to an object on its
+    own, and a single (pretty-printed) object otherwise. The result is
+    cached per file version, so upload and id detection sniff once.
+    
+    Returns:
+        'jsonl', 'array', 'object', or None if the file is empty or not JSON
+    """
+    stat = file_path.stat()
+    key = (str(file_path), stat.st_size, stat.st_mtime_ns)
+    if key in _shard_formats:
+        return _shard_formats[key]
+    
+    with _open_shard(file_path) as f:
+        head = f.read(SNIFF_BYTES).lstrip(b'\xef\xbb\xbf \t\r\n')
+    
+    shard_format = None
+    if head.startswith(b'['):
+        shard_format = 'array'
+    elif head.startswith(b'{'):
+        shard_format = 'object'
+        with _open_shard(file_path) as f:
+            lines = (line.strip() for line in f)
+            for line in islice((line for line in lines if line), 5):
                 try:
-                    doc = json.loads(line.strip())
-                    if id_field in doc:
-                        documents.append(doc)
-                except json.JSONDecodeError as e:
-                    logger.warning(f"Skipping invalid JSON line in {file_path}: {e}")
+                    if isinstance(decoders.loads(line), dict):
+                        shard_format = 'jsonl'
+                        break
+                except ValueError:
                     continue
     
-    elif file_path.name.endswith('.json'):
-        # Uncompressed JSON - try multiple formats
-        
-        # Method 1: Try line-by-line reading (JSON Lines)
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                for line_num, line in enumerate(tqdm(f, desc=f"Reading {file_path.name}")):
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        doc = json.loads(line)
-                        if id_field in doc:
-                            documents.append(doc)
-                    except json.JSONDecodeError:
-                        # If first few lines fail, it's probably not JSON Lines
-                        if line_num < 5:
-                            break
-                        continue
+    _shard_formats[key] = shard_format
+    return shard_format
+
+def _iter_array_elements(f, chunk_size: int = ARRAY_CHUNK_BYTES) -> Iterator[bytes]:
+    """
+    Yield the raw bytes of each top-level element of a JSON array, one at a time
+    
+    The array is read in chunks. Regexes skip everything that cannot end
+    an element, whole string literals and whole bracketed values up to
+    SKIP_DEPTH deep included, in one match, so Python only handles the
+    commas between top-level elements and brackets nested deeper than
+    that (or cut off at the end of a chunk). Only the unfinished element
+    and the current chunk are held in memory; elements are not decoded
+    here.
+    
+    Raises:
+        ValueError: If the stream is not a JSON array or ends inside it
+    """
+    depth = 0
+    buf = b''
+    # Start of the current element and the scan position, as offsets into buf
+    start = pos = 0
+    while True:
+        chunk = f.read(chunk_size)
+        buf = buf[start:] + chunk
+        pos -= start
+        start = 0
+        end = len(buf)
+        while pos < end:
+            if depth == 0:
+                c = buf[pos]
+                if c in _LEADING_BYTES:
+                    pos += 1
+                    continue
+                if c != _ARRAY_START:
+                    raise ValueError("Not a JSON array")
+                depth = 1
+                pos = start = pos + 1
+                continue
             
-            # If we got documents, return them
-            if documents:
-                return documents
-                
-        except Exception as e:
-            logger.warning(f"Line-by-line reading failed for {file_path}: {e}")
+            pos = (_SKIP_TOP if depth == 1 else _SKIP_NESTED).match(buf, pos).end()
+            if pos == end:
+                break
+            c = buf[pos]
+            if c == _QUOTE:
+                # String continues in the next chunk: rescan it from its opening quote
+                break
+            if c in _OPENERS:
+                depth += 1
+            elif c in _CLOSERS:
+                depth -= 1
+                if depth == 0:
+                    raw = buf[start:pos].strip()
+                    if raw:
+                        yield raw
+                    return
+            else:
+                # Comma between top-level elements
+                yield buf[start:pos].strip()
+                start = pos + 1
+            pos += 1
+        if not chunk:
+            break
+    raise ValueError("JSON array ends before its closing bracket")
+
+def _iter_records(
+    file_path: Path,
+    start: int = 0,
+    timings: Optional[Dict[str, float]] = None
+) -> Iterator[Tuple[bytes, int]]:
+    """
+    Yield (raw record, position) pairs from a shard in any supported format
+    
+    Records are JSON Lines lines, array elements, or the whole file for
+    a single object. Records before `start` are skipped undecoded; the
+    time spent reading them (and scanning arrays) goes to timings['read'].
+    Once the shard is read to the end, timings['records'] holds its
+    number of non-blank records, skipped ones included.
+    """
+    if timings is None:
+        timings = {'read': 0.0, 'decode': 0.0}
+    
+    shard_format = detect_shard_format(file_path)
+    if shard_format is None:
+        logger.warning(f"Could not recognise {file_path} as JSON Lines or JSON")
+        return
+    
+    with _open_shard(file_path) as f:
+        if shard_format == 'object':
+            if start == 0:
+                started = time.perf_counter()
+                raw = f.read()
+                timings['read'] += time.perf_counter() - started
+                yield raw, 1
+            timings['records'] = 1
+            return
         
-        # Method 2: Try regular JSON (array or single object)
+        if shard_format == 'jsonl':
+            records = _timed(f, timings, 'read')
+        else:
+            records = _timed(_iter_array_elements(f), timings, 'read')
+        count = 0
+        for index, raw in enumerate(records):
+            raw = raw.strip()
+            if not raw:
+                continue
+            count += 1
+            if index >= start:
+                yield raw, index + 1
+        timings['records'] = count
+
+def _get_first_document(file_path: Path) -> Optional[Dict[str, Any]]:
+    """Get the first document from a file to inspect its structure (without parsing the rest)"""
+    try:
+        for raw, _ in _iter_records(file_path):
+            try:
+                doc = decoders.loads(raw)
+            except ValueError:
+                continue
+            if isinstance(doc, dict):
+                return doc
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read first document from {file_path}: {e}")
+    
+    return None
+
+def _timed(iterable: Iterable[Any], timings: Dict[str, float], stage: str) -> Iterator[Any]:
+    """Yield from iterable, adding the time spent producing each item to timings[stage]"""
+    iterator = iter(iterable)
+    while True:
+        started = time.perf_counter()
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                if isinstance(data, list):
-                    documents = [doc for doc in tqdm(data, desc=f"Processing {file_path.name}") if id_field in doc]
-                elif isinstance(data, dict) and id_field in data:
-                    documents = [data]
-        except json.JSONDecodeError as e:
-            logger.error(f"Could not parse JSON file {file_path}: {e}")
-            return []
-        except Exception as e:
-            logger.error(f"Error reading {file_path}: {e}")
-            return []
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            timings[stage] += time.perf_counter() - started
+        yield item
+
+def _timed_loads(data: bytes, timings: Dict[str, float]) -> Any:
+    """Decode with the active backend, adding the time taken to timings['decode']"""
+    started = time.perf_counter()
+    try:
+        return decoders.loads(data)
+    finally:
+        timings['decode'] += time.perf_counter() - started
+
+def _iter_json_file(
+    file_path: Path,
+    id_field: str,
+    start: int = 0,
+    timings: Optional[Dict[str, float]] = None
+) -> Iterator[Tuple[Dict[str, Any], int, int]]:
+    """
+    Yield (document, source bytes, position) triples from a file (handles both .json and .json.gz)
+    
+    JSON Lines shards and JSON arrays are both streamed one raw record
+    at a time and decoded with the active `decoders` backend, so memory
+    is bounded by a record rather than the file (see _iter_records).
+    
+    `position` counts the source records (lines, or array elements)
+    consumed up to and including the document, so passing it back as
+    `start` resumes right after it without decoding the skipped records.
+    
+    Time spent reading (including decompression) and decoding is added
+    to timings['read'] and timings['decode'].
+    """
+    if timings is None:
+        timings = {'read': 0.0, 'decode': 0.0}
+    
+    try:
+        for raw, position in _iter_records(file_path, start, timings):
+            try:
+                doc = _timed_loads(raw, timings)
+            except ValueError as e:
+                logger.warning(f"Skipping invalid JSON record {position} in {file_path}: {e}")
+                continue
+            if isinstance(doc, dict) and id_field in doc:
+                yield doc, len(raw), position
+    except ValueError as e:
+        logger.error(f"Could not parse JSON file {file_path}: {e}")
+
+def _iter_byte_range(
+    file_path: Path,
+    id_field: str,
+    byte_range: Tuple[int, int],
+    start: int = 0,
+    timings: Optional[Dict[str, float]] = None
+) -> Iterator[Tuple[Dict[str, Any], int, int]]:
+    """
+    Yield (document, source bytes, position) triples from one byte range of a JSON Lines file
+    
+    The file is memory-mapped and lines are sliced out of it directly,
+    with no buffered file object in between. `position` is the byte
+    offset just after the document's line; passing it back as `start`
+    resumes there. Time is added to timings['read'] and timings['decode'].
+    A range read from its first byte to its end leaves its number of
+    non-blank lines in timings['records'].
+    """
+    if timings is None:
+        timings = {'read': 0.0, 'decode': 0.0}
+    
+    range_start, end = byte_range
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        pos = max(start, range_start)
+        # Lines before a resumed position are not read, so only a full read is counted
+        count = 0 if pos == range_start else None
+        while pos < end:
+            started = time.perf_counter()
+            newline = mm.find(b'\n', pos, end)
+            next_pos = end if newline == -1 else newline + 1
+            line = mm[pos:next_pos].strip()
+            timings['read'] += time.perf_counter() - started
+            line_start, pos = pos, next_pos
+            if not line:
+                continue
+            if count is not None:
+                count += 1
+            try:
+                doc = _timed_loads(line, timings)
+            except ValueError as e:
+                logger.warning(f"Skipping invalid JSON line at byte {line_start} in {file_path}: {e}")
+                continue
+            if isinstance(doc, dict) and id_field in doc:
+                yield doc, len(line), pos
+        if count is not None:
+            timings['records'] = count
+
+def _iter_batches(
+    documents: Iterator[Tuple[Dict[str, Any], int, int]],
+    tuner: BatchTuner
+) -> Iterator[Tuple[List[Dict[str, Any]], int]]:
+    """
+    Group (document, size, position) triples into batches capped by count and, optionally, bytes
     
-    return documents
+    The tuner's limits are read for every batch, so adaptive resizing
+    takes effect immediately. Yields each batch with the source position
+    of its last document.
+    """
+    batch: List[Dict[str, Any]] = []
+    size = 0
+    position = 0
+    for doc, doc_size, position in documents:
+        batch.append(doc)
+        size += doc_size
+        if len(batch) >= tuner.batch_size or (tuner.batch_bytes and size >= tuner.batch_bytes):
+            yield batch, position
+            batch = []
+            size = 0
+    if batch:
+        yield batch, position
 
-def _insert_documents(collection, documents: List[Dict[str, Any]]) -> Dict[str, int]:
-    """Insert documents into MongoDB collection with duplicate handling"""
+def _insert_documents(
+    collection,
+    documents: List[Dict[str, Any]],
+    rollups: Optional[RollupCounter] = None
+) -> Dict[str, int]:
+    """
+    Insert documents into MongoDB collection with duplicate handling, counting inserted ones in rollups
+    
+    Per-document failures are counted; anything else (lost connection,
+    timeout) is raised, since it is unknown which documents were written.
+    """
     if not documents:
         return {'inserted': 0, 'duplicates': 0, 'errors': 0}
     
     try:
         # Use insert_many with ordered=False to continue on duplicate key errors
         result = collection.insert_many(documents, ordered=False)
+        if rollups:
+            rollups.add(documents)
         return {
             'inserted': len(result.inserted_ids),
             'duplicates': 0,
@@ -315,33 +1373,213 @@ def _insert_documents(collection, documents: List[Dict[str, Any]]) -> Dict[str,
             else:
                 other_errors += 1
         
+        if rollups:
+            failed = {error['index'] for error in e.details.get('writeErrors', [])}
+            rollups.add(doc for index, doc in enumerate(documents) if index not in failed)
+        
         return {
             'inserted': successful_inserts,
             'duplicates': duplicate_errors,
             'errors': other_errors
         }
+
+def _upsert_documents(
+    collection,
+    documents: List[Dict[str, Any]],
+    id_field: str,
+    rollups: Optional[RollupCounter] = None
+) -> Dict[str, int]:
+    """
+    Replace documents by id (inserting new ones) with one unordered bulk_write
     
-    except Exception as e:
-        logger.error(f"Unexpected error during insert: {e}")
-        return {
-            'inserted': 0,
-            'duplicates': 0, 
-            'errors': len(documents)
-        }
+    With rollups, the stored versions are read first so their counts can
+    be moved to the new versions.
+    """
+    stored = rollups.snapshot(id_field, [doc[id_field] for doc in documents]) if rollups else None
+    write_stats = _bulk_write(
+        collection,
+        [ReplaceOne({id_field: doc[id_field]}, doc, upsert=True) for doc in documents]
+    )
+    if rollups:
+        failed = write_stats['failed_indexes']
+        rollups.replace(stored, [doc for index, doc in enumerate(documents) if index not in failed], id_field)
+    return {
+        'inserted': write_stats['upserted'],
+        'modified': write_stats['modified'],
+        # Matched but identical to the stored document
+        'unchanged': write_stats['matched'] - write_stats['modified'],
+        'errors': write_stats['errors']
+    }
+
+def _bulk_write(collection, requests: List[Any]) -> Dict[str, Any]:
+    """Run an unordered bulk_write and summarise its result (with the indexes of failed requests)"""
+    if not requests:
+        return {'upserted': 0, 'modified': 0, 'matched': 0, 'deleted': 0, 'errors': 0, 'failed_indexes': set()}
+    
+    try:
+        result = collection.bulk_write(requests, ordered=False)
+        details = result.bulk_api_result
+    except BulkWriteError as e:
+        details = e.details
+    write_errors = details.get('writeErrors', [])
+    
+    return {
+        'upserted': details.get('nUpserted', 0),
+        'modified': details.get('nModified', 0),
+        'matched': details.get('nMatched', 0),
+        'deleted': details.get('nRemoved', 0),
+        'errors': len(write_errors),
+        'failed_indexes': {error['index'] for error in write_errors}
+    }
+
+def apply_release_diff(
+    collection_name: str,
+    update_files: List[Path],
+    delete_files: List[Path],
+    id_field: Optional[str] = None,
+    batch_size: int = 10000,
+    rollups: Optional[bool] = None
+) -> Dict[str, int]:
+    """
+    Apply one Semantic Scholar release diff to a collection
+    
+    Update records are upserted by id with unordered `ReplaceOne` batches,
+    then delete records (which carry only the id) are removed with
+    `$in` batches, matching the order S2 documents for diffs. Updates get
+    the collection's derived fields and configured projection, like full
+    uploads. With `rollups` (by default for the papers collection) the
+    rollups move the counts of replaced and deleted papers.
+    
+    Args:
+        collection_name: Name of MongoDB collection
+        update_files: Files of records to insert or replace, in the order to apply them
+        delete_files: Files of records to delete, in the order to apply them
+        id_field: Id field (detected from the first record when None)
+        batch_size: Number of records per bulk request
+        rollups: Maintain rollup counts (None = only for the papers collection)
+        
+    Returns:
+        Dictionary with upserted, modified, deleted and error counts
+        
+    Raises:
+        UploadError: If the database is unreachable or no id field is found
+    """
+    if not db_manager.connect():
+        raise UploadError("Failed to connect to database")
+    
+    collection = db_manager.get_collection(collection_name)
+    
+    if not id_field:
+        for file_path in list(update_files) + list(delete_files):
+            sample_doc = _get_first_document(file_path)
+            if sample_doc:
+                id_field = get_id_field_for_collection(collection_name, sample_doc)
+                if id_field:
+                    break
+    
+    if not id_field:
+        raise UploadError("Could not determine ID field from diff files")
+    
+    print(f"Applying diff to '{collection_name}' keyed on '{id_field}'")
+    
+    try:
+        projection = get_projection(collection_name)
+    except TransformError as e:
+        raise UploadError(str(e))
+    derived = get_derived_fields(collection_name)
+    projection = prepare_projection(projection, id_field, derived)
+    
+    # Upserts by id need the unique index to avoid collection scans
+    collection.create_index(id_field, unique=True)
+    
+    counter = None
+    if has_rollups(collection_name) if rollups is None else rollups:
+        if rollups_pending(collection) or rollups_missing(collection):
+            rebuild_rollups(collection)
+        mark_rollups_pending(collection)
+        counter = RollupCounter(collection)
+    
+    stats = {'upserted': 0, 'modified': 0, 'deleted': 0, 'errors': 0}
+    
+    def flush(requests: List[Any]):
+        batch_stats = _bulk_write(collection, requests)
+        for key in stats:
+            stats[key] += batch_stats[key]
+        requests.clear()
+        return batch_stats
+    
+    def flush_updates(docs: List[Dict[str, Any]]):
+        stored = counter.snapshot(id_field, [doc[id_field] for doc in docs]) if counter else None
+        batch_stats = flush([ReplaceOne({id_field: doc[id_field]}, doc, upsert=True) for doc in docs])
+        if counter:
+            failed = batch_stats['failed_indexes']
+            counter.replace(stored, [doc for index, doc in enumerate(docs) if index not in failed], id_field)
+            counter.flush()
+        docs.clear()
+    
+    def flush_deletes(ids: List[Any]):
+        stored = counter.snapshot(id_field, ids) if counter else None
+        batch_stats = flush([DeleteMany({id_field: {"$in": ids}})])
+        if counter and not batch_stats['errors']:
+            counter.remove(stored)
+            counter.flush()
+        ids.clear()
+    
+    for file_path in update_files:
+        print(f"  Updating from {file_path.name}...")
+        docs = []
+        for doc, _, _ in tqdm(_iter_json_file(file_path, id_field), desc=f"Reading {file_path.name}"):
+            if derived:
+                doc = apply_derived_fields(doc, derived)
+            if projection:
+                doc = projection.apply(doc)
+            docs.append(doc)
+            if len(docs) >= batch_size:
+                flush_updates(docs)
+        if docs:
+            flush_updates(docs)
+    
+    for file_path in delete_files:
+        print(f"  Deleting from {file_path.name}...")
+        ids = []
+        for doc, _, _ in tqdm(_iter_json_file(file_path, id_field), desc=f"Reading {file_path.name}"):
+            ids.append(doc[id_field])
+            if len(ids) >= batch_size:
+                flush_deletes(ids)
+        if ids:
+            flush_deletes(ids)
+    
+    if counter and not stats['errors']:
+        clear_rollups_pending(collection)
+    
+    print(f"  ✓ Upserted: {stats['upserted']}, Modified: {stats['modified']}, "
+          f"Deleted: {stats['deleted']}, Errors: {stats['errors']}")
+    
+    return stats
 
-def upload_dataset_by_name(dataset_name: str, clean_slate: bool = False) -> Dict[str, int]:
+def upload_dataset_by_name(
+    dataset_name: str,
+    clean_slate: bool = False,
+    options: Optional[UploadOptions] = None
+) -> Dict[str, int]:
     """
     Upload a dataset by name (convenience function)
     
     Args:
         dataset_name: Name of dataset (papers, authors, publication-venues, etc.)
         clean_slate: Whether to drop existing collection first
+        options: Ingest settings (defaults: UploadOptions())
         
     Returns:
         Dictionary with upload statistics
     """
     dataset_path = config.get_dataset_path(dataset_name)
-    return upload_to_mongodb(dataset_path, dataset_name, clean_slate)
+    return upload_to_mongodb(
+        dataset_path=dataset_path,
+        collection_name=dataset_name,
+        clean_slate=clean_slate,
+        options=options
+    )
 
 # Convenience functions for common datasets
 def upload_papers(clean_slate: bool = False) -> Dict[str, int]:
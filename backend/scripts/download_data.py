@@ -32,11 +32,36 @@ def main():
         choices=["semantic_scholar", "openalex"],
         help="Data source (default: semantic_scholar)"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of files to download concurrently (default: 1)"
+    )
+    parser.add_argument(
+        "--max-bandwidth",
+        type=float,
+        help="Global download bandwidth cap in MB/s across all workers"
+    )
+    parser.add_argument(
+        "--decompress",
+        action="store_true",
+        help="Decompress .json.gz files after download (default keeps them compressed)"
+    )
+    parser.add_argument(
+        "--since",
+        help="OpenAlex only: sync partitions with updated_date on or after YYYY-MM-DD"
+    )
     parser.add_argument(
         "--info",
         action="store_true", 
         help="Show information about downloaded dataset"
     )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="With --info: rescan the dataset directory and rewrite its catalog"
+    )
     parser.add_argument(
         "--list",
         action="store_true",
@@ -48,13 +73,18 @@ def main():
     # Show dataset info
     if args.info:
         try:
-            info = get_dataset_info(args.dataset_name)
+            info = get_dataset_info(args.dataset_name, refresh=args.refresh)
             print(f"Dataset: {args.dataset_name}")
             print(f"Exists: {info['exists']}")
             if info['exists']:
                 print(f"Path: {info['path']}")
+                print(f"Release: {info['release_id'] or 'unknown'}")
                 print(f"Files: {info['total_files']} ({info['total_size_mb']} MB)")
+                if info['total_documents'] is not None:
+                    print(f"Documents: {info['total_documents']:,}")
+                print(f"Ingest status: {info['ingest_status']}")
                 print(f"Sample files: {info['sample_files']}")
+                print(f"Catalog updated: {info['catalog_updated_at']}")
         except Exception as e:
             print(f"❌ Failed to get dataset info: {e}")
             sys.exit(1)
@@ -67,7 +97,11 @@ def main():
         dataset_path = download_dataset(
             source=args.source,
             dataset_name=args.dataset_name,
-            clean_slate=args.clean_slate
+            clean_slate=args.clean_slate,
+            workers=args.workers,
+            max_bandwidth=args.max_bandwidth,
+            decompress=args.decompress,
+            since=args.since
         )
         
         print(f"\n🎉 Download completed successfully!")
@@ -10,14 +10,25 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from sciscidb.database import db_manager, find_one_sample, count_s2fieldsofstudy, list_collections, get_collection_count
+from sciscidb.download import get_dataset_info
 
 def main():
     parser = argparse.ArgumentParser(description="Examine MongoDB data")
-    parser.add_argument("action", choices=["sample", "collections", "count", "count_fos"], help="Action to perform")
+    parser.add_argument("action", choices=["sample", "collections", "count", "count_fos", "catalog"], help="Action to perform")
     parser.add_argument("--collection", help="Collection name (required for sample and count)")
+    parser.add_argument("--dataset", help="Dataset name (required for catalog)")
     
     args = parser.parse_args()
     
+    # The catalog lives next to the shards, so it needs no database connection
+    if args.action == "catalog":
+        if not args.dataset:
+            print("--dataset required for catalog action")
+            sys.exit(1)
+        
+        print(json.dumps(get_dataset_info(args.dataset), indent=2, default=str))
+        return
+    
     if not db_manager.connect():
         print("Failed to connect to MongoDB")
         sys.exit(1)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+CLI script to download a dataset and upload it to MongoDB in one overlapped pass
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Add the parent directory to the path so we can import sciscidb
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sciscidb.pipeline import ingest_dataset
+from sciscidb.decoders import BACKENDS
+from sciscidb.idfilter import ID_FILTERS
+from sciscidb.upload import DEFAULT_BATCH_SIZE, UploadOptions
+
+def main():
+    parser = argparse.ArgumentParser(description="Download and upload a dataset in one pipeline")
+    parser.add_argument(
+        "dataset_name",
+        help="Name of dataset to ingest (papers, authors, publication-venues, etc.)"
+    )
+    parser.add_argument(
+        "-c", "--collection",
+        help="MongoDB collection name (default: same as dataset)"
+    )
+    parser.add_argument(
+        "--clean-slate",
+        action="store_true",
+        help="Drop existing collection and start fresh"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of files to download concurrently (default: 1)"
+    )
+    parser.add_argument(
+        "--max-bandwidth",
+        type=float,
+        help="Global download bandwidth cap in MB/s across all workers"
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=2,
+        help="Maximum downloaded shards waiting for upload (default: 2)"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Maximum documents per insert (default: {DEFAULT_BATCH_SIZE})"
+    )
+    parser.add_argument(
+        "--batch-mb",
+        type=float,
+        help="Also cap each insert at this many MB of source JSON"
+    )
+    parser.add_argument(
+        "--json-decoder",
+        choices=BACKENDS,
+        help="JSON backend for decoding shards (default: JSON_DECODER or auto)"
+    )
+    parser.add_argument(
+        "--id-filter",
+        choices=ID_FILTERS,
+        help="Drop ids repeated across shards before they are sent (exact or bloom)"
+    )
+    
+    args = parser.parse_args()
+    
+    try:
+        stats = ingest_dataset(
+            dataset_name=args.dataset_name,
+            collection_name=args.collection,
+            clean_slate=args.clean_slate,
+            workers=args.workers,
+            max_bandwidth=args.max_bandwidth,
+            queue_size=args.queue_size,
+            options=UploadOptions(
+                batch_size=args.batch_size,
+                batch_bytes=int(args.batch_mb * 1024 * 1024) if args.batch_mb else None,
+                json_decoder=args.json_decoder,
+                id_filter=args.id_filter
+            )
+        )
+        
+        print(f"\n🎉 Ingest completed successfully!")
+        print(f"📊 Final stats: {stats}")
+        
+    except Exception as e:
+        print(f"❌ Ingest failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Build and query the seekable zstd shard store
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sciscidb.shards import build_shard_store, open_store
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the seekable shard store")
+    parser.add_argument("action", choices=["build", "get"], help="Action to perform")
+    parser.add_argument("dataset_name", help="Name of dataset (papers, authors, etc.)")
+    parser.add_argument("ids", nargs="*", help="Record ids to look up (for get)")
+    parser.add_argument("--frame-records", type=int, default=1000, help="Records per zstd frame (default: 1000)")
+    parser.add_argument("--level", type=int, default=3, help="zstd compression level (default: 3)")
+    
+    args = parser.parse_args()
+    
+    try:
+        if args.action == "build":
+            build_shard_store(args.dataset_name, frame_records=args.frame_records, level=args.level)
+        
+        elif args.action == "get":
+            if not args.ids:
+                print("At least one id required for get action")
+                sys.exit(1)
+            
+            store = open_store(args.dataset_name)
+            for record_id in args.ids:
+                start = time.perf_counter()
+                record = store.get(record_id)
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                if record is None:
+                    print(f"{record_id}: not found ({elapsed_ms:.1f} ms)")
+                else:
+                    print(f"{record_id} ({elapsed_ms:.1f} ms):")
+                    print(json.dumps(record, indent=2))
+    
+    except Exception as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -44,6 +44,10 @@ def main():
     parser.add_argument("--db", default="../frontend/local.db", help="SQLite database path")
     parser.add_argument("--fields", nargs="*", help="Specific fields to sync")
     parser.add_argument("--dry-run", action="store_true", help="Show data preview only, don't sync")
+    parser.add_argument("--from-rollups", action="store_true",
+                        help="Read counts from the rollup collections kept by uploads (no full scan)")
+    parser.add_argument("--workers", type=int,
+                        help="Concurrent per-year aggregations (default: MongoDB server cores, 1 = serial)")
     parser.add_argument("--detail", help="Show year-by-year breakdown for specific field")
     parser.add_argument("--table", default="fields", help="SQLite table name")
     parser.add_argument("--sample", type=int, help="Test with sample size (for performance testing)")
@@ -54,8 +58,13 @@ def main():
         print("Failed to connect to MongoDB")
         sys.exit(1)
     
-    print(f"Fetching field of study counts from papers...")
-    data = get_s2fieldsofstudy_year_counts(fields=args.fields, sample_size=args.sample)
+    if args.from_rollups:
+        print(f"Reading field of study counts from the papers rollups...")
+    else:
+        print(f"Fetching field of study counts from papers...")
+    data = get_s2fieldsofstudy_year_counts(
+        fields=args.fields, sample_size=args.sample, from_rollups=args.from_rollups, workers=args.workers
+    )
     
     if not data:
         print("No data found!")
@@ -12,32 +12,21 @@ from sciscidb.database import db_manager, get_venue_year_counts, sync_to_sqlite_
 
 def preview_data(data, detailed_venue=None):
     """Show summary of data, with detailed breakdown for specific venue"""
-    venues = {}
-    for row in data:
-        venue = row['venue']
-        if venue not in venues:
-            venues[venue] = {'years': 0, 'total_papers': 0, 'year_range': [], 'year_data': []}
-        venues[venue]['years'] += 1
-        venues[venue]['total_papers'] += row['count']
-        venues[venue]['year_range'].append(row['year'])
-        venues[venue]['year_data'].append((row['year'], row['count']))
+    years = data.years
     
     print(f"\nData summary ({len(data)} records):")
     print("-" * 60)
-    for venue, stats in venues.items():
-        min_year = min(stats['year_range'])
-        max_year = max(stats['year_range'])
-        method = "exact" if hasattr(data, '_exact') else "estimated"
-        print(f"{venue:<20} {stats['years']} years ({min_year}-{max_year}) {stats['total_papers']:,} papers")
+    for venue in data.venues:
+        total_papers = sum(data.row(venue))
+        print(f"{venue:<20} {len(years)} years ({years[0]}-{years[-1]}) {total_papers:,} papers")
     
-    print(f"\nTotal venues: {len(venues)}")
+    print(f"\nTotal venues: {len(data.venues)}")
     
     # Show detailed breakdown for specific venue
-    if detailed_venue and detailed_venue in venues:
+    if detailed_venue and detailed_venue in data.venues:
         print(f"\nYear-by-year breakdown for {detailed_venue}:")
         print("-" * 40)
-        year_data = sorted(venues[detailed_venue]['year_data'])
-        for year, count in year_data:
+        for year, count in zip(years, data.row(detailed_venue)):
             print(f"{year}: {count:,} papers")
 
 def main():
@@ -46,6 +35,10 @@ def main():
     parser.add_argument("--venues", nargs="*", help="Specific venues to sync")
     parser.add_argument("--collection", default="papers", help="MongoDB collection")
     parser.add_argument("--dry-run", action="store_true", help="Show data preview only, don't sync")
+    parser.add_argument("--from-rollups", action="store_true",
+                        help="Read counts from the rollup collections kept by uploads (no full scan)")
+    parser.add_argument("--workers", type=int,
+                        help="Concurrent per-year aggregations (default: MongoDB server cores, 1 = serial)")
     parser.add_argument("--detail", help="Show year-by-year breakdown for specific venue")
     
     args = parser.parse_args()
@@ -54,7 +47,11 @@ def main():
         print("Failed to connect to MongoDB")
         sys.exit(1)
     
-    data = get_venue_year_counts(args.collection, venues=args.venues)
+    if args.from_rollups:
+        print(f"Reading venue counts from the rollups of {args.collection}...")
+    data = get_venue_year_counts(
+        args.collection, venues=args.venues, from_rollups=args.from_rollups, workers=args.workers
+    )
     
     if not data:
         print("No data found!")
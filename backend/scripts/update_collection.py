@@ -9,11 +9,13 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from sciscidb.database import db_manager, add_primary_s2field, create_performance_indexes
+from sciscidb.rollups import rebuild_rollups
 
 def main():
     parser = argparse.ArgumentParser(description="Update collection structure")
-    parser.add_argument("action", choices=["add-primary-s2field", "create-indexes"], 
+    parser.add_argument("action", choices=["add-primary-s2field", "create-indexes", "rebuild-rollups"], 
                        help="Action to perform")
+    parser.add_argument("--collection", default="papers", help="Paper collection for rebuild-rollups")
     
     args = parser.parse_args()
     
@@ -25,6 +27,8 @@ def main():
         add_primary_s2field()
     elif args.action == "create-indexes":
         create_performance_indexes()
+    elif args.action == "rebuild-rollups":
+        rebuild_rollups(db_manager.get_collection(args.collection))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+CLI script to update a collection to the latest release using S2 diffs
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Add the parent directory to the path so we can import sciscidb
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sciscidb.database import db_manager, get_loaded_release, set_loaded_release
+from sciscidb.diffs import update_to_latest_release
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply Semantic Scholar release diffs to MongoDB")
+    parser.add_argument(
+        "dataset_name",
+        help="Name of dataset to update (papers, authors, publication-venues, etc.)"
+    )
+    parser.add_argument(
+        "-c", "--collection",
+        help="MongoDB collection name (default: same as dataset)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of diff files to download concurrently (default: 1)"
+    )
+    parser.add_argument(
+        "--max-bandwidth",
+        type=float,
+        help="Global download bandwidth cap in MB/s across all workers"
+    )
+    parser.add_argument(
+        "--keep-files",
+        action="store_true",
+        help="Keep downloaded diff files after applying them"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="List the diffs that would be applied without downloading them"
+    )
+    parser.add_argument(
+        "--set-release",
+        help="Record the release currently loaded in the collection and exit"
+    )
+    
+    args = parser.parse_args()
+    collection_name = args.collection or args.dataset_name
+    
+    if args.set_release:
+        if not db_manager.connect():
+            print("Failed to connect to database")
+            sys.exit(1)
+        previous = get_loaded_release(collection_name)
+        set_loaded_release(collection_name, args.set_release)
+        print(f"Recorded release {args.set_release} for '{collection_name}' (was: {previous})")
+        return
+    
+    try:
+        stats = update_to_latest_release(
+            dataset_name=args.dataset_name,
+            collection_name=collection_name,
+            workers=args.workers,
+            max_bandwidth=args.max_bandwidth,
+            keep_files=args.keep_files,
+            dry_run=args.dry_run
+        )
+        
+        print(f"\n🎉 Release update completed!")
+        print(f"📊 Final stats: {stats}")
+        
+    except Exception as e:
+        print(f"❌ Release update failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -9,8 +9,11 @@ from pathlib import Path
 # Add the parent directory to the path so we can import sciscidb
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from sciscidb.upload import upload_to_mongodb, upload_dataset_by_name
+from sciscidb.upload import DEFAULT_BATCH_SIZE, UPLOAD_MODES, UploadOptions, upload_to_mongodb, upload_dataset_by_name
 from sciscidb.config import config
+from sciscidb.database import WRITE_PROFILES
+from sciscidb.decoders import BACKENDS
+from sciscidb.idfilter import DEFAULT_ERROR_RATE, ID_FILTERS
 
 def main():
     parser = argparse.ArgumentParser(description="Upload data to MongoDB")
@@ -31,6 +34,104 @@ def main():
         action="store_true",
         help="Drop existing collection and start fresh"
     )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted upload after its last committed batch"
+    )
+    parser.add_argument(
+        "--fields",
+        help="Comma-separated dotted paths to keep, e.g. corpusid,venue,year,authors.authorId"
+    )
+    parser.add_argument(
+        "--exclude-fields",
+        help="Comma-separated dotted paths to drop (default: PROJECTION_FILE entry, if any)"
+    )
+    parser.add_argument(
+        "--no-derived-fields",
+        action="store_true",
+        help="Skip computing derived fields such as papers.primary_s2field"
+    )
+    parser.add_argument(
+        "--rollups",
+        action="store_const",
+        const=True,
+        dest="rollups",
+        help="Update the venue/year and field/year rollup collections (default: only when loading papers)"
+    )
+    parser.add_argument(
+        "--no-rollups",
+        action="store_const",
+        const=False,
+        dest="rollups",
+        help="Do not update the rollup collections"
+    )
+    parser.add_argument(
+        "--write-profile",
+        choices=list(WRITE_PROFILES),
+        help="Write concern and wire compression (default: bulk in bulk mode, else default)"
+    )
+    parser.add_argument(
+        "--target-latency",
+        type=float,
+        help="Adapt batch sizes so each write takes about this many seconds"
+    )
+    parser.add_argument(
+        "--no-write",
+        action="store_true",
+        help="Benchmark: read, decode and transform every shard without touching MongoDB"
+    )
+    parser.add_argument(
+        "--id-filter",
+        choices=ID_FILTERS,
+        help="Drop ids already seen in this run instead of sending them "
+             "(exact: set of ids; bloom: less memory, hits are checked against MongoDB)"
+    )
+    parser.add_argument(
+        "--id-filter-seed",
+        action="store_true",
+        help="Also load the ids already in the collection into the id filter (scans the id index)"
+    )
+    parser.add_argument(
+        "--id-filter-capacity",
+        type=int,
+        help="Number of ids to size the Bloom filter for (default: catalog line count)"
+    )
+    parser.add_argument(
+        "--id-filter-error-rate",
+        type=float,
+        default=DEFAULT_ERROR_RATE,
+        help=f"Bloom filter false positive rate (default: {DEFAULT_ERROR_RATE})"
+    )
+    parser.add_argument(
+        "--mode",
+        choices=UPLOAD_MODES,
+        default="insert",
+        help="insert: skip documents already loaded; upsert: replace them in place; "
+             "bulk: load without indexes and build them at the end (default: insert)"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Maximum documents per insert (default: {DEFAULT_BATCH_SIZE})"
+    )
+    parser.add_argument(
+        "--batch-mb",
+        type=float,
+        help="Also cap each insert at this many MB of source JSON"
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="Number of worker processes, each with its own MongoDB connection (default: 1)"
+    )
+    parser.add_argument(
+        "--json-decoder",
+        choices=BACKENDS,
+        help="JSON backend for decoding shards (default: JSON_DECODER or auto)"
+    )
     
     args = parser.parse_args()
     
@@ -49,13 +150,36 @@ def main():
         print(f"Using literal path: {resolved_path}")
     
     try:
+        options = UploadOptions(
+            batch_size=args.batch_size,
+            batch_bytes=int(args.batch_mb * 1024 * 1024) if args.batch_mb else None,
+            target_latency=args.target_latency,
+            mode=args.mode,
+            resume=args.resume,
+            processes=args.processes,
+            json_decoder=args.json_decoder,
+            write_profile=args.write_profile,
+            fields=args.fields.split(',') if args.fields else None,
+            exclude_fields=args.exclude_fields.split(',') if args.exclude_fields else None,
+            derive_fields=not args.no_derived_fields,
+            no_write=args.no_write,
+            id_filter=args.id_filter,
+            id_filter_capacity=args.id_filter_capacity,
+            id_filter_error_rate=args.id_filter_error_rate,
+            id_filter_seed=args.id_filter_seed,
+            rollups=args.rollups
+        )
         stats = upload_to_mongodb(
             dataset_path=resolved_path,
             collection_name=args.collection,
-            clean_slate=args.clean_slate
+            clean_slate=args.clean_slate,
+            options=options
         )
         
-        print(f"\n🎉 Upload completed successfully!")
+        if args.no_write:
+            print(f"\n🎉 Benchmark completed (nothing was written)")
+        else:
+            print(f"\n🎉 Upload completed successfully!")
         print(f"📊 Final stats: {stats}")
         
     except Exception as e:
@@ -0,0 +1,27 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Import sciscidb from this checkout, like the scripts do
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sciscidb.config import config
+from sciscidb.database import db_manager
+
+@pytest.fixture
+def data_root(tmp_path, monkeypatch):
+    """An empty data directory in place of the configured one"""
+    monkeypatch.setattr(config, "data_root", tmp_path)
+    monkeypatch.setattr(config, "ledger_dir", None)
+    return tmp_path
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """An in-memory mongomock database behind db_manager"""
+    mongomock = pytest.importorskip("mongomock")
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(db_manager, "client", client)
+    monkeypatch.setattr(db_manager, "db", client[config.db_name])
+    monkeypatch.setattr(db_manager, "_connected", True)
+    return db_manager.db
@@ -0,0 +1,67 @@
+"""Tests for streaming JSON array shards element by element"""
+import gzip
+import io
+import json
+import random
+
+import pytest
+
+from sciscidb.upload import SKIP_DEPTH, _iter_array_elements, _iter_records, detect_shard_format
+
+# Strings that look like structure to a naive scanner
+TRICKY_STRINGS = ['', 'a', '"]}', '[{', ',', '\\', '\\"]', 'é\n,}', 'x"],[{"y']
+
+def random_value(rng: random.Random, depth: int = 0):
+    roll = rng.random()
+    if depth > SKIP_DEPTH + 4 or roll < 0.3:
+        return rng.choice([0, -1.5e10, None, True, False] + TRICKY_STRINGS)
+    if roll < 0.65:
+        return {rng.choice(TRICKY_STRINGS) + str(i): random_value(rng, depth + 1) for i in range(rng.randint(0, 3))}
+    return [random_value(rng, depth + 1) for _ in range(rng.randint(0, 3))]
+
+def scan(data: bytes, chunk_size: int):
+    return [json.loads(raw) for raw in _iter_array_elements(io.BytesIO(data), chunk_size)]
+
+def test_random_arrays_match_json_loads_at_any_chunk_size():
+    rng = random.Random(0)
+    for _ in range(500):
+        array = [random_value(rng) for _ in range(rng.randint(0, 5))]
+        data = json.dumps(array, indent=rng.choice([None, 2]), ensure_ascii=rng.random() < 0.5).encode()
+        assert scan(data, rng.randint(1, 64)) == array
+
+def test_nesting_deeper_than_the_regexes_skip():
+    deep = {"a": 1}
+    for level in range(SKIP_DEPTH * 3):
+        deep = [deep, {"level": level, "s": "]}"}]
+    array = [deep, "tail", deep]
+    data = json.dumps(array).encode()
+    for chunk_size in (1, 7, 1024):
+        assert scan(data, chunk_size) == array
+
+@pytest.mark.parametrize("data, elements", [
+    (b'[]', []),
+    (b' \n[ ]\n', []),
+    (b'\xef\xbb\xbf[1, "a,b" ,{"c": [2]}]', [1, "a,b", {"c": [2]}]),
+    (b'[\n  {"s": "\\"]"},\n  {"s": "\\\\"}\n]', [{"s": '"]'}, {"s": "\\"}]),
+])
+def test_edge_cases(data, elements):
+    for chunk_size in (1, 2, 3, 1024):
+        assert scan(data, chunk_size) == elements
+
+@pytest.mark.parametrize("data", [b'{"a": 1}', b'[1, 2', b'[{"a": "]', b'[[1]'])
+def test_not_an_array_or_unterminated(data):
+    with pytest.raises(ValueError):
+        scan(data, 3)
+
+def test_gzipped_array_shard(tmp_path):
+    docs = [{"corpusid": i, "title": f"t [{i}], {{x}}"} for i in range(50)]
+    shard = tmp_path / "papers_1.json.gz"
+    with gzip.open(shard, 'wt') as f:
+        json.dump(docs, f, indent=2)
+
+    assert detect_shard_format(shard) == 'array'
+    records = list(_iter_records(shard))
+    assert [json.loads(raw) for raw, _ in records] == docs
+    assert [position for _, position in records] == list(range(1, 51))
+    # Resuming skips the records before `start`
+    assert [json.loads(raw) for raw, _ in _iter_records(shard, start=45)] == docs[45:]
@@ -0,0 +1,64 @@
+"""Tests for splitting JSON Lines shards into byte ranges"""
+import json
+
+import pytest
+
+from sciscidb.upload import _iter_byte_range, split_byte_ranges
+
+def write_lines(path, lines, trailing_newline=True):
+    data = b"\n".join(lines) + (b"\n" if trailing_newline else b"")
+    path.write_bytes(data)
+    return data
+
+def docs(count):
+    return [json.dumps({"corpusid": i, "title": "x" * (i % 13)}).encode() for i in range(count)]
+
+@pytest.mark.parametrize("trailing_newline", [True, False])
+@pytest.mark.parametrize("range_bytes", [1, 17, 64, 100, 10_000])
+def test_ranges_cover_the_file_on_line_boundaries(tmp_path, range_bytes, trailing_newline):
+    shard = tmp_path / "papers_1.json"
+    data = write_lines(shard, docs(40), trailing_newline)
+
+    ranges = split_byte_ranges(shard, range_bytes)
+
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end == start
+        assert data[end - 1:end] == b"\n"
+    assert all(start < end for start, end in ranges)
+
+def test_boundary_landing_on_a_newline(tmp_path):
+    shard = tmp_path / "papers_1.json"
+    write_lines(shard, [b'{"corpusid": 1}', b'{"corpusid": 2}', b'{"corpusid": 3}'])
+    # The first line is 15 bytes, so the search for a newline starts right on it
+    assert split_byte_ranges(shard, 15) == [(0, 16), (16, 32), (32, 48)]
+
+def test_split_is_the_same_on_every_run(tmp_path):
+    shard = tmp_path / "papers_1.json"
+    write_lines(shard, docs(200))
+    assert split_byte_ranges(shard, 300) == split_byte_ranges(shard, 300)
+
+@pytest.mark.parametrize("range_bytes", [1, 50, 333])
+def test_ranges_yield_every_document_once(tmp_path, range_bytes):
+    shard = tmp_path / "papers_1.json"
+    lines = docs(60) + [b"", b"not json", b'{"other": 1}']
+    write_lines(shard, lines, trailing_newline=False)
+
+    ids = [
+        doc["corpusid"]
+        for byte_range in split_byte_ranges(shard, range_bytes)
+        for doc, _, _ in _iter_byte_range(shard, "corpusid", byte_range)
+    ]
+    assert ids == list(range(60))
+
+def test_resume_from_a_position_inside_a_range(tmp_path):
+    shard = tmp_path / "papers_1.json"
+    data = write_lines(shard, docs(10))
+    byte_range = (0, len(data))
+
+    yielded = list(_iter_byte_range(shard, "corpusid", byte_range))
+    _, size, position = yielded[3]
+    assert size == len(docs(10)[3])
+
+    resumed = [doc["corpusid"] for doc, _, _ in _iter_byte_range(shard, "corpusid", byte_range, start=position)]
+    assert resumed == list(range(4, 10))
@@ -0,0 +1,76 @@
+"""Tests for applying Semantic Scholar release diffs in order"""
+import json
+
+import pytest
+
+from sciscidb import diffs
+from sciscidb.database import get_loaded_release, set_loaded_release
+from sciscidb.download import shard_sort_key
+from sciscidb.rollups import read_rollup, rollups_pending
+
+def paper(corpusid, venue="Nature", year=2020):
+    return {"corpusid": corpusid, "venue": venue, "year": year}
+
+def write_records(path, records):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    return path
+
+def serve_diffs(monkeypatch, tmp_path, releases):
+    """Stand in for the datasets API with diffs written to local files"""
+    listed = []
+    files = {}
+    for from_release, to_release, updates, deletes in releases:
+        diff = {'from_release': from_release, 'to_release': to_release,
+                'update_files': ["updates_1"], 'delete_files': ["deletes_1"]}
+        diff_dir = tmp_path / "served" / to_release
+        files[to_release] = {
+            'update_files': [write_records(diff_dir / "updates_1.json", updates)],
+            'delete_files': [write_records(diff_dir / "deletes_1.json", [{"corpusid": i} for i in deletes])],
+        }
+        listed.append(diff)
+
+    monkeypatch.setattr(diffs, "get_latest_release", lambda: releases[-1][1])
+    monkeypatch.setattr(diffs, "get_release_diffs", lambda dataset, start, end: listed)
+    monkeypatch.setattr(diffs, "download_release_diff",
+                        lambda dataset, diff, workers, max_bandwidth: files[diff['to_release']])
+
+def test_diffs_apply_in_release_order(data_root, mongo, monkeypatch):
+    papers = mongo["papers"]
+    papers.insert_many([paper(1), paper(2), paper(3)])
+    set_loaded_release("papers", "r1")
+
+    serve_diffs(monkeypatch, data_root, [
+        # Move 2 to Science, add 4; delete 3 and 99, which was never loaded
+        ("r1", "r2", [paper(2, venue="Science"), paper(4)], [3, 99]),
+        # Delete the 2 updated by the previous diff, bring 3 back
+        ("r2", "r3", [paper(3, venue="Cell")], [2]),
+    ])
+
+    stats = diffs.update_to_latest_release("papers")
+
+    assert stats['diffs_applied'] == 2 and stats['end_release'] == "r3"
+    assert stats['errors'] == 0 and stats['deleted'] == 2
+    assert get_loaded_release("papers") == "r3"
+    stored = {doc["corpusid"]: doc["venue"] for doc in papers.find({}, {"_id": 0})}
+    assert stored == {1: "Nature", 3: "Cell", 4: "Nature"}
+
+    assert not rollups_pending(papers)
+    assert read_rollup(mongo, "papers", "venue_year") == [
+        {"venue": "Cell", "year": 2020, "count": 1},
+        {"venue": "Nature", "year": 2020, "count": 2},
+    ]
+
+def test_up_to_date_collection_downloads_nothing(data_root, mongo, monkeypatch):
+    set_loaded_release("papers", "r1")
+    monkeypatch.setattr(diffs, "get_latest_release", lambda: "r1")
+    monkeypatch.setattr(diffs, "download_release_diff", lambda *args: pytest.fail("downloaded a diff"))
+
+    assert diffs.update_to_latest_release("papers")['diffs_applied'] == 0
+
+def test_diff_files_sort_in_url_order(tmp_path):
+    names = ["updates_10.json.gz", "updates_2.json.gz", "updates_1.json.gz", "extra.json"]
+    ordered = sorted((tmp_path / name for name in names), key=shard_sort_key)
+    assert [path.name for path in ordered] == ["updates_1.json.gz", "updates_2.json.gz", "updates_10.json.gz", "extra.json"]
@@ -0,0 +1,65 @@
+"""Tests for the shared HTTP client's adaptive rate limit"""
+import pytest
+
+from sciscidb import http_client
+from sciscidb.http_client import RATE_RECOVERY_REQUESTS, HttpClient, TokenBucket
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+
+    def close(self):
+        pass
+
+    def raise_for_status(self):
+        raise AssertionError("retries exhausted")
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(http_client.time, "sleep", lambda seconds: None)
+    client = HttpClient(requests_per_second=1000, backoff_base=0)
+    statuses = []
+    monkeypatch.setattr(client.session, "get", lambda url, **kwargs: FakeResponse(statuses.pop(0)))
+    client.statuses = statuses
+    return client
+
+def test_429_halves_the_rate(client):
+    client.statuses.extend([429, 429, 200])
+    assert client.get("http://example.org").status_code == 200
+    assert client.rate_limiter.rate == 250
+
+def test_rate_recovers_after_runs_of_successes(client):
+    client.statuses.extend([429, 200])
+    client.get("http://example.org")
+    assert client.rate_limiter.rate == 500
+
+    client.statuses.extend([200] * (RATE_RECOVERY_REQUESTS - 1))
+    for _ in range(RATE_RECOVERY_REQUESTS - 2):
+        client.get("http://example.org")
+    assert client.rate_limiter.rate == 500
+    client.get("http://example.org")
+    assert client.rate_limiter.rate == 600
+
+    client.statuses.extend([200] * RATE_RECOVERY_REQUESTS * 10)
+    for _ in range(RATE_RECOVERY_REQUESTS * 10):
+        client.get("http://example.org")
+    assert client.rate_limiter.rate == 1000
+
+def test_rate_has_a_floor(client):
+    client.max_retries = 10
+    client.statuses.extend([429] * 10 + [200])
+    client.get("http://example.org")
+    assert client.rate_limiter.rate == 1000 * http_client.MIN_RATE_FRACTION
+
+def test_server_errors_do_not_change_the_rate(client):
+    client.statuses.extend([503, 200])
+    client.get("http://example.org")
+    assert client.rate_limiter.rate == 1000
+
+def test_set_rate_keeps_the_bucket_usable():
+    bucket = TokenBucket(10, capacity=1)
+    bucket.set_rate(1e6)
+    bucket.consume(1)
+    bucket.consume(1)
+    assert bucket.rate == 1e6
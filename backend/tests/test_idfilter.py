@@ -0,0 +1,49 @@
+"""Tests for the exact and Bloom id filters"""
+import copy
+
+import pytest
+
+from sciscidb.idfilter import BloomIdFilter, ExactIdFilter, make_id_filter, validate_id_filter
+
+@pytest.mark.parametrize("kind", ["exact", "bloom"])
+def test_repeated_ids_are_reported_as_seen(kind):
+    id_filter = make_id_filter(kind, capacity=1000, error_rate=0.01)
+    ids = [1, 2, "3", "abc", 2**40]
+
+    assert [id_filter.check_and_add(doc_id) for doc_id in ids] == [False] * len(ids)
+    assert all(id_filter.check_and_add(doc_id) for doc_id in ids)
+    assert len(id_filter) == len(ids)
+
+def test_exact_filter_has_no_false_positives():
+    id_filter = ExactIdFilter()
+    id_filter.update(range(0, 10_000, 2))
+    assert not any(id_filter.check_and_add(doc_id) for doc_id in range(1, 10_000, 2))
+
+def test_bloom_filter_false_positive_rate():
+    id_filter = BloomIdFilter(capacity=10_000, error_rate=0.01)
+    id_filter.update(range(10_000))
+    # Probe copies, so the probes themselves do not fill the filter past capacity
+    false_positives = sum(copy.deepcopy(id_filter).check_and_add(doc_id) for doc_id in range(10_000, 12_000))
+    # 1% expected at capacity
+    assert false_positives < 60
+
+def test_bloom_filter_is_deterministic():
+    first, second = BloomIdFilter(1000, 0.01), BloomIdFilter(1000, 0.01)
+    first.update(["a", "b", 3])
+    second.update(["a", "b", 3])
+    assert first._bits == second._bits
+
+@pytest.mark.parametrize("kind, capacity, error_rate", [
+    ("cuckoo", 1000, 0.01),
+    ("bloom", 0, 0.01),
+    ("bloom", 1000, 0),
+    ("bloom", 1000, 1.5),
+])
+def test_invalid_arguments(kind, capacity, error_rate):
+    with pytest.raises(ValueError):
+        validate_id_filter(kind, capacity, error_rate)
+    with pytest.raises(ValueError):
+        make_id_filter(kind, capacity, error_rate)
+
+def test_exact_filter_ignores_bloom_parameters():
+    validate_id_filter("exact", 0, 0)
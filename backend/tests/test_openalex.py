@@ -0,0 +1,122 @@
+"""Tests for syncing OpenAlex snapshot partitions from a mirror"""
+import functools
+import gzip
+import json
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from sciscidb import download
+from sciscidb.catalog import read_catalog
+from sciscidb.config import config
+from sciscidb.download import DownloadError, download_openalex
+
+class Snapshot:
+    """A local directory laid out like the OpenAlex S3 bucket"""
+
+    def __init__(self, root):
+        self.root = root
+        self.entries = {}
+
+    def add(self, date, part, records, content_length=None):
+        key = f"data/works/updated_date={date}/{part}.gz"
+        path = self.root / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(gzip.compress("".join(json.dumps(r) + "\n" for r in records).encode()))
+        self.entries[key] = {
+            "url": f"s3://openalex/{key}",
+            "meta": {"content_length": content_length or path.stat().st_size, "record_count": len(records)},
+        }
+        self.write_manifest()
+
+    def remove(self, date, part):
+        del self.entries[f"data/works/updated_date={date}/{part}.gz"]
+        self.write_manifest()
+
+    def write_manifest(self):
+        manifest = self.root / "data" / "works" / "manifest"
+        manifest.parent.mkdir(parents=True, exist_ok=True)
+        manifest.write_text(json.dumps({"entries": list(self.entries.values())}))
+
+@pytest.fixture
+def snapshot(data_root, monkeypatch):
+    mirror = Snapshot(data_root / "snapshot")
+    mirror.add("2024-01-01", "part_000", [{"id": "W1"}, {"id": "W2"}])
+    mirror.add("2024-03-01", "part_000", [{"id": "W3"}])
+    monkeypatch.setattr(config, "openalex_snapshot_url", str(mirror.root))
+    return mirror
+
+@pytest.fixture
+def fetched(monkeypatch):
+    """Names of the partitions each sync copies"""
+    names = []
+    fetch = download._fetch_openalex_file
+
+    def recording_fetch(location, target, *args):
+        names.append(f"{target.parent.name}/{target.name}")
+        return fetch(location, target, *args)
+
+    monkeypatch.setattr(download, "_fetch_openalex_file", recording_fetch)
+    return names
+
+def test_manifest_partitions_are_fetched_and_catalogued(snapshot, fetched):
+    dataset_path = download_openalex("works")
+
+    assert sorted(fetched) == ["updated_date=2024-01-01/part_000.gz", "updated_date=2024-03-01/part_000.gz"]
+    partition = dataset_path / "updated_date=2024-01-01" / "part_000.gz"
+    assert gzip.decompress(partition.read_bytes()).decode().splitlines() == ['{"id": "W1"}', '{"id": "W2"}']
+    assert json.loads((dataset_path / "manifest").read_text())["entries"] == list(snapshot.entries.values())
+
+    shards = read_catalog(dataset_path)["shards"]
+    assert shards["updated_date=2024-01-01/part_000.gz"]["lines"] == 2
+    assert shards["updated_date=2024-03-01/part_000.gz"]["documents"] == 1
+
+def test_rerun_only_fetches_new_or_changed_partitions(snapshot, fetched):
+    dataset_path = download_openalex("works")
+    fetched.clear()
+
+    download_openalex("works")
+    assert fetched == []
+
+    # A truncated copy, a new partition, and one dropped upstream
+    (dataset_path / "updated_date=2024-03-01" / "part_000.gz").write_bytes(b"")
+    snapshot.add("2024-05-01", "part_000", [{"id": "W4"}])
+    snapshot.remove("2024-01-01", "part_000")
+
+    download_openalex("works")
+    assert sorted(fetched) == ["updated_date=2024-03-01/part_000.gz", "updated_date=2024-05-01/part_000.gz"]
+    assert not (dataset_path / "updated_date=2024-01-01" / "part_000.gz").exists()
+    assert "updated_date=2024-01-01/part_000.gz" not in read_catalog(dataset_path)["shards"]
+
+def test_since_skips_older_partitions(snapshot, fetched):
+    dataset_path = download_openalex("works", since="2024-02-01")
+
+    assert fetched == ["updated_date=2024-03-01/part_000.gz"]
+    assert not (dataset_path / "updated_date=2024-01-01").exists()
+
+def test_size_mismatch_fails_without_keeping_the_partition(snapshot):
+    snapshot.add("2024-05-01", "part_000", [{"id": "W4"}], content_length=1)
+
+    with pytest.raises(DownloadError, match="1 of 3 partitions failed"):
+        download_openalex("works")
+    partition_dir = config.get_dataset_path("openalex/works") / "updated_date=2024-05-01"
+    assert list(partition_dir.iterdir()) == []
+
+def test_http_mirror(snapshot, fetched, monkeypatch):
+    class QuietHandler(SimpleHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory=str(snapshot.root)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        monkeypatch.setattr(config, "openalex_snapshot_url", f"http://127.0.0.1:{server.server_port}")
+        dataset_path = download_openalex("works", workers=2)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert len(fetched) == 2
+    served = snapshot.root / "data" / "works" / "updated_date=2024-03-01" / "part_000.gz"
+    assert (dataset_path / "updated_date=2024-03-01" / "part_000.gz").read_bytes() == served.read_bytes()
@@ -0,0 +1,44 @@
+"""Tests for the overlapped download-and-ingest pipeline"""
+import json
+
+import pytest
+
+from sciscidb import decoders, pipeline
+from sciscidb.upload import UploadError, UploadOptions
+
+@pytest.fixture
+def downloaded_shard(data_root, monkeypatch):
+    """Replace the download stage with one that hands over a local shard"""
+    dataset_path = data_root / "papers"
+    dataset_path.mkdir()
+    shard = dataset_path / "papers_1.json"
+    shard.write_text("".join(json.dumps({"corpusid": i}) + "\n" for i in range(5)))
+
+    def download_semantic_scholar(dataset_name, workers=1, max_bandwidth=None, on_shard=None):
+        on_shard(shard)
+        return dataset_path
+
+    monkeypatch.setattr(pipeline, "download_semantic_scholar", download_semantic_scholar)
+    return shard
+
+def test_ingest_loads_downloaded_shards(mongo, downloaded_shard):
+    stats = pipeline.ingest_dataset("papers")
+    assert stats['total_inserted'] == 5
+    assert mongo["papers"].count_documents({}) == 5
+
+def test_unknown_decoder_is_an_upload_error(mongo, downloaded_shard):
+    with pytest.raises(UploadError):
+        pipeline.ingest_dataset("papers", options=UploadOptions(json_decoder="nope"))
+
+def test_shard_errors_are_upload_errors_naming_the_shard(mongo, downloaded_shard, monkeypatch):
+    def detect_id_field(collection_name, files):
+        raise decoders.DecoderError("decoder failed")
+
+    monkeypatch.setattr(pipeline, "detect_id_field", detect_id_field)
+    with pytest.raises(UploadError, match="papers_1.json"):
+        pipeline.ingest_dataset("papers")
+
+def test_options_the_pipeline_cannot_honour_are_refused(mongo, downloaded_shard):
+    with pytest.raises(UploadError, match="only inserts"):
+        pipeline.ingest_dataset("papers", options=UploadOptions(mode="upsert"))
+    assert mongo["papers"].count_documents({}) == 0
@@ -0,0 +1,112 @@
+"""Tests for the rollup counts kept by uploads and diffs"""
+import pytest
+
+from sciscidb.rollups import RollupCounter, read_rollup, rebuild_rollups
+
+def paper(corpusid, venue="Nature", year=2020, categories=("Physics",)):
+    return {
+        "corpusid": corpusid,
+        "venue": venue,
+        "year": year,
+        "s2fieldsofstudy": [{"category": category, "source": "s2-fos-model"} for category in categories]
+        + [{"category": "Ignored", "source": "external"}],
+    }
+
+def pending(counter):
+    return {rollup: {key: delta for key, delta in deltas.items() if delta} for rollup, deltas in counter._deltas.items()}
+
+def test_upsert_moves_counts_from_the_stored_version():
+    counter = RollupCounter(collection=None)
+    stored = {1: counter.keys(paper(1, venue="Nature", year=2019))}
+
+    counter.replace(stored, [paper(1, venue="Science", year=2019), paper(2)], "corpusid")
+
+    assert pending(counter) == {
+        "venue_year": {("Nature", 2019): -1, ("Science", 2019): 1, ("Nature", 2020): 1},
+        "field_year": {("Physics", 2020): 1},
+    }
+
+def test_id_repeated_within_a_batch_counts_once():
+    counter = RollupCounter(collection=None)
+    counter.replace({}, [paper(1, venue="A"), paper(1, venue="B"), paper(1, venue="C")], "corpusid")
+    assert pending(counter)["venue_year"] == {("C", 2020): 1}
+
+def test_unchanged_replacement_is_a_no_op():
+    counter = RollupCounter(collection=None)
+    counter.replace({1: counter.keys(paper(1))}, [paper(1)], "corpusid")
+    assert pending(counter) == {"venue_year": {}, "field_year": {}}
+
+@pytest.mark.parametrize("doc", [
+    paper(1, venue=None),
+    paper(1, year=None),
+    paper(1, year=1800),
+    paper(1, year=True),
+])
+def test_papers_outside_the_counted_range(doc):
+    assert RollupCounter(collection=None).keys(doc)["venue_year"] == []
+
+def test_uncategorised_model_entries_count_under_a_null_field():
+    keys = RollupCounter(collection=None).keys(paper(1, categories=("Biology", None)))
+    assert keys["field_year"] == [("Biology", 2020), (None, 2020)]
+
+def test_rebuild_counts_null_categories_like_the_counter():
+    mongomock = pytest.importorskip("mongomock")
+    papers = mongomock.MongoClient()["papersDB"]["papers"]
+    docs = [paper(1, categories=(None,)), paper(2, categories=("Physics", None)), paper(3, year=2019)]
+    papers.insert_many([dict(doc) for doc in docs])
+
+    counter = RollupCounter(papers)
+    counter.add(docs)
+    counter.flush()
+    incremental = read_rollup(papers.database, "papers", "field_year")
+
+    rebuild_rollups(papers)
+    assert read_rollup(papers.database, "papers", "field_year") == incremental
+    assert incremental == [
+        {"field": None, "year": 2020, "count": 2},
+        {"field": "Physics", "year": 2019, "count": 1},
+        {"field": "Physics", "year": 2020, "count": 1},
+    ]
+
+def test_flush_matches_a_rebuild():
+    mongomock = pytest.importorskip("mongomock")
+    papers = mongomock.MongoClient()["papersDB"]["papers"]
+    counter = RollupCounter(papers)
+
+    docs = [paper(1), paper(2), paper(3, venue="Science"), paper(4, categories=("Physics", "Biology"))]
+    papers.insert_many([dict(doc) for doc in docs])
+    counter.add(docs)
+    counter.flush()
+
+    # Upsert 1 to another venue, delete 3, whose Science row drops to zero
+    stored = counter.snapshot("corpusid", [1, 3])
+    papers.replace_one({"corpusid": 1}, paper(1, venue="Cell"))
+    counter.replace({1: stored[1]}, [paper(1, venue="Cell")], "corpusid")
+    papers.delete_one({"corpusid": 3})
+    counter.remove({3: stored[3]})
+    counter.flush()
+
+    db = papers.database
+    incremental = {rollup: read_rollup(db, "papers", rollup) for rollup in ("venue_year", "field_year")}
+    assert db["rollup_venue_year"].count_documents({"_id.venue": "Science"}) == 0
+
+    rebuild_rollups(papers)
+    assert incremental == {rollup: read_rollup(db, "papers", rollup) for rollup in ("venue_year", "field_year")}
+    assert incremental["venue_year"] == [
+        {"venue": "Cell", "year": 2020, "count": 1},
+        {"venue": "Nature", "year": 2020, "count": 2},
+    ]
+
+def test_flush_keeps_rows_it_did_not_lower():
+    mongomock = pytest.importorskip("mongomock")
+    papers = mongomock.MongoClient()["papersDB"]["papers"]
+    rollup = papers.database["rollup_venue_year"]
+    rollup.insert_one({"_id": {"venue": "Stray", "year": 2020}, "count": 0})
+
+    counter = RollupCounter(papers)
+    counter.add([paper(1)])
+    counter.flush()
+    counter.remove({1: counter.keys(paper(1))})
+    counter.flush()
+
+    assert [doc["_id"]["venue"] for doc in rollup.find()] == ["Stray"]
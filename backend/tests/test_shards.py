@@ -0,0 +1,71 @@
+"""Tests for the seekable zstd shard store"""
+import gzip
+import json
+
+import pytest
+
+pytest.importorskip("zstandard")
+
+from sciscidb import shards
+from sciscidb.config import config
+
+@pytest.fixture
+def papers(tmp_path, monkeypatch):
+    """A papers dataset with int ids in x.json, more in x.json.gz and string ids in a.b.json"""
+    monkeypatch.setattr(config, "data_root", tmp_path)
+    monkeypatch.setattr(shards, "_stores", {})
+    dataset_path = tmp_path / "papers"
+    dataset_path.mkdir()
+    with open(dataset_path / "x.json", 'w') as f:
+        for i in range(250):
+            f.write(json.dumps({"corpusid": i, "shard": "x.json"}) + "\n")
+    with gzip.open(dataset_path / "x.json.gz", 'wt') as f:
+        for i in range(250, 400):
+            f.write(json.dumps({"corpusid": i, "shard": "x.json.gz"}) + "\n")
+    with open(dataset_path / "a.b.json", 'w') as f:
+        for i in range(3):
+            f.write(json.dumps({"corpusid": f"0b5c-{i}", "shard": "a.b.json"}) + "\n")
+        f.write(json.dumps({"title": "no id"}) + "\n")
+    return dataset_path
+
+def test_build_and_look_up(papers):
+    stats = shards.build_shard_store("papers", frame_records=32)
+
+    assert stats['records'] == 403 and stats['skipped'] == 1
+    store_files = sorted(path.name for path in shards.get_store_path("papers").glob("*.zst"))
+    assert store_files == ["a.b.json.zst", "x.json.gz.zst", "x.json.zst"]
+
+    assert shards.get("papers", 0)["shard"] == "x.json"
+    assert shards.get("papers", 399)["shard"] == "x.json.gz"
+    assert shards.get("papers", "399") == shards.get("papers", 399)
+    assert shards.get("papers", "0b5c-2") == {"corpusid": "0b5c-2", "shard": "a.b.json"}
+    assert shards.get("papers", 400) is None
+    assert shards.get("papers", "0b5c-9") is None
+
+def test_ids_sharing_a_key(papers, monkeypatch):
+    # Every id hashes to one of two keys, so most lookups meet other records first
+    monkeypatch.setattr(shards, "id_key", lambda record_id: len(str(record_id)) % 2)
+    shards.build_shard_store("papers", frame_records=32)
+
+    for record_id in (5, 55, 255, "0b5c-1"):
+        assert shards.get("papers", record_id)["corpusid"] == record_id
+    assert shards.get("papers", 1000) is None
+
+def test_rebuild_removes_stale_store_files(papers):
+    shards.build_shard_store("papers")
+    (papers / "x.json.gz").unlink()
+    shards.build_shard_store("papers")
+
+    assert not (shards.get_store_path("papers") / "x.json.gz.zst").exists()
+    assert shards.get("papers", 300) is None
+
+def test_store_with_another_key_scheme_is_refused(papers):
+    shards.build_shard_store("papers")
+    meta_path = shards.get_store_path("papers") / "shards.json"
+    meta = json.loads(meta_path.read_text())
+    del meta["key_scheme"]
+    meta_path.write_text(json.dumps(meta))
+    shards._stores.clear()
+
+    with pytest.raises(shards.ShardStoreError):
+        shards.get("papers", 0)
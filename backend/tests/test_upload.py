@@ -0,0 +1,94 @@
+"""Tests for streaming shards into MongoDB with the upload ledger"""
+import json
+
+import pytest
+from pymongo.errors import AutoReconnect
+
+from sciscidb import upload
+from sciscidb.catalog import get_catalog
+from sciscidb.ledger import UploadLedger
+from sciscidb.rollups import RollupCounter, rollups_pending
+from sciscidb.upload import UploadOptions, upload_to_mongodb
+
+def write_shard(path, ids):
+    with open(path, 'w') as f:
+        for i in ids:
+            f.write(json.dumps({"corpusid": i, "venue": "Nature", "year": 2020}) + "\n")
+
+def test_failed_batch_is_written_again_on_resume(data_root, mongo, monkeypatch):
+    dataset_path = data_root / "papers"
+    dataset_path.mkdir()
+    write_shard(dataset_path / "papers_1.json", range(30))
+
+    collection = type(mongo["papers"])
+    insert_many = collection.insert_many
+    calls = []
+
+    def flaky_insert_many(self, documents, *args, **kwargs):
+        calls.append(len(documents))
+        if len(calls) == 2:
+            raise AutoReconnect("connection reset")
+        return insert_many(self, documents, *args, **kwargs)
+
+    monkeypatch.setattr(collection, "insert_many", flaky_insert_many)
+    stats = upload_to_mongodb(dataset_path, "papers", options=UploadOptions(batch_size=10))
+
+    assert stats['total_errors'] > 0
+    assert mongo["papers"].count_documents({}) == 10
+    progress = UploadLedger(dataset_path).get("papers", "papers_1.json")
+    assert progress['status'] != 'complete' and progress['position'] == 10
+
+    upload_to_mongodb(dataset_path, "papers", options=UploadOptions(batch_size=10, resume=True))
+
+    assert sorted(doc["corpusid"] for doc in mongo["papers"].find()) == list(range(30))
+    assert UploadLedger(dataset_path).get("papers", "papers_1.json")['status'] == 'complete'
+    # The rollups count every paper once
+    assert mongo["rollup_venue_year"].find_one()["count"] == 30
+
+def test_rollups_left_pending_by_a_crash_are_rebuilt(data_root, mongo, monkeypatch):
+    dataset_path = data_root / "papers"
+    dataset_path.mkdir()
+    write_shard(dataset_path / "papers_1.json", range(30))
+
+    flush = RollupCounter.flush
+    calls = []
+
+    def crashing_flush(self):
+        calls.append(1)
+        if len(calls) == 2:
+            # The process dies after writing batch 2 but before counting it
+            raise KeyboardInterrupt
+        return flush(self)
+
+    monkeypatch.setattr(RollupCounter, "flush", crashing_flush)
+    with pytest.raises(KeyboardInterrupt):
+        upload_to_mongodb(dataset_path, "papers", options=UploadOptions(batch_size=10))
+    monkeypatch.setattr(RollupCounter, "flush", flush)
+
+    assert mongo["papers"].count_documents({}) == 20
+    assert mongo["rollup_venue_year"].find_one()["count"] == 10
+    assert rollups_pending(mongo["papers"])
+
+    upload_to_mongodb(dataset_path, "papers", options=UploadOptions(batch_size=10, resume=True))
+
+    assert mongo["rollup_venue_year"].find_one()["count"] == 30
+    assert not rollups_pending(mongo["papers"])
+
+def test_ingest_records_line_counts_in_the_catalog(data_root, mongo, monkeypatch):
+    dataset_path = data_root / "papers"
+    dataset_path.mkdir()
+    write_shard(dataset_path / "papers_1.json", range(30))
+    with open(dataset_path / "papers_1.json", 'a') as f:
+        f.write("\nnot json\n" + json.dumps({"title": "no id"}) + "\n")
+    (dataset_path / "papers_2.json").write_text(json.dumps([{"corpusid": 100 + i} for i in range(7)]))
+    # Split the first shard into byte ranges
+    monkeypatch.setattr(upload, "RANGE_BYTES", 200)
+
+    upload_to_mongodb(dataset_path, "papers", options=UploadOptions(batch_size=10))
+
+    catalog = get_catalog(dataset_path)
+    shards = catalog.data["shards"]
+    assert shards["papers_1.json"]["lines"] == 32
+    assert shards["papers_2.json"]["lines"] == 7
+    assert catalog.summary()["total_lines"] == 39
+    assert upload.estimate_id_capacity(catalog) == 39